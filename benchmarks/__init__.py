@@ -0,0 +1 @@
+"""Benchmarks for the La Marzocco integration.  Run each module with python -m from the repository root."""
@@ -0,0 +1,50 @@
+"""Compare frames decoded per second by lmdirect's decoder and the struct decoder.
+
+Run from the repository root:
+
+    python -m benchmarks.decode [rounds]
+"""
+import asyncio
+import sys
+import time
+from unittest.mock import patch
+
+from lmdirect.msgs import MSGS
+
+from custom_components.lamarzocco.api import LaMarzocco
+from custom_components.lamarzocco.decoder import LAYOUTS
+from support.data import FRAMES, machine_data
+
+ROUNDS = 2000
+
+
+async def frames_per_second(layouts, rounds):
+    """Decode the fixture frames repeatedly and return the rate."""
+    lm = LaMarzocco(None, data=machine_data())
+    msgs = {(x.msg_type, x.msg): x for x in MSGS.values()}
+    frames = [(x[9:-2], msgs[(x[0], x[1:9])]) for x in FRAMES]
+
+    with patch("custom_components.lamarzocco.api.LAYOUTS", layouts):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for data, msg in frames:
+                await lm._populate_items(data, msg)
+        elapsed = time.perf_counter() - start
+
+    return rounds * len(frames) / elapsed
+
+
+async def main(rounds):
+    """Run the benchmark and print the results."""
+    before = await frames_per_second({}, rounds)
+    after = await frames_per_second(LAYOUTS, rounds)
+
+    print(f"{rounds} rounds of {len(FRAMES)} frames")
+    print(f"  lmdirect decoder: {before:10.0f} frames/s")
+    print(f"  struct decoder:   {after:10.0f} frames/s")
+    print(f"  speedup:          {after / before:10.2f}x")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(main(int(args[0]) if args else ROUNDS))
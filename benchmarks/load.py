@@ -0,0 +1,74 @@
+"""Load test the integration against many simulated machines at once.
+
+Run from the repository root:
+
+    python -m benchmarks.load [machines] [polls] [latency] [jitter] [drop_rate]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from support.fake_machine import FakeMachine
+from support.machines import connect
+
+MACHINES = 100
+POLLS = 10
+LATENCY = 0.05
+JITTER = 0.02
+DROP_RATE = 0.001
+
+
+async def timed_poll(lm):
+    """Poll one machine and return the seconds it took."""
+    start = time.perf_counter()
+    await lm.poll()
+    return time.perf_counter() - start
+
+
+async def main(count, polls, latency, jitter, drop_rate):
+    """Run the load test and print the results."""
+    machines = [
+        await FakeMachine(
+            latency=latency, jitter=jitter, drop_rate=drop_rate, heat_rate=0.1, seed=x
+        ).start()
+        for x in range(count)
+    ]
+    lms = [connect(x) for x in machines]
+
+    """Every machine is polled at once, the way the coordinators line up after a restart."""
+    times = []
+    start = time.perf_counter()
+    try:
+        for _ in range(polls):
+            times += await asyncio.gather(*[timed_poll(x) for x in lms])
+        elapsed = time.perf_counter() - start
+        missing = sum(len(x._responses_waiting) for x in lms)
+    finally:
+        await asyncio.gather(*[x.close() for x in lms])
+        await asyncio.gather(*[x.stop() for x in machines])
+
+    requests = sum(len(x.requests) for x in machines)
+    p95 = statistics.quantiles(times, n=20)[-1] if len(times) > 1 else times[0]
+
+    print(
+        f"{count} machines, {polls} polls, {latency * 1000:.0f}±{jitter * 1000:.0f}ms"
+        f" latency, {drop_rate:.1%} dropped"
+    )
+    print(f"  throughput: {len(times) / elapsed:8.1f} polls/s, {requests} requests")
+    print(f"  poll p50:   {statistics.median(times) * 1000:8.1f}ms")
+    print(f"  poll p95:   {p95 * 1000:8.1f}ms")
+    print(f"  missing:    {missing:8d} replies still outstanding")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(
+        main(
+            int(args[0]) if args else MACHINES,
+            int(args[1]) if len(args) > 1 else POLLS,
+            float(args[2]) if len(args) > 2 else LATENCY,
+            float(args[3]) if len(args) > 3 else JITTER,
+            float(args[4]) if len(args) > 4 else DROP_RATE,
+        )
+    )
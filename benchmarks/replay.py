@@ -0,0 +1,58 @@
+"""Replay a capture of a machine's traffic through the integration and time it.
+
+Run from the repository root:
+
+    python -m benchmarks.replay capture [speed] [machines]
+
+speed is 1 for real time, 100 for a hundred times faster or max for as
+fast as possible, the default.  Each of the machines, 1 by default, has
+every entity registered, so the replay covers decoding, merging and
+writing the entity states.  With debug logging enabled, the integration
+logs what it decodes along the way.
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+
+from custom_components.lamarzocco.capture import RECEIVED, read_capture, replay
+from support.machines import async_create_hass
+
+from .suite import make_fleet
+
+
+async def main(path, speed, machines):
+    """Replay the capture into every machine at once and print the results."""
+    frames = read_capture(path)
+    hass = await async_create_hass()
+    try:
+        fleet = make_fleet(hass, machines)
+        start = time.perf_counter()
+        await asyncio.gather(*[replay(lm, frames, speed) for lm in fleet])
+        elapsed = time.perf_counter() - start
+        decoded = sum(lm.frames_decoded for lm in fleet)
+        skipped = sum(lm.frames_skipped for lm in fleet)
+    finally:
+        await hass.async_stop(force=True)
+
+    received = sum(1 for x in frames if x[1] == RECEIVED) * machines
+    span = frames[-1][0] - frames[0][0] if frames else 0
+    print(f"{len(frames)} frames over {span:.0f}s, {machines} machines, speed {speed or 'max'}")
+    print(f"  replayed in:  {elapsed:10.2f}s")
+    print(f"  received:     {received / elapsed:10.0f} frames/s")
+    print(f"  decoded:      {decoded:10d} frames, {skipped} unchanged and skipped")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if os.environ.get("DEBUG"):
+        logging.basicConfig(level=logging.DEBUG)
+    speed = args[1] if len(args) > 1 else "max"
+    asyncio.run(
+        main(
+            args[0],
+            None if speed == "max" else float(speed),
+            int(args[2]) if len(args) > 2 else 1,
+        )
+    )
@@ -0,0 +1,73 @@
+"""Compare time per poll with and without the persistent session.
+
+Run from the repository root:
+
+    python -m benchmarks.session [polls] [accept_delay]
+
+The command queue's spacing between writes is turned off for the
+comparison, since it would otherwise set the pace of every poll, and the
+time per poll with the spacing is reported on its own.
+"""
+import asyncio
+import sys
+import time
+
+from custom_components.lamarzocco.const import SEND_INTERVAL
+from support.fake_machine import FakeMachine
+from support.machines import connect
+
+POLLS = 50
+ACCEPT_DELAY = 0.05
+
+
+async def run_polls(machine, polls, persistent, interval=0):
+    """Poll the fake machine and return the mean seconds per poll."""
+    lm = connect(machine)
+    lm._queue.interval = interval
+
+    """Each poll returns once every reply of its cycle has arrived."""
+    start = time.perf_counter()
+    for _ in range(polls):
+        await lm.poll()
+
+        """Without the session, every poll pays for a new connection."""
+        if not persistent:
+            await lm._close()
+    elapsed = time.perf_counter() - start
+
+    await lm.close()
+    return elapsed / polls
+
+
+async def main(polls, accept_delay):
+    """Run the benchmark and print the results."""
+    machine = await FakeMachine(accept_delay=accept_delay).start()
+
+    try:
+        per_poll = await run_polls(machine, polls, persistent=False)
+        connects = machine.connects
+        persistent = await run_polls(machine, polls, persistent=True)
+        connects = (connects, machine.connects - connects)
+        spaced = await run_polls(
+            machine, polls, persistent=True, interval=SEND_INTERVAL
+        )
+    finally:
+        await machine.stop()
+
+    print(f"{polls} polls, {accept_delay * 1000:.0f}ms connection setup")
+    print(f"  connection per poll: {per_poll * 1000:8.2f}ms/poll, {connects[0]} connects")
+    print(f"  persistent session:  {persistent * 1000:8.2f}ms/poll, {connects[1]} connects")
+    print(f"  speedup:             {per_poll / persistent:8.2f}x")
+    print(
+        f"  spaced writes:       {spaced * 1000:8.2f}ms/poll, {SEND_INTERVAL * 1000:.0f}ms apart"
+    )
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(
+        main(
+            int(args[0]) if args else POLLS,
+            float(args[1]) if len(args) > 1 else ACCEPT_DELAY,
+        )
+    )
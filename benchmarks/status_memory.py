@@ -0,0 +1,79 @@
+"""Compare the memory one machine's status takes, and the time to read it, as a flat dictionary and as a StatusStore.
+
+Run from the repository root:
+
+    python -m benchmarks.status_memory
+"""
+import asyncio
+import sys
+import timeit
+
+from custom_components.lamarzocco.api import LaMarzocco
+from custom_components.lamarzocco.status import UNSET
+from support.data import FRAMES, machine_data
+
+
+def deep_size(obj, seen=None):
+    """Return the bytes an object and everything it references take.
+
+    Key strings, small ints and other interned objects are shared by every
+    machine, so they aren't counted.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or obj is None or obj is UNSET or isinstance(obj, bool):
+        return 0
+    if isinstance(obj, int) and -5 <= obj <= 256:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(v, seen) for v in obj.values())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(deep_size(x, seen) for x in obj)
+    elif hasattr(obj, "__slots__"):
+        for cls in type(obj).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                if hasattr(obj, name):
+                    size += deep_size(getattr(obj, name), seen)
+    return size
+
+
+async def decoded_status():
+    """Decode the fixture frames and return the status."""
+    lm = LaMarzocco(None, data=machine_data())
+    [await lm.process_data(x) for x in FRAMES]
+
+    """The changed keys are handed off after every poll."""
+    lm._current_status.pop_changed()
+    return lm._current_status
+
+
+"""Keys read for the boiler, recipe and schedule attributes, and reads per measurement."""
+READ_KEYS = ["power", "coffee_set_temp", "dose_k1", "mon_on_hour", "mon_on_time"]
+READS = 100_000
+
+
+def read_time(status, key):
+    """Return the fastest time to read a key, in nanoseconds."""
+    best = min(timeit.repeat(lambda: status[key], number=READS, repeat=5))
+    return best / READS * 1e9
+
+
+async def main():
+    """Run the benchmark and print the results."""
+    status = await decoded_status()
+    flat = dict(status)
+
+    print(f"{len(status)} status keys")
+    print(f"  flat dictionary: {deep_size(flat):8d} bytes/machine")
+    print(f"  StatusStore:     {deep_size(status):8d} bytes/machine")
+    for key in READ_KEYS:
+        print(
+            f"  read {key:<16} {read_time(flat, key):6.0f}ns flat, {read_time(status, key):6.0f}ns StatusStore"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
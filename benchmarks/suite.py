@@ -0,0 +1,281 @@
+"""Time the path from a machine's reply to the entity states, for fleets of 1, 10 and 100 machines.
+
+Run from the repository root:
+
+    python -m benchmarks.suite [output] [baseline]
+
+The results are written as JSON to output, benchmark.json by default,
+along with the versions of lmdirect, Home Assistant and Python.  Given the
+results of an earlier run, such as the last release or the lmdirect
+version before a bump, each result is printed with its ratio to the
+baseline so that regressions stand out.
+"""
+import asyncio
+import json
+import platform
+import sys
+import time
+from importlib.metadata import version
+
+from homeassistant.const import __version__ as HA_VERSION
+from lmdirect.msgs import FIRMWARE_VER, MSGS, TSET_COFFEE
+
+from custom_components.lamarzocco import (
+    binary_sensor,
+    button,
+    sensor,
+    switch,
+    water_heater,
+)
+from custom_components.lamarzocco.api import LaMarzocco
+from custom_components.lamarzocco.const import (
+    CONF_MODEL_NAME,
+    CONF_SERIAL_NUMBER,
+    MODEL_GS3_AV,
+    MODELS,
+)
+from custom_components.lamarzocco.entity_base import compile_entities
+from support.data import FRAMES, machine_data
+from support.machines import async_create_hass
+
+OUTPUT = "benchmark.json"
+FLEETS = [1, 10, 100]
+
+"""Operations on the whole fleet per measurement, and measurements per result.  The fastest measurement is reported."""
+ROUNDS = 20
+REPEATS = 5
+
+"""Each platform's entity table and class."""
+PLATFORMS = {
+    "binary_sensor": (binary_sensor.ENTITIES, binary_sensor.LaMarzoccoBinarySensor),
+    "button": (button.ENTITIES, button.LaMarzoccoButton),
+    "sensor": (sensor.ENTITIES, sensor.LaMarzoccoSensor),
+    "switch": (switch.ENTITIES, switch.LaMarzoccoSwitch),
+    "water_heater": (water_heater.ENTITIES, water_heater.LaMarzoccoWaterHeater),
+}
+
+
+def make_fleet(hass, count, model=MODEL_GS3_AV):
+    """Create machines of one model with every entity registered, and return them."""
+    fleet = []
+    for index in range(count):
+        data = machine_data()
+        data[CONF_MODEL_NAME] = model
+        data[CONF_SERIAL_NUMBER] = f"GS{index:06d}"
+        lm = LaMarzocco(hass, data=data)
+
+        """The device registry isn't set up, so don't look for the firmware version in it."""
+        lm._device_version = FIRMWARE_VER
+
+        for domain, (entities, cls) in PLATFORMS.items():
+            for descriptor in compile_entities(lm, domain, entities):
+                """Buttons don't take the config entry."""
+                args = [lm, descriptor, hass]
+                if cls is not button.LaMarzoccoButton:
+                    args.append(None)
+                entity = cls(*args)
+                entity.hass = hass
+                entity.entity_id = (
+                    f"{domain}.{lm.serial_number.lower()}_{descriptor.object_id}"
+                )
+
+                """Entities are written without an entity platform, which Home Assistant would warn about."""
+                entity._no_platform_reported = True
+                lm.register_entity(entity)
+
+        fleet.append(lm)
+    return fleet
+
+
+def parse(frame):
+    """Return the data of a fixture frame and the message it answers."""
+    msg = next(
+        x for x in MSGS.values() if (x.msg_type, x.msg) == (frame[0], frame[1:9])
+    )
+    return frame[9:-2], msg
+
+
+async def measure(operation, machines):
+    """Run an operation ROUNDS times per measurement and return the fastest measurement."""
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            await operation()
+        elapsed = (time.perf_counter() - start) / ROUNDS
+        best = elapsed if best is None else min(best, elapsed)
+
+    return {
+        "ms": round(best * 1000, 4),
+        "us_per_machine": round(best * 1e6 / machines, 3),
+    }
+
+
+async def bench_decode(fleet):
+    """Decode one reply of each type for every machine."""
+    results = {}
+    for frame in FRAMES:
+        data, msg = parse(frame)
+
+        async def decode():
+            for lm in fleet:
+                await lm._populate_items(data, msg)
+
+        results[frame[1:9]] = await measure(decode, len(fleet))
+    return results
+
+
+async def bench_merge(fleet):
+    """Merge a decoded status into every machine's status, with no entities to write."""
+    status = dict(fleet[0].current_status)
+    warmer = {**status, TSET_COFFEE: status[TSET_COFFEE] + 1}
+    statuses = [status, warmer]
+    for lm in fleet:
+        [lm.unregister_entity(x) for x in list(lm._entities)]
+
+    async def merge():
+        """Alternate between two statuses so that a value changes each time."""
+        statuses.reverse()
+        for lm in fleet:
+            lm.update_callback(current_status=statuses[0])
+
+    return {"update_callback": await measure(merge, len(fleet))}
+
+
+async def bench_attributes(hass, count):
+    """Build the attributes of every entity with an attribute map, for each model."""
+    results = {}
+    for model in MODELS:
+        fleet = await decoded_fleet(hass, count, model)
+        for entity in fleet[0]._entities:
+            if not entity._desc.attr_keys:
+                continue
+            index = fleet[0]._entities.index(entity)
+            entities = [lm._entities[index] for lm in fleet]
+
+            async def attributes():
+                for x in entities:
+                    x.extra_state_attributes
+
+            results[f"{model}/{entity._object_id}"] = await measure(attributes, count)
+    return results
+
+
+async def bench_water_heater(fleet):
+    """Build the state attributes of every water heater."""
+    heaters = [
+        x
+        for lm in fleet
+        for x in lm._entities
+        if isinstance(x, water_heater.LaMarzoccoWaterHeater)
+    ]
+
+    async def state_attributes():
+        for x in heaters:
+            x.state_attributes
+
+    return {"state_attributes": await measure(state_attributes, len(fleet))}
+
+
+async def bench_poll(fleet):
+    """Decode a whole poll cycle for every machine and write every entity's state."""
+    frames = [parse(x) for x in FRAMES]
+
+    async def poll():
+        for lm in fleet:
+            for data, msg in frames:
+                await lm._populate_items(data, msg)
+
+            """Like the first poll after a restart, every entity is written."""
+            lm._stale = True
+            lm.update_callback(current_status=lm.current_status)
+
+    return {"poll": await measure(poll, len(fleet))}
+
+
+async def decoded_fleet(hass, count, model=MODEL_GS3_AV):
+    """Return a fleet that has decoded every fixture frame once."""
+    fleet = make_fleet(hass, count, model)
+    for lm in fleet:
+        [await lm.process_data(x) for x in FRAMES]
+        lm._current_status.pop_changed()
+    return fleet
+
+
+async def run(hass):
+    """Run every benchmark for every fleet size and return the results."""
+    results = {}
+    for count in FLEETS:
+        size = str(count)
+        results.setdefault("decode", {})[size] = await bench_decode(
+            await decoded_fleet(hass, count)
+        )
+        results.setdefault("merge", {})[size] = await bench_merge(
+            await decoded_fleet(hass, count)
+        )
+        results.setdefault("attributes", {})[size] = await bench_attributes(
+            hass, count
+        )
+        results.setdefault("water_heater", {})[size] = await bench_water_heater(
+            await decoded_fleet(hass, count)
+        )
+        results.setdefault("poll", {})[size] = await bench_poll(
+            await decoded_fleet(hass, count)
+        )
+    return results
+
+
+def report(results, baseline):
+    """Print each result, with its ratio to the baseline if there is one."""
+    for group, sizes in results.items():
+        print(group)
+        for size, cases in sizes.items():
+            for case, result in cases.items():
+                line = f"  {size:>3} x {case:<40} {result['us_per_machine']:10.2f}us/machine"
+                before = baseline.get(group, {}).get(size, {}).get(case)
+                if before:
+                    line += f"  {result['ms'] / before['ms']:6.2f}x baseline"
+                print(line)
+
+
+async def main(output, baseline):
+    """Run the suite, save the results and print them."""
+    hass = await async_create_hass()
+    try:
+        results = await run(hass)
+    finally:
+        await hass.async_stop(force=True)
+
+    with open(output, "w") as file:
+        json.dump(
+            {
+                "versions": {
+                    "lmdirect": version("lmdirect"),
+                    "homeassistant": HA_VERSION,
+                    "python": platform.python_version(),
+                },
+                "rounds": ROUNDS,
+                "results": results,
+            },
+            file,
+            indent=2,
+        )
+
+    if baseline:
+        with open(baseline) as file:
+            baseline = json.load(file)
+        print(f"Compared with lmdirect {baseline['versions']['lmdirect']}")
+        baseline = baseline["results"]
+
+    report(results, baseline or {})
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(
+        main(
+            args[0] if args else OUTPUT,
+            args[1] if len(args) > 1 else None,
+        )
+    )
@@ -4,15 +4,22 @@ import logging
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
 
 from .api import LaMarzocco
-from .const import DOMAIN
+from .const import (
+    CONF_CAPTURE,
+    CONF_MAX_INTERVAL,
+    CONF_MIN_INTERVAL,
+    DEFAULT_MAX_INTERVAL,
+    DEFAULT_MIN_INTERVAL,
+    DOMAIN,
+    STORAGE_VERSION,
+)
 from .services import async_setup_services
 
 _LOGGER = logging.getLogger(__name__)
 
-PLATFORMS = ["switch", "binary_sensor", "sensor", "water_heater", "button"]
-
 
 async def async_setup(hass: HomeAssistant, config: dict):
     """Set up the La Marzocco component."""
@@ -23,30 +30,56 @@ async def async_setup(hass: HomeAssistant, config: dict):
 async def async_setup_entry(hass, config_entry):
     """Set up La Marzocco as config entry."""
     lm = LaMarzocco(hass, config_entry=config_entry)
+
+    """Bring entities up with the last known state while the first poll runs."""
+    await lm.async_restore_state()
     await lm.init_data(hass)
 
     hass.data[DOMAIN][config_entry.entry_id] = lm
 
-    for platform in PLATFORMS:
+    for platform in lm.profile.platforms:
         hass.async_create_task(
             hass.config_entries.async_forward_entry_setup(config_entry, platform)
         )
 
     """Set up global services."""
-    await async_setup_services(hass, config_entry)
+    await async_setup_services(hass)
+
+    config_entry.async_on_unload(config_entry.add_update_listener(async_update_options))
 
     return True
 
 
+async def async_update_options(hass: HomeAssistant, config_entry: ConfigEntry):
+    """Apply new polling bounds and the capture setting from the options flow."""
+    lm = hass.data[DOMAIN][config_entry.entry_id]
+    lm.set_poll_intervals(
+        config_entry.options.get(CONF_MIN_INTERVAL, DEFAULT_MIN_INTERVAL),
+        config_entry.options.get(CONF_MAX_INTERVAL, DEFAULT_MAX_INTERVAL),
+    )
+    lm.set_capture(config_entry.options.get(CONF_CAPTURE, False))
+
+
 async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry):
     """Unload a config entry."""
-    services = list(hass.services.async_services().get(DOMAIN).keys())
-    [hass.services.async_remove(DOMAIN, service) for service in services]
-
-    unload_ok = await hass.config_entries.async_unload_platforms(config_entry, PLATFORMS)
+    lm = hass.data[DOMAIN][config_entry.entry_id]
+    unload_ok = await hass.config_entries.async_unload_platforms(
+        config_entry, lm.profile.platforms
+    )
 
     if unload_ok:
-        await hass.data[DOMAIN][config_entry.entry_id].close()
+        await lm.close()
         hass.data[DOMAIN].pop(config_entry.entry_id)
 
+        """Drop services that none of the remaining machines support."""
+        await async_setup_services(hass)
+
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, config_entry: ConfigEntry):
+    """Delete the saved status and shot counts of a machine that is removed."""
+    await Store(hass, STORAGE_VERSION, f"{DOMAIN}.{config_entry.entry_id}").async_remove()
+    await Store(
+        hass, STORAGE_VERSION, f"{DOMAIN}.{config_entry.entry_id}.shots"
+    ).async_remove()
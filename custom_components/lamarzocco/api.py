@@ -2,17 +2,68 @@
 
 import asyncio
 import logging
+import struct
+from datetime import datetime
+from functools import partial
 
 from homeassistant.core import callback
 from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.storage import Store
 from lmdirect import LMDirect
+from lmdirect.aescipher import AESCipher
 from lmdirect.connection import AuthFail as LMAuthFail, ConnectionFail as LMConnectionFail
-from lmdirect.msgs import FIRMWARE_VER, POWER, UPDATE_AVAILABLE
-
-from .const import DOMAIN, MODEL_GS3_AV, MODELS, POLLING_INTERVAL
+from lmdirect.const import HOST, KEY, MACHINE_NAME, MODEL_NAME, PORT, SERIAL_NUMBER
+from lmdirect.msgs import FIRMWARE_VER, MSGS, POWER, TEMP_COFFEE, UPDATE_AVAILABLE, Msg
+
+from .breaker import CircuitBreaker
+from .capture import RECEIVED, SENT, FrameCapture
+from .clock import get_clock
+from .cloud import CLOUD_MACHINE_INFO, async_get_machine_info, offsets_missing
+from .coalescer import WriteCoalescer
+from .command_queue import (
+    PRIORITY_POLL,
+    PRIORITY_READBACK,
+    CommandQueue,
+    send_priority,
+)
+from .const import (
+    CONF_CAPTURE,
+    CONF_MAX_INTERVAL,
+    CONF_MIN_INTERVAL,
+    CONF_TOKEN,
+    DEFAULT_MAX_INTERVAL,
+    DEFAULT_MIN_INTERVAL,
+    DOMAIN,
+    EVENT_SHOT,
+    FRAMES_DECODED,
+    FRAMES_SKIPPED,
+    POLL_CYCLE_DEADLINE,
+    POLL_INTERVAL,
+    QUEUE_DEPTH,
+    QUEUE_WAIT,
+    READBACK,
+    READBACK_SETTLE,
+    STATE_WRITE_DELAY,
+    STORAGE_SAVE_DELAY,
+    STORAGE_VERSION,
+    VOLATILE_KEYS,
+)
+from .decoder import LAYOUTS, decode, status_keys
+from .history import TemperatureHistory
+from .profile import resolve_profile
+from .scheduler import AdaptiveInterval, RefreshSchedule, async_get_scheduler
+from .session import Session
+from .shots import ShotDetector, ShotThroughput
+from .status import StatusStore
 
 _LOGGER = logging.getLogger(__name__)
 
+"""The machine reports temperatures after a status request without being asked."""
+TEMP_REPORT = MSGS[Msg.GET_TEMP_REPORT].msg
+
+"""Shots are detected whenever fresh drink counters arrive."""
+DRINK_STATS = MSGS[Msg.GET_DRINK_STATS].msg
+
 
 class LaMarzocco(LMDirect):
     """Keep data for La Marzocco entities."""
@@ -20,16 +71,104 @@ class LaMarzocco(LMDirect):
     def __init__(self, hass, config_entry=None, data=None):
         """Initialise the LaMarzocco entity data."""
         self._hass = hass
+        self._clock = get_clock(hass)
         self._current_status = {}
-        self._polling_task = None
+        self._scheduler = None
         self._config_entry = config_entry
         self._device_version = None
-        self._poll_reaper_task = None
+        self._entities = []
+        self._key_index = {}
+        self._dirty_entities = set()
+        self._write_handle = None
+        self._stale = False
+        self._key_rejected = False
+        self._session = Session()
+        self._pipeline = None
+        self._cycle_received = set()
+        self._cycle_done = asyncio.Event()
+        self._refresh = RefreshSchedule(clock=self._clock)
+        self._last_frames = {}
+        self.frames_decoded = 0
+        self.frames_skipped = 0
+        self.history = TemperatureHistory()
+        self._shots = ShotDetector()
+        self._throughput = ShotThroughput()
+        self._coalescer = WriteCoalescer()
+        self._queue = CommandQueue(self._write_frames, clock=self._clock)
+        self._readback = set()
+        self._capture = None
+        self._breaker = CircuitBreaker(clock=self._clock)
+        self._save_pending = False
+        self._store = (
+            Store(hass, STORAGE_VERSION, f"{DOMAIN}.{config_entry.entry_id}")
+            if config_entry
+            else None
+        )
+        self._shot_store = (
+            Store(hass, STORAGE_VERSION, f"{DOMAIN}.{config_entry.entry_id}.shots")
+            if config_entry
+            else None
+        )
+
+        options = config_entry.options if config_entry else {}
+        self._interval = AdaptiveInterval(
+            options.get(CONF_MIN_INTERVAL, DEFAULT_MIN_INTERVAL),
+            options.get(CONF_MAX_INTERVAL, DEFAULT_MAX_INTERVAL),
+            clock=self._clock,
+        )
 
         """Start with the machine in standby if we haven't received accurate data yet"""
         self._current_status[POWER] = 0
 
-        super().__init__(config_entry.data if config_entry else data)
+        """Keep a copy of the config entry data, which is read-only, so that a moved machine's address can be updated."""
+        super().__init__(dict(config_entry.data) if config_entry else data)
+
+        """Track which status keys change so that only the affected entities are written."""
+        self._current_status = StatusStore(self._current_status)
+
+        """The model may not be known until we connect, in which case it's resolved again then."""
+        self._resolve_profile()
+
+        self.set_capture(options.get(CONF_CAPTURE, False))
+
+    async def async_restore_state(self):
+        """Load the status saved before the last restart, marked stale until the first poll."""
+        if not self._store:
+            return
+
+        """The shot throughput windows are saved separately and published from the first poll."""
+        shots = await self._shot_store.async_load()
+        if shots:
+            self._throughput.restore(shots)
+
+        data = await self._store.async_load()
+        if data:
+            _LOGGER.debug(f"Restored {len(data)} saved status values")
+            self._current_status.update(
+                {k: v for k, v in data.items() if k not in VOLATILE_KEYS}
+            )
+            self._update_available = data.get(UPDATE_AVAILABLE)
+            self._stale = True
+
+    @property
+    def clock(self):
+        """Return the clock that polling and timestamps follow."""
+        return self._clock
+
+    @property
+    def unreachable(self):
+        """Return true while the machine is failing to answer and polls are backing off."""
+        return self._breaker.is_open
+
+    @property
+    def stale(self):
+        """Return true if the status was restored from storage and not yet refreshed."""
+        return self._stale
+
+    def _data_to_save(self):
+        """Return the status to save.  Called by the store when it writes."""
+        self._save_pending = False
+        return {k: v for k, v in self._current_status.items() if k not in VOLATILE_KEYS}
 
     async def init_data(self, hass):
         """Initialize the underlying lmdirect package."""
@@ -40,61 +179,211 @@ class LaMarzocco(LMDirect):
         self._run = True
 
         """Start polling for status."""
-        self._polling_task = hass.loop.create_task(
-            self.fetch_data(), name="Polling Loop"
-        )
+        self._scheduler = async_get_scheduler(hass)
+        self._scheduler.add(self)
 
-        """Reap the results and any any exceptions."""
-        self._poll_reaper_task = hass.loop.create_task(
-            self.poll_reaper(), name="Poll Reaper"
-        )
+    def _resolve_profile(self):
+        """Look up the capabilities of the model reported by the cloud."""
+        try:
+            model_name = super().model_name
+        except KeyError:
+            model_name = None
+        self._profile = resolve_profile(model_name)
+
+    @property
+    def profile(self):
+        """Return the capabilities of this machine's model."""
+        return self._profile
 
     @property
     def model_name(self):
         """Return the model name of the normalized espresso machine."""
-        model_name = super().model_name
-        if model_name not in MODELS:
-            _LOGGER.error(
-                f"Unsupported model, falling back to all entities and services: {model_name}"
-            )
-        return model_name if model_name in MODELS else MODEL_GS3_AV
+        return self._profile.model_name
 
     @property
     def true_model_name(self):
         """Return the model name from the cloud, even if it's not one we know about.  Used for display only."""
-        model_name = super().model_name
-        return model_name if model_name in MODELS else model_name + " (Unknown)"
+        return self._profile.true_model_name
 
-    async def poll_reaper(self):
-        _LOGGER.debug("Starting polling reaper")
-        try:
-            await asyncio.gather(self._polling_task)
-        except Exception as err:
-            _LOGGER.error(f"Exception in polling task: {err}")
+    @property
+    def poll_interval(self):
+        """Return the delay currently used between polls."""
+        return self._interval.current
+
+    def set_poll_intervals(self, min_interval, max_interval):
+        """Change the adaptive polling bounds and re-evaluate the current wait."""
+        self._interval.set_bounds(min_interval, max_interval)
+        if self._scheduler:
+            self._scheduler.expedite(
+                self, self._interval.next_interval(self._current_status)
+            )
 
-        _LOGGER.debug("Finished reaping polling task")
+    def set_capture(self, enabled):
+        """Start or stop capturing the raw frames exchanged with the machine to a file in the config directory."""
+        if enabled and not self._capture:
+            path = self._hass.config.path(f"{DOMAIN}.{self.serial_number}.capture")
+            _LOGGER.info(f"Capturing frames to {path}")
+            self._capture = FrameCapture(path)
+        elif not enabled and self._capture:
+            capture, self._capture = self._capture, None
+            self._hass.async_add_executor_job(capture.flush)
+
+    async def announced(self, host, port):
+        """Probe the machine right away when it announces itself, at its new address if it moved."""
+        if self._machine_info[HOST] != host or self._machine_info[PORT] != port:
+            _LOGGER.info(f"Machine moved to {host}:{port}")
+            self._machine_info[HOST], self._machine_info[PORT] = host, port
+            await self._close()
+
+        if self._breaker.is_open:
+            _LOGGER.debug("Machine announced itself, probing it now")
+            self._breaker.reset()
+            if self._scheduler:
+                self._scheduler.expedite(self, 0)
+
+    def register_entity(self, entity):
+        """Register an entity to be written when any of the status keys it reads change."""
+        self._entities.append(entity)
+        [self._key_index.setdefault(key, set()).add(entity) for key in entity.status_keys]
+
+    def unregister_entity(self, entity):
+        """Stop writing an entity's state."""
+        if entity in self._entities:
+            self._entities.remove(entity)
+        [entities.discard(entity) for entities in self._key_index.values()]
+        self._dirty_entities.discard(entity)
 
     async def close(self):
-        """Tell the read and polling loops to stop."""
+        """Send any pending writes, tell the read loop to stop and stop polling this machine."""
+        await self._coalescer.flush()
         self._run = False
 
-        if self._polling_task:
-            self._polling_task.cancel()
+        if self._capture:
+            await self._hass.async_add_executor_job(self._capture.flush)
+
+        """Stop a poll that's under way so that it can't reopen the session after it's closed."""
+        if self._scheduler:
+            poll = self._scheduler.remove(self)
+            if poll and poll is not asyncio.current_task():
+                poll.cancel()
+                await asyncio.wait([poll])
+
+        if self._write_handle:
+            self._write_handle.cancel()
+            self._write_handle = None
+
+        if self._store and self._current_status:
+            await self._store.async_save(self._data_to_save())
+            await self._shot_store.async_save(self._throughput.as_dict())
 
         await super().close()
 
+    async def set_coffee_temp(self, temp=None):
+        """Set the coffee boiler temp, writing only the last of several quick changes."""
+        return await self._coalescer.submit(
+            Msg.SET_COFFEE_TEMP, super().set_coffee_temp, temp=temp
+        )
+
+    async def set_steam_temp(self, temp=None):
+        """Set the steam boiler temp, writing only the last of several quick changes."""
+        return await self._coalescer.submit(
+            Msg.SET_STEAM_TEMP, super().set_steam_temp, temp=temp
+        )
+
+    async def set_dose(self, key=None, pulses=None):
+        """Set the dose for a key, writing only the last of several quick changes."""
+        return await self._coalescer.submit(
+            (Msg.SET_DOSE, key), super().set_dose, key=key, pulses=pulses
+        )
+
+    async def set_dose_hot_water(self, seconds=None):
+        """Set the hot water dose, writing only the last of several quick changes."""
+        return await self._coalescer.submit(
+            Msg.SET_DOSE_HOT_WATER, super().set_dose_hot_water, seconds=seconds
+        )
+
+    async def set_prebrew_times(self, key=None, seconds_on=None, seconds_off=None):
+        """Set the prebrew times for a key, writing only the last of several quick changes."""
+        return await self._coalescer.submit(
+            (Msg.SET_PREBREW_TIMES, key),
+            super().set_prebrew_times,
+            key=key,
+            seconds_on=seconds_on,
+            seconds_off=seconds_off,
+        )
+
+    async def set_preinfusion_time(self, key=None, seconds=None):
+        """Set the preinfusion time for a key, writing only the last of several quick changes."""
+        return await self._coalescer.submit(
+            (Msg.SET_PREINFUSION_TIME, key),
+            super().set_preinfusion_time,
+            key=key,
+            seconds=seconds,
+        )
+
     @callback
     def update_callback(self, **kwargs):
         """Callback for when new data is available."""
         self._current_status.update(kwargs.get("current_status"))
         self._current_status[UPDATE_AVAILABLE] = self._update_available
 
+        """Commands report the entity type they changed: read back what they wrote soon, then poll faster for a while."""
+        entity_type = kwargs.get("entity_type")
+        if entity_type is not None:
+            self._interval.note_command()
+            if self._scheduler:
+                self._scheduler.expedite(
+                    self,
+                    READBACK_SETTLE if self._readback else self._interval.min_interval,
+                )
+
+        changed = self._current_status.pop_changed()
+
+        """The first fresh data replaces restored values, so every entity needs rewriting."""
+        if self._stale and entity_type is None:
+            self._stale = False
+            self._dirty_entities.update(self._entities)
+
+        """Collect the entities whose inputs changed and write each once when the poll cycle completes."""
+        self._dirty_entities.update(
+            entity for key in changed for entity in self._key_index.get(key, ())
+        )
+        if entity_type is not None or not self._responses_waiting:
+            self._write_states()
+        elif self._write_handle is None:
+            self._write_handle = self._hass.loop.call_later(
+                STATE_WRITE_DELAY, self._write_states
+            )
+
+        """Save lazily: one pending write picks up every change made before it runs."""
+        if self._store and not self._save_pending and any(
+            key not in VOLATILE_KEYS for key in changed
+        ):
+            self._save_pending = True
+            self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
         if not self._device_version and FIRMWARE_VER in self._current_status:
             self._hass.loop.create_task(
                 self._update_device_info(self._current_status[FIRMWARE_VER])
             )
             self._device_version = self._current_status[FIRMWARE_VER]
 
+    @callback
+    def _write_all_states(self):
+        """Write every entity's state, e.g. when the machine becomes unreachable or reachable again."""
+        self._dirty_entities.update(self._entities)
+        self._write_states()
+
+    @callback
+    def _write_states(self):
+        """Write the state of every entity affected by the collected updates."""
+        if self._write_handle:
+            self._write_handle.cancel()
+            self._write_handle = None
+
+        dirty_entities, self._dirty_entities = self._dirty_entities, set()
+        [entity.async_write_ha_state() for entity in dirty_entities]
+
     async def _update_device_info(self, firmware_version):
         """Update the device info with the firmware version."""
 
@@ -106,27 +395,451 @@ class LaMarzocco(LMDirect):
             device_entry.id, sw_version=firmware_version
         )
 
+    async def retrieve_machine_info(self, machine_info):
+        """Use the saved machine key unless the machine rejected it, and only then go to the cloud.
+
+        The drink totals are counted from offsets that also come from the
+        cloud, so go there too if they weren't restored with the last status.
+        """
+        if (
+            self._key_rejected
+            or any(x not in machine_info for x in CLOUD_MACHINE_INFO)
+            or offsets_missing(self._current_status)
+        ):
+            machine_info, token, update_available = await async_get_machine_info(
+                machine_info, self._current_status, machine_info.get(CONF_TOKEN)
+            )
+            machine_info[CONF_TOKEN] = token
+            self._update_available = update_available
+            self._key_rejected = False
+
+            """Drink totals are calculated from the cloud's offsets, so decode everything again."""
+            self._last_frames.clear()
+            self._shots.reset()
+
+            """Save the new key and token so that the next start doesn't need the cloud."""
+            if self._config_entry:
+                self._hass.config_entries.async_update_entry(
+                    self._config_entry, data={**self._config_entry.data, **machine_info}
+                )
+        else:
+            _LOGGER.debug("Using saved machine key")
+
+        """Add the machine and model names to the dict so that they're available for attributes."""
+        self._current_status.update(
+            {MACHINE_NAME: machine_info[MACHINE_NAME], MODEL_NAME: machine_info[MODEL_NAME]}
+        )
+
+        self._cipher = KeyCheckingCipher(machine_info[KEY], self._reject_key)
+        self._initialized_machine_info = True
+        return machine_info
+
+    async def _connect(self):
+        """Open the shared session to the machine if it isn't open already."""
+        if self._connected and self._session.is_open:
+            return self._machine_info
+
+        if not self._run:
+            raise LMConnectionFail("Connection closed")
+
+        """Don't wait out another connection timeout while backing off."""
+        if not self._breaker.allow():
+            raise LMConnectionFail("Machine unreachable, backing off")
+
+        _LOGGER.debug("Connecting")
+
+        if not self._initialized_machine_info:
+            try:
+                self._machine_info = await self.retrieve_machine_info(
+                    self._machine_info
+                )
+            except LMAuthFail:
+                raise
+            except Exception as err:
+                raise LMConnectionFail(
+                    f"Exception retrieving machine info: {err}"
+                ) from err
+
+        try:
+            self._reader, self._writer = await self._session.open(
+                self._machine_info[HOST], self._machine_info[PORT]
+            )
+        except asyncio.TimeoutError:
+            _LOGGER.warning("Connection Timeout, skipping")
+            return None
+        except OSError as err:
+            raise LMConnectionFail(f"Cannot connect to machine: {err}") from err
+
+        await self.start_read_task()
+        self._connected = True
+
+        return self._machine_info
+
+    async def start_read_task(self):
+        """Start listening for responses.  The read task cleans up after itself."""
+        self._read_response_task = asyncio.get_running_loop().create_task(
+            self.read_response_task(), name="Response Task"
+        )
+
+    async def read_response_task(self):
+        """Read responses for as long as the session stays open."""
+        loop = asyncio.get_running_loop()
+        _LOGGER.debug("Starting read task")
+
+        try:
+            while self._run:
+                encoded_data = await self._session.read_frame()
+                if encoded_data is None:
+                    break
+
+                fn = partial(self._cipher.decrypt, encoded_data[1:-1])
+                plaintext = await loop.run_in_executor(None, fn)
+                if plaintext:
+                    await self.handle_frame(plaintext)
+        except Exception as err:
+            _LOGGER.error(f"Exception in read_response_task: {err}")
+        finally:
+            if self._read_response_task is asyncio.current_task():
+                self._session.close()
+                self._reader = self._writer = None
+                self._read_response_task = None
+                self._connected = False
+                _LOGGER.debug("Session closed")
+
+    async def handle_frame(self, plaintext):
+        """Decode a decrypted frame from the machine and pass on what changed.  Captures are replayed from here too."""
+        if self._capture:
+            self._capture.record(RECEIVED, plaintext, self._clock.time())
+
+        msg = plaintext[1:9]
+        if self._is_repeat(plaintext):
+            """Nothing changed, so there's nothing to decode or tell the entities about."""
+            self.frames_skipped += 1
+            if msg in self._responses_waiting:
+                self._responses_waiting.remove(msg)
+        else:
+            self.frames_decoded += 1
+            if await self.process_data(plaintext) and plaintext[0] == Msg.READ:
+                self._last_frames[msg] = plaintext
+                if msg == DRINK_STATS:
+                    self._count_shots()
+
+            """Entity writes are batched per poll cycle, so there's no need to coalesce here."""
+            self._call_callbacks()
+
+        """Replies are matched to requests by message, whatever order they arrive in."""
+        self._cycle_received.add(msg)
+        if not self._responses_waiting:
+            self._cycle_done.set()
+
+    def _count_shots(self):
+        """Fire an event for each shot pulled since the last drink counters and add them to the throughput."""
+        shots = self._shots.detect(self._current_status)
+        for key in shots:
+            _LOGGER.debug(f"Shot detected on {key}")
+            self._hass.bus.async_fire(
+                EVENT_SHOT,
+                {
+                    SERIAL_NUMBER: self.serial_number,
+                    MACHINE_NAME: self.machine_name,
+                    "key": key,
+                    TEMP_COFFEE: self._current_status.get(TEMP_COFFEE),
+                },
+            )
+
+        if shots:
+            self._throughput.add(shots, self._clock.time())
+            if self._shot_store:
+                self._shot_store.async_delay_save(
+                    self._throughput.as_dict, STORAGE_SAVE_DELAY
+                )
+
+    async def _populate_items(self, data, cur_msg):
+        """Decode a response with its precompiled layout, leaving frames that don't fit it to lmdirect."""
+        layout = LAYOUTS.get((cur_msg.msg_type, cur_msg.msg))
+        if layout is not None:
+            try:
+                decode(self, layout, data)
+                return
+            except (ValueError, struct.error) as err:
+                _LOGGER.debug(f"Response {cur_msg.msg} doesn't fit its layout: {err}")
+
+        await super()._populate_items(data, cur_msg)
+
+    def _is_repeat(self, plaintext):
+        """Return true if a reply is identical to the last one for the same message."""
+        msg = plaintext[1:9]
+        return (
+            plaintext[0] == Msg.READ
+            and self._last_frames.get(msg) == plaintext
+            and not any(MSGS[x[0]].msg == msg for x in self._raw_callback_list)
+        )
+
+    async def _send_msg(self, msg_id, *args, **kwargs):
+        """Send a message, noting the status blocks to read back if it's a write.
+
+        Those blocks are also due on the next poll, in case the read back
+        gets no reply.
+        """
+        await super()._send_msg(msg_id, *args, **kwargs)
+        blocks = READBACK.get(msg_id, [])
+        self._readback.update(blocks)
+        self._refresh.invalidate(blocks)
+
+    async def _send_raw_msg(self, msg, msg_type, data=None, base=None):
+        """Encrypt one frame and queue it to be sent, or hold it if a poll cycle is being pipelined."""
+
+        def checksum(buffer):
+            """Compute check byte."""
+            buffer = bytes(buffer, "utf-8")
+            return "%0.2X" % (sum(buffer) % 256)
+
+        """Prevent race conditions - can be called from different tasks."""
+        async with self._lock:
+            if not await self._connect():
+                raise LMConnectionFail("Connection failed.")
+
+            """If a key was provided, replace the second byte of the message."""
+            msg_to_send = msg if not base else msg[:2] + base + msg[4:]
+
+            plaintext = msg_type + msg_to_send
+            if data is not None:
+                plaintext += data
+            plaintext += checksum(plaintext)
+            if self._capture:
+                self._capture.record(SENT, plaintext, self._clock.time())
+
+            loop = asyncio.get_running_loop()
+            fn = partial(self._cipher.encrypt, plaintext)
+            frame = b"@" + await loop.run_in_executor(None, fn) + b"%"
+
+        """Remember that we're waiting for a response before the machine can send it."""
+        self._responses_waiting.append(msg_to_send)
+
+        """Commands sent while a poll cycle is being gathered go ahead of it rather than with it."""
+        if self._pipeline is not None and send_priority.get() == PRIORITY_POLL:
+            self._pipeline.append(frame)
+            return
+
+        try:
+            await self._queue.put([frame])
+        except Exception:
+            self._responses_waiting.remove(msg_to_send)
+            raise
+
+    async def _flush_pipeline(self):
+        """Queue the held frames of the poll cycle to be sent in one write."""
+        frames, self._pipeline = self._pipeline, None
+        if frames:
+            await self._queue.put(frames, PRIORITY_POLL)
+
+    async def _write_frames(self, frames):
+        """Send frames from the command queue in one write."""
+        if not self._session.is_open:
+            raise LMConnectionFail("Session closed before the frames were sent.")
+        self._writer.write(b"".join(frames))
+        await self._writer.drain()
+        self._start_time = datetime.now()
+
+    async def request_status(self, msg_ids=None, priority=PRIORITY_POLL):
+        """Send the reads that are due, or the ones given, back-to-back and wait for the replies.
+
+        The cycle is done once a reply to every request has arrived, in any
+        order, or when POLL_CYCLE_DEADLINE passes.
+        """
+        if msg_ids is None:
+            msg_ids = self._refresh.due()
+        _LOGGER.debug(f"Requesting status: {msg_ids}")
+        self._cycle_received = set()
+        self._pipeline = []
+
+        token = send_priority.set(priority)
+        try:
+            await asyncio.gather(*[self._send_msg(msg) for msg in msg_ids])
+            await self._flush_pipeline()
+        finally:
+            self._pipeline = None
+            send_priority.reset(token)
+
+        try:
+            await self._wait_for_cycle(Msg.GET_STATUS in msg_ids)
+        finally:
+            self._refresh.refreshed(
+                x for x in msg_ids if MSGS[x].msg in self._cycle_received
+            )
+
+            """The last replies may have been skipped, so write whatever changed before them."""
+            self._write_states()
+
+        _LOGGER.debug(
+            f"Frames decoded: {self.frames_decoded}, skipped as unchanged: {self.frames_skipped}"
+        )
+
+    async def _wait_for_cycle(self, temps_expected=True):
+        """Wait until every reply of the cycle is in or the deadline passes."""
+
+        """Nothing went out, or everything already came back."""
+        if not self._responses_waiting:
+            return
+
+        """Also wait for the current temps after a status request, unless they already arrived."""
+        if temps_expected and TEMP_REPORT not in self._cycle_received:
+            self._responses_waiting.append(TEMP_REPORT)
+
+        self._cycle_done.clear()
+        try:
+            await asyncio.wait_for(self._cycle_done.wait(), timeout=POLL_CYCLE_DEADLINE)
+        except asyncio.TimeoutError:
+            _LOGGER.debug(f"Poll cycle deadline passed, still waiting for {self._responses_waiting}")
+
+    async def read_back(self):
+        """Re-read the status blocks that commands wrote to, to confirm or roll back the optimistic values.
+
+        lmdirect keeps a written value in place of what the machine reports
+        until the two match.  By now the machine has had time to apply the
+        write, so that's dropped and whatever it reports wins.
+        """
+        msg_ids, self._readback = sorted(self._readback), set()
+        released = {}
+        for msg_id in msg_ids:
+            msg = MSGS[msg_id]
+            self._last_frames.pop(msg.msg, None)
+            for key in status_keys(LAYOUTS[(msg.msg_type, msg.msg)]):
+                if key in self._temp_state:
+                    released[key] = (msg.msg, self._temp_state.pop(key))
+
+        await self.request_status(msg_ids, PRIORITY_READBACK)
+
+        for key, (msg, value) in released.items():
+            if msg not in self._cycle_received:
+                """No reply, so keep showing the written value until the next poll."""
+                self._temp_state.setdefault(key, value)
+            elif self._current_status.get(key) != value:
+                _LOGGER.warning(
+                    f"The machine reports {key} as {self._current_status.get(key)} rather than the {value} written"
+                )
+
+    def refresh(self):
+        """Read everything from the machine on the next poll, and poll now."""
+        self._refresh.invalidate()
+        self._last_frames.clear()
+        if self._scheduler:
+            self._scheduler.expedite(self, 0)
+
+    async def _close(self):
+        """Close the session."""
+        self._session.close()
+        await super()._close()
+
+    def _reject_key(self):
+        """The machine sent something the saved key can't decrypt.  Called from an executor thread."""
+        self._key_rejected = True
+
     async def connect(self):
         """Connect to the machine."""
 
         try:
-            return await super().connect()
+            machine_info = await super().connect()
         except LMAuthFail:
             raise AuthFail
         except LMConnectionFail:
             raise ConnectionFail
 
-    async def fetch_data(self):
-        """Loop that periodically polls the machine for new data."""
-        while self._run:
-            _LOGGER.debug("Fetching data")
-            try:
+        self._resolve_profile()
+        return machine_info
+
+    async def poll(self):
+        """Poll the machine once and return the delay until the next poll."""
+        _LOGGER.debug("Fetching data")
+
+        if self._key_rejected and self._initialized_machine_info:
+            _LOGGER.warning("The machine rejected the saved key, retrieving it from the cloud")
+            await self._close()
+            self._initialized_machine_info = False
+
+        """A session that swallowed the last requests without a reply is half-open."""
+        if self._session.unresponsive(self._start_time):
+            _LOGGER.warning("No response from the machine, reconnecting")
+            await self._close()
+
+        """Back off from a machine that isn't answering, and probe it once the backoff has passed."""
+        if not self._breaker.allow():
+            return self._breaker.retry_in()
+
+        """Only wait for responses to this cycle's requests."""
+        self._responses_waiting = []
+        self._cycle_received = set()
+        decoded, skipped = self.frames_decoded, self.frames_skipped
+
+        try:
+            if self._readback:
+                """Confirm the last commands first, and catch up with the rest on the next poll."""
+                await self.read_back()
+            else:
                 """Request latest status."""
                 await self.request_status()
-            except Exception as err:
-                _LOGGER.error(f"Caught exception: {err}")
-            await asyncio.sleep(POLLING_INTERVAL)
-        _LOGGER.error(f"Exiting polling task: {self._run}")
+        except Exception as err:
+            _LOGGER.debug(f"Poll failed: {err}")
+
+        if self._cycle_received:
+            if self._breaker.record_success():
+                _LOGGER.info("Machine is reachable again")
+                self._write_all_states()
+        elif self._breaker.record_failure():
+            _LOGGER.warning(
+                f"Machine not responding, retrying in {self._breaker.backoff}s and backing off up to {self._breaker.cap}s"
+            )
+            await self._close()
+            self._write_all_states()
+        elif self._breaker.is_open:
+            _LOGGER.debug(f"Probe failed, next one in {self._breaker.backoff}s")
+
+        """Keep a sample of the temperatures from every poll that got a reply."""
+        if self._cycle_received:
+            self.history.record(self._current_status, self._clock.time())
+
+            """Shots age out of the throughput windows even when no new ones are pulled."""
+            self._current_status.update(self._throughput.status(self._clock.time()))
+            self._call_callbacks()
+
+        interval = (
+            self._breaker.backoff
+            if self._breaker.is_open
+            else self._interval.next_interval(self._current_status)
+        )
+        self._current_status[POLL_INTERVAL] = interval
+        (
+            self._current_status[QUEUE_DEPTH],
+            self._current_status[QUEUE_WAIT],
+        ) = self._queue.pop_stats()
+
+        """How many replies this poll decoded, and how many it skipped as unchanged."""
+        self._current_status[FRAMES_DECODED] = self.frames_decoded - decoded
+        self._current_status[FRAMES_SKIPPED] = self.frames_skipped - skipped
+
+        if self._capture and self._capture.pending:
+            await self._hass.async_add_executor_job(self._capture.flush)
+
+        _LOGGER.debug(f"Next poll in {interval}s")
+        return interval
+
+
+class KeyCheckingCipher(AESCipher):
+    """Decrypt responses, reporting frames that can't be decrypted with the key."""
+
+    def __init__(self, key, on_failure):
+        """Initialize the cipher."""
+        super().__init__(key)
+        self._on_failure = on_failure
+
+    def decrypt(self, b64text):
+        """Return the plaintext, or nothing if the key doesn't match."""
+        try:
+            return super().decrypt(b64text)
+        except ValueError as err:
+            _LOGGER.debug(f"Could not decrypt response: {err}")
+            self._on_failure()
+            return None
 
 
 class AuthFail(Exception):
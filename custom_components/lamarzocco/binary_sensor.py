@@ -19,10 +19,11 @@ from .const import (
     MODEL_GS3_AV,
     MODEL_GS3_MP,
     MODEL_LM,
+    PLATFORM_BINARY_SENSOR,
     TYPE_WATER_RESERVOIR_CONTACT,
     WATER_RESERVOIR_CONTACT,
 )
-from .entity_base import EntityBase
+from .entity_base import EntityBase, compile_entities
 from .services import async_setup_entity_services
 
 _LOGGER = logging.getLogger(__name__)
@@ -48,9 +49,8 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
     lm = hass.data[DOMAIN][config_entry.entry_id]
 
     async_add_entities(
-        LaMarzoccoBinarySensor(lm, sensor_type, hass, config_entry)
-        for sensor_type in ENTITIES
-        if lm.model_name in ENTITIES[sensor_type][ENTITY_MAP]
+        LaMarzoccoBinarySensor(lm, descriptor, hass, config_entry)
+        for descriptor in compile_entities(lm, PLATFORM_BINARY_SENSOR, ENTITIES)
     )
 
     await async_setup_entity_services(lm)
@@ -59,30 +59,21 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
 class LaMarzoccoBinarySensor(EntityBase, BinarySensorEntity):
     """Binary Sensor representing espresso machine water reservoir status."""
 
-    def __init__(self, lm, sensor_type, hass, config_entry):
+    def __init__(self, lm, descriptor, hass, config_entry):
         """Initialize binary sensors"""
-        self._object_id = sensor_type
-        self._lm = lm
-        self._entities = ENTITIES
-        self._hass = hass
-        self._entity_type = self._entities[self._object_id][ENTITY_TYPE]
-
-        self._lm.register_callback(self.update_callback)
+        self._init_entity(lm, descriptor, hass)
 
     @property
     def available(self):
         """Return if binary sensor is available."""
-        entity = self._entities[self._object_id][ENTITY_TAG]
-        return self._lm.current_status.get(self._get_key(entity)) is not None
+        return super().available and self._lm.current_status.get(self._desc.key) is not None
 
     @property
     def is_on(self) -> bool:
         """Return true if the binary sensor is on."""
-        return not self._lm.current_status.get(
-            self._get_key(self._entities[self._object_id][ENTITY_TAG])
-        )
+        return not self._lm.current_status.get(self._desc.key)
 
     @property
     def device_class(self):
         """Device class for binary sensor"""
-        return self._entities[self._object_id][ENTITY_CLASS]
+        return self._desc.device_class
@@ -0,0 +1,86 @@
+"""Circuit breaker for La Marzocco espresso machines that can't be reached."""
+
+import logging
+
+from .clock import REAL_CLOCK
+from .const import BACKOFF_BASE, BACKOFF_CAP, BREAKER_THRESHOLD
+
+_LOGGER = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stop trying a machine that keeps failing, and probe it less and less often.
+
+    After BREAKER_THRESHOLD polls in a row fail, the circuit opens: nothing
+    is sent until the backoff has passed, and then a single poll goes out as
+    a probe.  If the probe fails too, the backoff doubles, up to a cap; if it
+    succeeds, the circuit closes.  The scheduler jitters every interval, so
+    machines that dropped off together don't probe together.  reset()
+    closes the circuit right away, for when the machine announces itself
+    again.
+    """
+
+    def __init__(
+        self,
+        threshold=BREAKER_THRESHOLD,
+        base=BACKOFF_BASE,
+        cap=BACKOFF_CAP,
+        clock=REAL_CLOCK,
+    ):
+        """Initialize a closed circuit."""
+        self.threshold = threshold
+        self.base = base
+        self.cap = cap
+        self._clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.backoff = 0
+        self._retry_at = None
+
+    @property
+    def is_open(self):
+        """Return true unless the machine is known to be reachable."""
+        return self.state != CLOSED
+
+    def retry_in(self):
+        """Return the seconds until the next probe may go out."""
+        if self._retry_at is None:
+            return 0
+        return max(0, self._retry_at - self._clock.monotonic())
+
+    def allow(self):
+        """Return true if a request may go out now, turning an open circuit whose backoff has passed half-open."""
+        if self.state == OPEN and self.retry_in() == 0:
+            self.state = HALF_OPEN
+        return self.state != OPEN
+
+    def record_success(self):
+        """Close the circuit.  Returns true if it was open."""
+        was_open = self.is_open
+        self.state = CLOSED
+        self.failures = 0
+        self.backoff = 0
+        self._retry_at = None
+        return was_open
+
+    def record_failure(self):
+        """Count a failure, opening the circuit or doubling its backoff.  Returns true if the circuit just opened."""
+        self.failures += 1
+        if self.failures < self.threshold:
+            return False
+
+        was_open = self.is_open
+        self.backoff = min(self.cap, self.base * 2 ** (self.failures - self.threshold))
+        self._retry_at = self._clock.monotonic() + self.backoff
+        self.state = OPEN
+        return not was_open
+
+    def reset(self):
+        """Allow requests again right away, without forgetting that the machine was unreachable."""
+        if self.state == OPEN:
+            self.state = HALF_OPEN
+            self._retry_at = None
@@ -14,8 +14,9 @@ from .const import (
     TYPE_START_BACKFLUSH,
     MODEL_GS3_AV,
     MODEL_LM,
+    PLATFORM_BUTTON,
 )
-from .entity_base import EntityBase
+from .entity_base import EntityBase, compile_entities
 from .services import async_setup_entity_services, call_service
 
 _LOGGER = logging.getLogger(__name__)
@@ -39,9 +40,8 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
 
     lm = hass.data[DOMAIN][config_entry.entry_id]
     async_add_entities(
-        LaMarzoccoButton(lm, button_type, hass)
-        for button_type in ENTITIES
-        if lm.model_name in ENTITIES[button_type][ENTITY_MAP]
+        LaMarzoccoButton(lm, descriptor, hass)
+        for descriptor in compile_entities(lm, PLATFORM_BUTTON, ENTITIES)
     )
 
     await async_setup_entity_services(lm)
@@ -50,16 +50,10 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
 class LaMarzoccoButton(EntityBase, ButtonEntity):
     """Button supporting backflush."""
 
-    def __init__(self, lm, button_type, hass):
+    def __init__(self, lm, descriptor, hass):
         """Initialise buttons."""
-        self._object_id = button_type
-        self._hass = hass
-        self._lm = lm
-        self._entities = ENTITIES
-        self._entity_type = self._entities[self._object_id][ENTITY_TYPE]
+        self._init_entity(lm, descriptor, hass)
 
     async def async_press(self, **kwargs) -> None:
         """Press button."""
-        await call_service(
-            getattr(self._lm, self._entities[self._object_id][ENTITY_FUNC])
-        )
+        await call_service(self._desc.func)
@@ -0,0 +1,109 @@
+"""Capture and replay of the raw frames exchanged with a La Marzocco espresso machine."""
+
+import asyncio
+import logging
+import os
+import time
+
+from .const import CAPTURE_BACKUPS, CAPTURE_MAX_BYTES
+
+_LOGGER = logging.getLogger(__name__)
+
+"""Direction markers: frames sent to the machine and frames received from it."""
+SENT = ">"
+RECEIVED = "<"
+
+
+class FrameCapture:
+    """Append timestamped plaintext frames to a file that rotates when it gets too big.
+
+    Each frame is one line: the time in seconds, the direction and the
+    decrypted frame, so a capture can be read with grep as well as replayed.
+    Frames are buffered in memory and written by flush(), which does file
+    I/O and so runs in the executor, once per poll.  When the file reaches
+    max_bytes it's renamed to .1, .1 to .2 and so on, keeping backups old
+    files.
+    """
+
+    def __init__(self, path, max_bytes=CAPTURE_MAX_BYTES, backups=CAPTURE_BACKUPS):
+        """Initialize the capture."""
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lines = []
+
+    @property
+    def pending(self):
+        """Return the number of frames waiting to be written."""
+        return len(self._lines)
+
+    def record(self, direction, plaintext, now=None):
+        """Buffer a frame."""
+        now = time.time() if now is None else now
+        self._lines.append(f"{now:.3f} {direction} {plaintext}\n")
+
+    def flush(self):
+        """Write the buffered frames, rotating the file first if it's full."""
+        lines, self._lines = self._lines, []
+        if not lines:
+            return
+
+        try:
+            if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+                self._rotate()
+            with open(self.path, "a", encoding="ascii") as file:
+                file.writelines(lines)
+        except OSError as err:
+            _LOGGER.warning(f"Could not write to {self.path}: {err}")
+
+    def _rotate(self):
+        for index in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{index}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{index + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+def read_capture(path):
+    """Return the frames in a capture file as (time, direction, plaintext), skipping lines that don't parse."""
+    frames = []
+    with open(path, encoding="ascii") as file:
+        for line in file:
+            try:
+                timestamp, direction, plaintext = line.split()
+                frames.append((float(timestamp), direction, plaintext))
+            except ValueError:
+                _LOGGER.debug(f"Skipping capture line: {line!r}")
+    return frames
+
+
+async def replay(lm, frames, speed=1):
+    """Feed captured frames through a machine's decode and update path and return how many were received.
+
+    Frames are played back at the captured pace divided by speed, or as
+    fast as possible if speed is None.  Sent frames aren't sent anywhere:
+    they only mark replies as expected, the way a poll does, so that entity
+    writes are batched per poll cycle as they were when the capture was
+    made.
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    first = frames[0][0] if frames else 0
+    received = 0
+
+    for timestamp, direction, plaintext in frames:
+        if speed:
+            delay = start + (timestamp - first) / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        if direction == SENT:
+            lm._responses_waiting.append(plaintext[1:9])
+        elif direction == RECEIVED:
+            await lm.handle_frame(plaintext)
+            received += 1
+
+    return received
@@ -0,0 +1,135 @@
+"""Time sources for polling and scheduling La Marzocco espresso machines."""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+from .const import DOMAIN, SETTLE_INTERVAL
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_CLOCK = f"{DOMAIN}_clock"
+
+
+class Clock:
+    """Real time.
+
+    The poll scheduler, the adaptive interval, the refresh schedule, the
+    command queue's spacing and the timestamps of temperature samples and
+    shots all read the time and sleep through a clock, so that a test
+    harness can swap in a VirtualClock.
+    """
+
+    def time(self):
+        """Return the wall clock time in seconds since the epoch."""
+        return time.time()
+
+    def monotonic(self):
+        """Return a time in seconds that only moves forward, for measuring intervals."""
+        return time.monotonic()
+
+    async def sleep(self, delay):
+        """Sleep for delay seconds."""
+        await asyncio.sleep(delay)
+
+    async def wait(self, event, timeout):
+        """Wait until an event is set or timeout seconds have passed."""
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+REAL_CLOCK = Clock()
+
+
+def get_clock(hass):
+    """Return the clock injected for the La Marzocco integration, or real time."""
+    return hass.data.get(DATA_CLOCK, REAL_CLOCK) if hass else REAL_CLOCK
+
+
+class VirtualClock(Clock):
+    """Simulated time that only moves when the harness runs it.
+
+    Sleeping on the clock waits until run() reaches the deadline, which it
+    does by jumping from one deadline to the next instead of waiting, so a
+    day of polling passes as fast as the polls themselves.  Between jumps,
+    run() lets everything that's ready run and holds time still for as long
+    as busy() is true, so a poll waiting on the network finishes at the same
+    simulated time it started, as it would in real time.
+    """
+
+    def __init__(self, start=None):
+        """Initialize the clock at a wall clock time, now by default."""
+        self._epoch = time.time() if start is None else start
+        self._now = 0.0
+        self._sleepers = []
+        self._seq = itertools.count()
+
+    def time(self):
+        """Return the simulated wall clock time."""
+        return self._epoch + self._now
+
+    def monotonic(self):
+        """Return the simulated seconds since the clock was created."""
+        return self._now
+
+    def _alarm(self, delay):
+        """Return a future that run() resolves once it reaches delay seconds from now."""
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._sleepers, (self._now + delay, next(self._seq), future))
+        return future
+
+    async def sleep(self, delay):
+        """Sleep until the clock has been run delay seconds forward."""
+        if delay <= 0:
+            await asyncio.sleep(0)
+            return
+        await self._alarm(delay)
+
+    async def wait(self, event, timeout):
+        """Wait until an event is set or the clock has been run timeout seconds forward."""
+        waiters = [self._alarm(timeout), asyncio.ensure_future(event.wait())]
+        try:
+            await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            [x.cancel() for x in waiters]
+
+    @property
+    def next_deadline(self):
+        """Return the earliest time anything sleeps until, or None if nothing is sleeping."""
+        while self._sleepers and self._sleepers[0][2].done():
+            heapq.heappop(self._sleepers)
+        return self._sleepers[0][0] if self._sleepers else None
+
+    async def _settle(self, busy):
+        """Let everything that's ready run, and wait in real time while busy() is true.
+
+        A real sleep, however short, lets the loop run every callback that
+        becomes ready along the way, so a woken task gets as far as it can.
+        """
+        await asyncio.sleep(SETTLE_INTERVAL)
+        while busy():
+            await asyncio.sleep(SETTLE_INTERVAL)
+            if not busy():
+                """Let whatever the finished work woke up run too."""
+                await asyncio.sleep(SETTLE_INTERVAL)
+
+    async def run(self, seconds, busy=lambda: False):
+        """Move the clock seconds forward, waking each sleeper at its deadline in order."""
+        end = self._now + seconds
+        while True:
+            await self._settle(busy)
+            deadline = self.next_deadline
+            if deadline is None or deadline > end:
+                break
+
+            self._now = max(self._now, deadline)
+            while self._sleepers and self._sleepers[0][0] <= self._now:
+                _, _, future = heapq.heappop(self._sleepers)
+                if not future.done():
+                    future.set_result(None)
+
+        self._now = end
@@ -0,0 +1,114 @@
+"""La Marzocco cloud access for machine keys and details."""
+
+import logging
+import time
+
+from authlib.integrations.base_client.errors import OAuthError
+from authlib.integrations.httpx_client import AsyncOAuth2Client
+from lmdirect.connection import AuthFail
+from lmdirect.const import (
+    CLIENT_ID,
+    CLIENT_SECRET,
+    CUSTOMER_URL,
+    DRINK_COUNTER_URL,
+    KEY,
+    MACHINE_NAME,
+    MODEL_NAME,
+    PASSWORD,
+    SERIAL_NUMBER,
+    TOKEN_URL,
+    UPDATE_URL,
+    USERNAME,
+)
+from lmdirect.msgs import DRINK_OFFSET_MAP, GATEWAY_DRINK_MAP
+
+from .const import TOKEN_EXPIRY_MARGIN
+from .entity_base import get_key
+
+_LOGGER = logging.getLogger(__name__)
+
+"""Machine details that only the cloud can provide."""
+CLOUD_MACHINE_INFO = [KEY, SERIAL_NUMBER, MACHINE_NAME, MODEL_NAME]
+
+
+def offsets_missing(current_status):
+    """Return true if any of the drink counter offsets that only the cloud can provide is unknown."""
+    return any(get_key(x) not in current_status for x in DRINK_OFFSET_MAP.values())
+
+
+def token_valid(token):
+    """Return true if a saved access token can still be used."""
+    return bool(token) and token.get("expires_at", 0) > time.time() + TOKEN_EXPIRY_MARGIN
+
+
+async def async_get_machine_info(machine_info, current_status, token=None):
+    """Retrieve the machine key and details from the cloud.
+
+    A saved access token is reused while it's valid, so only an expired token
+    costs a round trip to the token endpoint.  Returns the updated machine
+    info, the token and whether a firmware update is available.
+    """
+    _LOGGER.debug("Retrieving machine info from the cloud")
+    machine_info = dict(machine_info)
+    update_available = None
+
+    async with AsyncOAuth2Client(
+        client_id=machine_info[CLIENT_ID],
+        client_secret=machine_info[CLIENT_SECRET],
+        token_endpoint=TOKEN_URL,
+        token=token if token_valid(token) else None,
+    ) as client:
+
+        if not token_valid(token):
+            headers = {
+                "client_id": machine_info[CLIENT_ID],
+                "client_secret": machine_info[CLIENT_SECRET],
+            }
+
+            try:
+                await client.fetch_token(
+                    url=TOKEN_URL,
+                    username=machine_info[USERNAME],
+                    password=machine_info[PASSWORD],
+                    headers=headers,
+                )
+            except OAuthError as err:
+                raise AuthFail("Authorization failure") from err
+
+        cust_info = await client.get(CUSTOMER_URL)
+        if cust_info:
+            """Pick this machine out of the fleet if we already know which one it is."""
+            fleet = cust_info.json()["data"]["fleet"]
+            machine = next(
+                (
+                    x
+                    for x in fleet
+                    if x["machine"]["serialNumber"] == machine_info.get(SERIAL_NUMBER)
+                ),
+                fleet[0],
+            )
+            machine_info[KEY] = machine["communicationKey"]
+            machine_info[SERIAL_NUMBER] = machine["machine"]["serialNumber"]
+            machine_info[MACHINE_NAME] = machine["name"]
+            machine_info[MODEL_NAME] = machine["machine"]["model"]["name"]
+
+        if offsets_missing(current_status):
+            drink_info = await client.get(
+                DRINK_COUNTER_URL.format(serial_number=machine_info[SERIAL_NUMBER])
+            )
+            if drink_info:
+                data = drink_info.json().get("data")
+                if data:
+                    current_status.update(
+                        {
+                            get_key(GATEWAY_DRINK_MAP[x["coffeeType"]]): x["count"]
+                            for x in data
+                        }
+                    )
+
+        update_info = await client.get(UPDATE_URL)
+        if update_info:
+            data = update_info.json().get("data")
+            update_available = "Yes" if data else "No"
+
+        return machine_info, dict(client.token), update_available
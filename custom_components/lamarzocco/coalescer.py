@@ -0,0 +1,74 @@
+"""Coalesce quick successive writes of the same setting to a La Marzocco espresso machine."""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+
+from .const import WRITE_DEBOUNCE
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class PendingWrite:
+    """The latest value waiting to be written to one setting, and the callers waiting for it."""
+
+    future: asyncio.Future
+    call: tuple = None
+    handle: asyncio.TimerHandle = None
+
+
+class WriteCoalescer:
+    """Write only the last value each setting was given within a short window.
+
+    Dragging a slider or running a script sets the same parameter many
+    times in quick succession.  The first write to a setting opens a
+    WRITE_DEBOUNCE window, later writes within it replace the pending value,
+    and when it closes only the last value is sent.  Every caller that
+    submitted a value in the window gets the result of that one write.
+    """
+
+    def __init__(self, delay=WRITE_DEBOUNCE):
+        """Initialize the coalescer with no pending writes."""
+        self.delay = delay
+        self._pending = {}
+        self._tasks = set()
+
+    async def submit(self, setting, func, /, *args, **kwargs):
+        """Queue a write to a setting and wait for the write that's finally sent."""
+        pending = self._pending.get(setting)
+        if pending is None:
+            loop = asyncio.get_running_loop()
+            pending = self._pending[setting] = PendingWrite(loop.create_future())
+            pending.handle = loop.call_later(self.delay, self._start, setting)
+        else:
+            _LOGGER.debug(f"Replacing the pending write to {setting}")
+        pending.call = (func, args, kwargs)
+
+        """A caller that gives up mustn't cancel the write for the others."""
+        return await asyncio.shield(pending.future)
+
+    def _start(self, setting):
+        task = asyncio.get_running_loop().create_task(self._write(setting))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _write(self, setting):
+        pending = self._pending.pop(setting, None)
+        if pending is None:
+            return
+
+        func, args, kwargs = pending.call
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as err:
+            pending.future.set_exception(err)
+        else:
+            pending.future.set_result(result)
+
+    async def flush(self):
+        """Write everything that's pending now."""
+        for setting in list(self._pending):
+            self._pending[setting].handle.cancel()
+            await self._write(setting)
+        await asyncio.gather(*self._tasks, return_exceptions=True)
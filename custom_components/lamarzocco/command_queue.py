@@ -0,0 +1,111 @@
+"""Prioritized queue for the frames sent to a La Marzocco espresso machine."""
+
+import asyncio
+import heapq
+import itertools
+import logging
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from .clock import REAL_CLOCK
+from .const import SEND_INTERVAL
+
+_LOGGER = logging.getLogger(__name__)
+
+"""Frames are sent in this order: commands, then reads of values just written, then polls."""
+PRIORITY_COMMAND = 0
+PRIORITY_READBACK = 1
+PRIORITY_POLL = 2
+
+"""The priority of the frames sent by the current task.  Anything not marked otherwise is a command."""
+send_priority = ContextVar("send_priority", default=PRIORITY_COMMAND)
+
+
+@dataclass(order=True, slots=True)
+class QueuedFrames:
+    """Frames waiting to be sent in one write, ordered by priority and then by arrival."""
+
+    priority: int
+    seq: int
+    frames: list = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    queued: float = field(compare=False)
+
+
+class CommandQueue:
+    """Send every outbound frame of one machine in priority order, one write at a time.
+
+    A barista's command goes out ahead of anything a poll or a read-back
+    has queued.  Writes are spaced at least SEND_INTERVAL apart so that the
+    controller is never flooded, and the next write is picked only after
+    that gap, so frames queued during it can still overtake.  The deepest
+    the queue got and the longest any frames waited are kept until read
+    with pop_stats().
+
+    The spacing is measured on the clock but waited out in real time: it
+    protects the controller, which a simulated clock can't speed up.
+    """
+
+    def __init__(self, write, interval=SEND_INTERVAL, clock=REAL_CLOCK):
+        """Initialize the queue.  write is a coroutine that sends the frames it's given."""
+        self._write = write
+        self._clock = clock
+        self.interval = interval
+        self._heap = []
+        self._seq = itertools.count()
+        self._task = None
+        self._last_write = None
+        self._max_depth = 0
+        self._max_wait = 0
+
+    @property
+    def depth(self):
+        """Return the number of writes waiting to be sent."""
+        return len(self._heap)
+
+    async def put(self, frames, priority=None):
+        """Queue frames to be sent in one write and wait until they have been."""
+        loop = asyncio.get_running_loop()
+        item = QueuedFrames(
+            priority=send_priority.get() if priority is None else priority,
+            seq=next(self._seq),
+            frames=frames,
+            future=loop.create_future(),
+            queued=self._clock.monotonic(),
+        )
+        heapq.heappush(self._heap, item)
+        self._max_depth = max(self._max_depth, len(self._heap))
+
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run(), name="Command Queue")
+
+        await item.future
+
+    async def _run(self):
+        while self._heap:
+            if self._last_write is not None:
+                delay = self._last_write + self.interval - self._clock.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            item = heapq.heappop(self._heap)
+            if item.future.done():
+                continue
+
+            self._max_wait = max(
+                self._max_wait, self._clock.monotonic() - item.queued
+            )
+            try:
+                await self._write(item.frames)
+            except Exception as err:
+                item.future.set_exception(err)
+            else:
+                item.future.set_result(None)
+            self._last_write = self._clock.monotonic()
+
+    def pop_stats(self):
+        """Return the deepest the queue got and the longest wait in seconds since the last call."""
+        stats = (self._max_depth, round(self._max_wait, 3))
+        self._max_depth = len(self._heap)
+        self._max_wait = 0
+        return stats
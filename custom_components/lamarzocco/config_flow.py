@@ -5,13 +5,19 @@ from typing import Any, Dict
 import voluptuous as vol
 from homeassistant import config_entries, core, exceptions
 from homeassistant.const import CONF_HOST, CONF_PASSWORD, CONF_PORT, CONF_USERNAME
+from homeassistant.core import callback
 from homeassistant.helpers import config_validation as cv
 
 from .api import LaMarzocco, AuthFail, ConnectionFail
 from .const import (
+    CONF_CAPTURE,
     CONF_CLIENT_ID,
     CONF_CLIENT_SECRET,
+    CONF_MAX_INTERVAL,
+    CONF_MIN_INTERVAL,
     CONF_SERIAL_NUMBER,
+    DEFAULT_MAX_INTERVAL,
+    DEFAULT_MIN_INTERVAL,
     DEFAULT_PORT,
     DOMAIN,
 )
@@ -63,8 +69,19 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     CONNECTION_CLASS = config_entries.CONN_CLASS_LOCAL_POLL
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Return the options flow for this handler."""
+        return OptionsFlowHandler(config_entry)
+
     async def _try_create_entry(self, data):
         machine_info = await validate_input(self.hass, data)
+
+        """Each machine gets its own entry, identified by its serial number."""
+        await self.async_set_unique_id(
+            machine_info[CONF_SERIAL_NUMBER], raise_on_progress=False
+        )
         self._abort_if_unique_id_configured()
         return self.async_create_entry(
             title=machine_info["title"], data={**data, **machine_info}
@@ -72,10 +89,6 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     async def async_step_user(self, user_input=None):
         """Handle the initial step."""
-        if self._async_current_entries():
-            # Config entry already exists, only one allowed.
-            return self.async_abort(reason="single_instance_allowed")
-
         errors = {}
 
         if user_input is not None:
@@ -120,8 +133,18 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
         _LOGGER.debug(f"Host={host}, Port={port}, SN={serial_number}")
 
-        await self.async_set_unique_id(serial_number)
-        self._abort_if_unique_id_configured({CONF_SERIAL_NUMBER: serial_number})
+        entry = await self.async_set_unique_id(serial_number)
+
+        """A machine we already know came back, so stop backing off from it."""
+        lm = self.hass.data.get(DOMAIN, {}).get(entry.entry_id) if entry else None
+        if lm:
+            await lm.announced(host, port)
+
+        """Save the address in case the machine moved.  A running machine already switched to it, so only reload one that isn't."""
+        self._abort_if_unique_id_configured(
+            {CONF_SERIAL_NUMBER: serial_number, CONF_HOST: host, CONF_PORT: port},
+            reload_on_update=lm is None,
+        )
 
         self.context.update({"title_placeholders": self._discovered})
 
@@ -152,6 +175,45 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         )
 
 
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle the polling options for La Marzocco."""
+
+    def __init__(self, config_entry):
+        """Initialize the options flow."""
+        self.config_entry = config_entry
+
+    async def async_step_init(self, user_input=None):
+        """Manage the adaptive polling bounds and frame capture."""
+        errors = {}
+
+        if user_input is not None:
+            if user_input[CONF_MIN_INTERVAL] > user_input[CONF_MAX_INTERVAL]:
+                errors["base"] = "invalid_interval"
+            else:
+                return self.async_create_entry(title="", data=user_input)
+
+        options = self.config_entry.options
+        data_schema = vol.Schema(
+            {
+                vol.Required(
+                    CONF_MIN_INTERVAL,
+                    default=options.get(CONF_MIN_INTERVAL, DEFAULT_MIN_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=3600)),
+                vol.Required(
+                    CONF_MAX_INTERVAL,
+                    default=options.get(CONF_MAX_INTERVAL, DEFAULT_MAX_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=3600)),
+                vol.Required(
+                    CONF_CAPTURE, default=options.get(CONF_CAPTURE, False)
+                ): bool,
+            }
+        )
+
+        return self.async_show_form(
+            step_id="init", data_schema=data_schema, errors=errors
+        )
+
+
 class CannotConnect(exceptions.HomeAssistantError):
     """Error to indicate we cannot connect."""
 
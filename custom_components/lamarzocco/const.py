@@ -5,16 +5,128 @@ from lmdirect.msgs import *
 
 DOMAIN = "lamarzocco"
 
-"""Set polling interval at 20s."""
+"""Set polling interval at 30s while the machine is on and idle."""
 POLLING_INTERVAL = 30
 
+"""Adaptive polling bounds, configurable through the options flow."""
+DEFAULT_MIN_INTERVAL = 5
+DEFAULT_MAX_INTERVAL = 60
+
+"""Keep polling quickly for this long after a user command."""
+COMMAND_ACTIVITY_WINDOW = 60
+
+"""Limit how many machines are polled at the same time."""
+MAX_POLLS_IN_FLIGHT = 4
+
+"""Randomly stretch or shrink each polling interval by up to 10%."""
+POLL_JITTER = 0.1
+
+"""Spread the first poll of each newly added machine by this many seconds per machine."""
+STARTUP_STAGGER = 0.5
+
+"""Local session timing, in seconds."""
+CONNECT_TIMEOUT = 3
+SESSION_RESPONSE_TIMEOUT = 5
+
+"""Keep the session open across the fast poll intervals but not the idle and standby ones, so the mobile app can connect in between."""
+SESSION_IDLE_TIMEOUT = 20
+
+"""Probe an idle connection after 10s and give up after 3 unanswered probes 5s apart."""
+KEEPALIVE_IDLE = 10
+KEEPALIVE_INTERVAL = 5
+KEEPALIVE_COUNT = 3
+
+REFRESH_CYCLES = "cycles"
+REFRESH_MAX_AGE = "max_age"
+
+"""How often each status read is refreshed, either every so many poll cycles or once its last reply is too many seconds old.  The config holds the power switch and the setpoints, so it's read every cycle."""
+STATUS_REFRESH = {
+    Msg.GET_STATUS: {REFRESH_CYCLES: 1},
+    Msg.GET_CONFIG: {REFRESH_CYCLES: 1},
+    Msg.GET_AUTO_ON_OFF_TIMES: {REFRESH_MAX_AGE: 300},
+    Msg.GET_DRINK_STATS: {REFRESH_CYCLES: 3},
+    Msg.GET_USAGE_STATS: {REFRESH_CYCLES: 3},
+    Msg.GET_FRONT_DISPLAY: {REFRESH_CYCLES: 1},
+    Msg.GET_PREINFUSION_TIMES: {REFRESH_MAX_AGE: 300},
+    Msg.GET_FACTORY_CONFIG: {REFRESH_MAX_AGE: 3600},
+}
+
+SERVICE_REFRESH = "refresh"
+SERVICE_GET_HISTORY = "get_history"
+
+"""Fired for each shot detected from the drink counters."""
+EVENT_SHOT = "lamarzocco_shot"
+
+"""Don't fire more shot events than this for one counter in one poll, e.g. after a long outage."""
+MAX_SHOTS_PER_POLL = 10
+
+"""Sliding windows for the shot throughput sensors: the span in seconds and the number of buckets it's divided into."""
+SHOTS_PER = "shots_per"
+SHOT_WINDOWS = {
+    "hour": (3600, 60),
+    "shift": (8 * 3600, 48),
+    "day": (24 * 3600, 96),
+}
+
+"""Temperature samples kept per machine, one per poll: at least 2.8 hours at the fastest polling rate."""
+HISTORY_SIZE = 2048
+
+"""Give up waiting for the rest of a poll cycle's replies after this many seconds."""
+POLL_CYCLE_DEADLINE = 10
+
+"""Wait this long for further changes to the same setting before writing it to the machine."""
+WRITE_DEBOUNCE = 0.3
+
+"""Give the machine this many seconds to apply a write before reading back the status blocks that hold the value."""
+READBACK_SETTLE = 1
+
+"""The status blocks read back after each write."""
+READBACK = {
+    Msg.SET_POWER: [Msg.GET_CONFIG],
+    Msg.SET_COFFEE_TEMP: [Msg.GET_CONFIG],
+    Msg.SET_STEAM_TEMP: [Msg.GET_CONFIG],
+    Msg.SET_DOSE: [Msg.GET_CONFIG],
+    Msg.SET_DOSE_HOT_WATER: [Msg.GET_CONFIG],
+    Msg.SET_PREBREW_TIMES: [Msg.GET_CONFIG],
+    Msg.SET_PREBREWING_ENABLE: [Msg.GET_CONFIG, Msg.GET_PREINFUSION_TIMES],
+    Msg.SET_PREINFUSION_TIME: [Msg.GET_PREINFUSION_TIMES],
+    Msg.SET_AUTO_ON_OFF_ENABLE: [Msg.GET_AUTO_ON_OFF_TIMES],
+    Msg.SET_AUTO_ON_OFF_TIMES: [Msg.GET_AUTO_ON_OFF_TIMES],
+    Msg.SET_STEAM_BOILER_ENABLE: [Msg.GET_STATUS],
+}
+
+"""Leave at least this many seconds between writes to the machine so that its controller isn't flooded."""
+SEND_INTERVAL = 0.05
+
+"""Write entity states this long after the first update of a poll cycle if not all responses arrived."""
+STATE_WRITE_DELAY = 1
+
+"""Polls in a row that must fail before a machine is considered unreachable, and the backoff between probes after that: doubled on each failed probe, up to the cap."""
+BREAKER_THRESHOLD = 3
+BACKOFF_BASE = 30
+BACKOFF_CAP = 900
+
+"""While a simulated clock is held still for a poll to finish, check on it this often in real seconds."""
+SETTLE_INTERVAL = 0.001
+
+"""Raw frame captures: the size at which a capture file is rotated, and the number of old files kept."""
+CAPTURE_MAX_BYTES = 1_000_000
+CAPTURE_BACKUPS = 2
+
+"""A boiler this far below its setpoint is considered to be heating up."""
+HEAT_UP_MARGIN = 2
+
 """Configuration parameters"""
 CONF_SERIAL_NUMBER = "serial_number"
 CONF_CLIENT_ID = "client_id"
 CONF_CLIENT_SECRET = "client_secret"
 CONF_KEY = "key"
+CONF_TOKEN = "token"
 CONF_MACHINE_NAME = "machine_name"
 CONF_MODEL_NAME = "model_name"
+CONF_MIN_INTERVAL = "min_interval"
+CONF_MAX_INTERVAL = "max_interval"
+CONF_CAPTURE = "capture"
 
 DEFAULT_PORT = 1774
 
@@ -23,10 +135,39 @@ DEFAULT_NAME = "Espresso Machine"
 SCHEMA = "schema"
 MODELS_SUPPORTED = "supported"
 FUNC = "func"
+SUPPORTS_RESPONSE = "supports_response"
 
 SUPPORTED = "supported"
 MODELS = [MODEL_GS3_AV, MODEL_GS3_MP, MODEL_LM]
 
+"""Diagnostic attributes maintained by the integration."""
+POLL_INTERVAL = "poll_interval"
+QUEUE_DEPTH = "queue_depth"
+QUEUE_WAIT = "queue_wait"
+FRAMES_DECODED = "frames_decoded"
+FRAMES_SKIPPED = "frames_skipped"
+STALE = "stale"
+
+"""Treat a saved cloud access token as expired this many seconds early."""
+TOKEN_EXPIRY_MARGIN = 60
+
+"""Status saved between restarts so that entities have values before the first poll."""
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 300
+
+"""Status that only describes the moment it was read, or that commands read and modify, so it's never restored."""
+VOLATILE_KEYS = [
+    POLL_INTERVAL,
+    QUEUE_DEPTH,
+    QUEUE_WAIT,
+    FRAMES_DECODED,
+    FRAMES_SKIPPED,
+    HEATING_STATE,
+    KEY_ACTIVE,
+    CURRENT_PULSE_COUNT,
+    AUTO_BITFIELD,
+]
+
 """List of attributes for each entity based on model."""
 ATTR_MAP_MAIN_GS3_AV = [
     DATE_RECEIVED,
@@ -34,6 +175,11 @@ ATTR_MAP_MAIN_GS3_AV = [
     MODEL_NAME,
     UPDATE_AVAILABLE,
     HEATING_STATE,
+    POLL_INTERVAL,
+    QUEUE_DEPTH,
+    QUEUE_WAIT,
+    FRAMES_DECODED,
+    FRAMES_SKIPPED,
     (DOSE, "k1"),
     (DOSE, "k2"),
     (DOSE, "k3"),
@@ -49,6 +195,11 @@ ATTR_MAP_MAIN_GS3_MP = [
     MODEL_NAME,
     UPDATE_AVAILABLE,
     HEATING_STATE,
+    POLL_INTERVAL,
+    QUEUE_DEPTH,
+    QUEUE_WAIT,
+    FRAMES_DECODED,
+    FRAMES_SKIPPED,
     FRONT_PANEL_DISPLAY,
 ]
 
@@ -58,6 +209,11 @@ ATTR_MAP_MAIN_LM = [
     MODEL_NAME,
     UPDATE_AVAILABLE,
     HEATING_STATE,
+    POLL_INTERVAL,
+    QUEUE_DEPTH,
+    QUEUE_WAIT,
+    FRAMES_DECODED,
+    FRAMES_SKIPPED,
 ]
 
 ATTR_MAP_STEAM_BOILER_ENABLE = [
@@ -173,3 +329,6 @@ ENTITY_UNITS = "units"
 PLATFORM = "platform"
 PLATFORM_SENSOR = "sensor"
 PLATFORM_SWITCH = "switch"
+PLATFORM_BINARY_SENSOR = "binary_sensor"
+PLATFORM_WATER_HEATER = "water_heater"
+PLATFORM_BUTTON = "button"
@@ -0,0 +1,277 @@
+"""Decode machine responses with precompiled struct layouts."""
+
+import logging
+import struct
+from dataclasses import dataclass
+
+from lmdirect.const import CALCULATED_VALUE, DISABLED, ENABLED
+from lmdirect.msgs import (
+    AUTO_BITFIELD,
+    AUTO_BITFIELD_MAP,
+    AUTO_SCHED_MAP,
+    BREW_GROUP_OFFSET,
+    CURRENT_PULSE_COUNT,
+    DAYS_SINCE_BUILT,
+    DIVIDE_KEYS,
+    DRINK_OFFSET_MAP,
+    ENABLE_PREBREWING,
+    ENABLE_PREINFUSION,
+    FACTORY_OFFSET,
+    FIRMWARE_VER,
+    FRONT_PANEL_DISPLAY,
+    HEATING_STATE,
+    HEATING_VALUES,
+    KEY_ACTIVE,
+    MSGS,
+    PREBREW_FLAG,
+    SERIAL_NUMBERS,
+    STEAM_BOILER_ENABLE,
+    T_UNIT,
+    TEMP_COFFEE,
+    TOTAL_COFFEE,
+    TOTAL_COFFEE_ACTIVATIONS,
+    TOTAL_FLUSHING,
+    UNIT_FAHRENHEIT,
+    Elem,
+)
+
+from .entity_base import get_key
+
+_LOGGER = logging.getLogger(__name__)
+
+"""How each field is converted, in the order lmdirect checks for them."""
+RAW = 0
+DIVIDE = 1
+FIRMWARE = 2
+SERIAL = 3
+BITFIELD = 4
+DRINKS = 5
+DAYS = 6
+HEATING = 7
+GROUP_OFFSET = 8
+WHILE_RUNNING = 9
+DISPLAY = 10
+SCHEDULE = 11
+FLAG = 12
+PREBREW_MODE = 13
+TEXT = 14
+
+INT_FORMATS = {1: "B", 2: "H", 4: "I"}
+
+"""Heating state flags and auto on/off settings for every value of their byte."""
+HEATING_STATES = tuple(
+    tuple(x for x in HEATING_VALUES if HEATING_VALUES[x] & value) for value in range(256)
+)
+AUTO_KEYS = tuple(get_key(AUTO_BITFIELD_MAP[x]) for x in AUTO_BITFIELD_MAP)
+AUTO_SETTINGS = tuple(
+    tuple(ENABLED if value >> bit & 0x01 else DISABLED for bit in range(len(AUTO_KEYS)))
+    for value in range(256)
+)
+
+"""Degree symbol, and outline and solid blocks for the heating elements."""
+FRONT_PANEL_CHARS = str.maketrans({"\xdf": "\u00b0", "\xdb": "\u25A1", "\xff": "\u25A0"})
+
+
+@dataclass(frozen=True, slots=True)
+class Field:
+    """One field of a response and how to convert it."""
+
+    key: str
+    kind: int
+    slot: int
+    start: int
+    end: int
+    offset_key: str
+    prebrew_state: int
+    group_adjusted: bool
+
+
+@dataclass(frozen=True, slots=True)
+class Layout:
+    """Struct layout and fields of one response type, in map order."""
+
+    struct: struct.Struct
+    fields: tuple
+
+
+def _kind(elem, raw_key, key):
+    """Classify a field the same way lmdirect's decoder does."""
+    if any(x in key for x in DIVIDE_KEYS):
+        return DIVIDE
+    if key == FIRMWARE_VER:
+        return FIRMWARE
+    if key in SERIAL_NUMBERS:
+        return SERIAL
+    if key == AUTO_BITFIELD:
+        return BITFIELD
+    if raw_key in DRINK_OFFSET_MAP:
+        return DRINKS
+    if key == DAYS_SINCE_BUILT:
+        return DAYS
+    if key == HEATING_STATE:
+        return HEATING
+    if key == BREW_GROUP_OFFSET:
+        return GROUP_OFFSET
+    if key in [KEY_ACTIVE, CURRENT_PULSE_COUNT]:
+        return WHILE_RUNNING
+    if key == FRONT_PANEL_DISPLAY:
+        return DISPLAY
+    if elem.index == CALCULATED_VALUE and key in AUTO_SCHED_MAP.values():
+        return SCHEDULE
+    if key == STEAM_BOILER_ENABLE:
+        return FLAG
+    if elem.index == CALCULATED_VALUE and key in [ENABLE_PREBREWING, ENABLE_PREINFUSION]:
+        return PREBREW_MODE
+    if elem.type == Elem.STRING:
+        return TEXT
+    return RAW
+
+
+def compile_layout(map):
+    """Build the struct layout for a response map."""
+    elems = sorted(
+        (x for x in map if x.index != CALCULATED_VALUE), key=lambda x: x.index
+    )
+
+    """Pad over the bytes that no field uses."""
+    fmt, pos, slots = ">", 0, {}
+    for elem in elems:
+        fmt += "x" * (elem.index - pos)
+        fmt += f"{elem.size}s" if elem.type == Elem.STRING else INT_FORMATS[elem.size]
+        slots[elem] = len(slots)
+        pos = elem.index + elem.size
+
+    fields = []
+    for elem, raw_key in map.items():
+        key = get_key(raw_key)
+        calculated = elem.index == CALCULATED_VALUE
+        fields.append(
+            Field(
+                key=key,
+                kind=_kind(elem, raw_key, key),
+                slot=slots.get(elem),
+                start=None if calculated else elem.index * 2,
+                end=None if calculated else (elem.index + elem.size) * 2,
+                offset_key=get_key(DRINK_OFFSET_MAP[raw_key])
+                if raw_key in DRINK_OFFSET_MAP
+                else None,
+                prebrew_state=1 if key == ENABLE_PREBREWING else 2,
+                group_adjusted=key == TEMP_COFFEE,
+            )
+        )
+
+    return Layout(struct=struct.Struct(fmt), fields=tuple(fields))
+
+
+def compile_layouts():
+    """Build the layouts for every response with a map, keyed by message type and message."""
+    layouts = {}
+    for msg_id, msg in MSGS.items():
+        if msg.map is None:
+            continue
+        try:
+            layouts[(msg.msg_type, msg.msg)] = compile_layout(msg.map)
+        except (TypeError, KeyError) as err:
+            """lmdirect can't decode these either, so leave them to it."""
+            _LOGGER.debug(f"No layout for {msg_id}: {err}")
+    return layouts
+
+
+LAYOUTS = compile_layouts()
+
+
+def status_keys(layout):
+    """Return the status keys that a layout decodes into."""
+    keys = {x.key for x in layout.fields}
+    if any(x.kind == BITFIELD for x in layout.fields):
+        keys.update(AUTO_KEYS)
+    return keys
+
+
+def cached_value(temp_state, key, value):
+    """Use a value we just set until the machine reports it, then forget it."""
+    if key in temp_state:
+        if value == temp_state[key]:
+            _LOGGER.debug(f"Element {key} has updated to {value}, pop the cached value")
+            temp_state.pop(key, None)
+        else:
+            _LOGGER.debug(
+                f"Element {key} hasn't updated yet, so use the cached value {value}"
+            )
+            value = temp_state[key]
+    return value
+
+
+def decode(lm, layout, data):
+    """Decode the data of a response into the machine status.
+
+    The frame is converted from hex once and every field is unpacked in one
+    go.  Raises ValueError or struct.error if the data doesn't fit the layout.
+    """
+    values = layout.struct.unpack_from(bytes.fromhex(data))
+    status = lm._current_status
+    temp_state = lm._temp_state
+
+    for field in layout.fields:
+        key, kind = field.key, field.kind
+        value = None if field.slot is None else values[field.slot]
+
+        if kind == RAW:
+            pass
+        elif kind == DIVIDE:
+            value = value / 10
+        elif kind == FIRMWARE:
+            value = "%0.2f" % (value / 100)
+        elif kind == SERIAL:
+            """Chop off any trailing nulls."""
+            value = value.decode("latin-1").partition("\0")[0]
+        elif kind == BITFIELD:
+            for day_key, setting in zip(AUTO_KEYS, AUTO_SETTINGS[value & 0xFF]):
+                status[day_key] = cached_value(temp_state, day_key, setting)
+        elif kind == DRINKS:
+            if key == TOTAL_FLUSHING:
+                value = status[TOTAL_COFFEE_ACTIVATIONS] - status[TOTAL_COFFEE]
+            if key not in status:
+                """If we haven't seen the value before, calculate the offset."""
+                status[field.offset_key] = value - status.get(field.offset_key, 0)
+            value = value - status.get(field.offset_key, 0)
+        elif kind == DAYS:
+            """Convert hours to days."""
+            value = round(value / 24)
+        elif kind == HEATING:
+            value = list(HEATING_STATES[value & 0xFF])
+            if not value:
+                status.pop(key, None)
+                continue
+        elif kind == GROUP_OFFSET:
+            value = (value & 0xFF00) >> 8 | (value & 0x00FF) << 8
+
+            """The Linea Mini has no offset."""
+            if status.get(FACTORY_OFFSET, 0) == 0:
+                value = 0
+            else:
+                if status.get(T_UNIT, 0) == UNIT_FAHRENHEIT:
+                    value *= 200 / 360
+                value = 2 * round((value - 100) / 10, 1)
+        elif kind == WHILE_RUNNING:
+            """Remove these when the machine isn't running."""
+            if not value:
+                status.pop(key, None)
+                continue
+        elif kind == DISPLAY:
+            value = value.decode("latin-1").translate(FRONT_PANEL_CHARS)
+        elif kind == SCHEDULE:
+            lm.calculate_auto_sched_times(key)
+            continue
+        elif kind == FLAG:
+            value = (value & 0x01) == 1
+        elif kind == PREBREW_MODE:
+            value = status.get(PREBREW_FLAG) == field.prebrew_state
+        elif kind == TEXT:
+            value = data[field.start : field.end]
+
+        """Report the group temp rather than the boiler temp."""
+        if field.group_adjusted:
+            value = round(value - status.get(BREW_GROUP_OFFSET, 0), 1)
+
+        status[key] = cached_value(temp_state, key, value)
@@ -1,12 +1,90 @@
 """Base class for the La Marzocco entities."""
 
 import logging
+from dataclasses import dataclass
+
+from .const import (
+    DOMAIN,
+    ENTITY_CLASS,
+    ENTITY_FUNC,
+    ENTITY_ICON,
+    ENTITY_MAP,
+    ENTITY_NAME,
+    ENTITY_TAG,
+    ENTITY_TEMP_TAG,
+    ENTITY_TSET_TAG,
+    ENTITY_TYPE,
+    ENTITY_UNITS,
+    STALE,
+)
 
-from homeassistant.core import callback
+_LOGGER = logging.getLogger(__name__)
 
-from .const import DOMAIN, ENTITY_ICON, ENTITY_MAP, ENTITY_NAME
 
-_LOGGER = logging.getLogger(__name__)
+def get_key(k):
+    """Construct tag name if needed."""
+    if isinstance(k, tuple):
+        k = "_".join(k)
+    return k
+
+
+@dataclass(frozen=True, slots=True)
+class EntityDescriptor:
+    """An ENTITIES entry resolved for one machine, so state reads don't walk dicts or build keys."""
+
+    object_id: str
+    name: str
+    icon: str
+    entity_type: str
+    keys: tuple
+    temp_key: str
+    tset_key: str
+    attr_keys: tuple
+    status_keys: frozenset
+    func: object
+    device_class: object
+    units: str
+
+    @property
+    def key(self):
+        """Return the single status key for entities with one tag."""
+        return self.keys[0] if self.keys else None
+
+
+def compile_entities(lm, platform, entities):
+    """Compile the ENTITIES table of a platform into descriptors for this machine's model."""
+    model_name = lm.model_name
+    descriptors = []
+
+    for object_id in lm.profile.entities[platform]:
+        entity = entities[object_id]
+        tags = entity.get(ENTITY_TAG, [])
+        keys = tuple(get_key(k) for k in (tags if isinstance(tags, list) else [tags]))
+        temp_key = entity.get(ENTITY_TEMP_TAG)
+        tset_key = entity.get(ENTITY_TSET_TAG)
+        attr_keys = tuple(get_key(k) for k in entity[ENTITY_MAP][model_name] or [])
+        func = entity.get(ENTITY_FUNC)
+
+        descriptors.append(
+            EntityDescriptor(
+                object_id=object_id,
+                name=entity[ENTITY_NAME],
+                icon=entity[ENTITY_ICON],
+                entity_type=entity[ENTITY_TYPE],
+                keys=keys,
+                temp_key=temp_key,
+                tset_key=tset_key,
+                attr_keys=attr_keys,
+                status_keys=frozenset(
+                    keys + attr_keys + tuple(x for x in [temp_key, tset_key] if x)
+                ),
+                func=getattr(lm, func) if func else None,
+                device_class=entity.get(ENTITY_CLASS),
+                units=entity.get(ENTITY_UNITS),
+            )
+        )
+
+    return descriptors
 
 
 class EntityBase:
@@ -14,30 +92,48 @@ class EntityBase:
 
     _attr_assumed_state = False
     _attr_entity_registry_enabled_default = True
+    _attr_should_poll = False
+
+    def _init_entity(self, lm, descriptor, hass):
+        """Store the machine and the compiled descriptor for this entity."""
+        self._lm = lm
+        self._hass = hass
+        self._desc = descriptor
+        self._object_id = descriptor.object_id
+        self._entity_type = descriptor.entity_type
 
     @property
     def name(self):
         """Return the name of the switch."""
-        return (
-            f"{self._lm.machine_name} " + self._entities[self._object_id][ENTITY_NAME]
-        )
+        return f"{self._lm.machine_name} {self._desc.name}"
 
     @property
     def unique_id(self):
         """Return unique ID."""
-        return f"{self._lm.serial_number}_" + self._object_id
+        return f"{self._lm.serial_number}_{self._object_id}"
 
     @property
     def icon(self) -> str:
         """Return the icon to use in the frontend."""
-        return self._entities[self._object_id][ENTITY_ICON]
+        return self._desc.icon
+
+    async def async_added_to_hass(self):
+        """Ask the machine to write our state when new data arrives."""
+        self._lm.register_entity(self)
+
+    async def async_will_remove_from_hass(self):
+        """Stop receiving state updates."""
+        self._lm.unregister_entity(self)
+
+    @property
+    def available(self):
+        """Return false while the machine can't be reached."""
+        return not self._lm.unreachable
 
-    @callback
-    def update_callback(self, **kwargs):
-        """Update the state machine when new data arrives."""
-        entity_type = kwargs.get("entity_type")
-        if entity_type in [None, self._entity_type]:
-            self.schedule_update_ha_state(force_refresh=False)
+    @property
+    def status_keys(self):
+        """Return the status keys that this entity's state and attributes are built from."""
+        return self._desc.status_keys
 
     @property
     def device_info(self):
@@ -51,29 +147,19 @@ class EntityBase:
             "sw_version": self._lm.firmware_version,
         }
 
-    def _get_key(self, k):
-        """Construct tag name if needed."""
-        if isinstance(k, tuple):
-            k = "_".join(k)
-        return k
-
     @property
     def extra_state_attributes(self):
         """Return the state attributes."""
-
-        def convert_value(k, v):
-            """Convert boolean values to strings to improve display in Lovelace."""
-            if isinstance(v, bool):
-                v = str(v)
-            return v
-
         data = self._lm._current_status
-        attr = self._entities[self._object_id][ENTITY_MAP][self._lm.model_name]
-        if attr is None:
-            return {}
 
-        map = [
-            self._get_key(k) for k in attr
-        ]
+        """Convert boolean values to strings to improve display in Lovelace."""
+        attributes = {
+            k: str(data[k]) if isinstance(data[k], bool) else data[k]
+            for k in self._desc.attr_keys
+            if k in data
+        }
 
-        return {k: convert_value(k, data[k]) for k in map if k in data}
+        """Flag values restored from storage until the machine has been polled."""
+        if self._lm.stale:
+            attributes[STALE] = True
+        return attributes
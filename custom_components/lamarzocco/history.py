@@ -0,0 +1,100 @@
+"""In-memory history of boiler temperatures for La Marzocco espresso machines."""
+
+import logging
+import math
+import time
+from array import array
+
+from homeassistant.util import dt as dt_util
+from lmdirect.msgs import (
+    HEATING_STATE,
+    HEATING_VALUES,
+    TEMP_COFFEE,
+    TEMP_STEAM,
+    TSET_COFFEE,
+    TSET_STEAM,
+)
+
+from .const import HISTORY_SIZE
+from .decoder import HEATING_STATES
+
+_LOGGER = logging.getLogger(__name__)
+
+"""Temperatures kept for each sample, as 32-bit floats with NaN for values the machine didn't report."""
+TEMPERATURES = [TEMP_COFFEE, TSET_COFFEE, TEMP_STEAM, TSET_STEAM]
+
+SAMPLE_TIME = "time"
+
+
+class TemperatureHistory:
+    """Fixed-size ring buffer of timestamped temperature samples.
+
+    Every column is a preallocated array, so a machine's history takes the
+    same memory from the first sample to the last: 8 bytes for the time, 4
+    for each temperature and 1 for the heating state flags.  Once full, each
+    new sample overwrites the oldest one.
+    """
+
+    __slots__ = ("size", "_times", "_temps", "_heating", "_next", "_count")
+
+    def __init__(self, size=HISTORY_SIZE):
+        """Allocate the buffer."""
+        self.size = size
+        self._times = array("d", bytes(8 * size))
+        self._temps = {key: array("f", bytes(4 * size)) for key in TEMPERATURES}
+        self._heating = array("B", bytes(size))
+        self._next = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def nbytes(self):
+        """Return the memory taken by the samples."""
+        columns = [self._times, self._heating, *self._temps.values()]
+        return sum(x.itemsize * len(x) for x in columns)
+
+    def record(self, status, now=None):
+        """Add a sample taken from the machine status."""
+        pos = self._next
+        self._times[pos] = time.time() if now is None else now
+        for key, column in self._temps.items():
+            value = status.get(key)
+            column[pos] = math.nan if value is None else value
+        self._heating[pos] = sum(
+            HEATING_VALUES[x] for x in status.get(HEATING_STATE, ())
+        )
+
+        self._next = (pos + 1) % self.size
+        self._count = min(self._count + 1, self.size)
+
+    def _positions(self, since):
+        """Return the buffer positions of the samples taken at or after a time, oldest first."""
+        start = self._next - self._count
+        positions = [(start + x) % self.size for x in range(self._count)]
+
+        """Samples are in time order, so skip the old ones with a binary search."""
+        lo, hi = 0, len(positions)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._times[positions[mid]] < since:
+                lo = mid + 1
+            else:
+                hi = mid
+        return positions[lo:]
+
+    def samples(self, minutes, now=None):
+        """Return the samples from the last few minutes, oldest first, ready to serialize."""
+        now = time.time() if now is None else now
+        samples = []
+        for pos in self._positions(now - minutes * 60):
+            sample = {
+                SAMPLE_TIME: dt_util.utc_from_timestamp(self._times[pos]).isoformat()
+            }
+            for key, column in self._temps.items():
+                value = column[pos]
+                sample[key] = None if math.isnan(value) else round(value, 1)
+            sample[HEATING_STATE] = list(HEATING_STATES[self._heating[pos]])
+            samples.append(sample)
+        return samples
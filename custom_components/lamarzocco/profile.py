@@ -0,0 +1,127 @@
+"""Capabilities of the supported La Marzocco models."""
+
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+
+from lmdirect.msgs import Msg
+
+from . import binary_sensor, button, sensor, switch, water_heater
+from .const import (
+    ENTITY_MAP,
+    MODEL_GS3_AV,
+    MODEL_GS3_MP,
+    MODEL_LM,
+    MODELS,
+    PLATFORM_BINARY_SENSOR,
+    PLATFORM_BUTTON,
+    PLATFORM_SENSOR,
+    PLATFORM_SWITCH,
+    PLATFORM_WATER_HEATER,
+    SERVICE_GET_HISTORY,
+    SERVICE_REFRESH,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+"""Entity tables for each platform, in the order they're set up."""
+PLATFORM_ENTITIES = {
+    PLATFORM_SWITCH: switch.ENTITIES,
+    PLATFORM_BINARY_SENSOR: binary_sensor.ENTITIES,
+    PLATFORM_SENSOR: sensor.ENTITIES,
+    PLATFORM_WATER_HEATER: water_heater.ENTITIES,
+    PLATFORM_BUTTON: button.ENTITIES,
+}
+
+SERVICES = "services"
+KEYS = "keys"
+
+"""Integration services and the number of programmable keys for each model."""
+MODEL_CAPABILITIES = {
+    MODEL_GS3_AV: {
+        SERVICES: [
+            Msg.SET_DOSE,
+            Msg.SET_DOSE_HOT_WATER,
+            Msg.SET_AUTO_ON_OFF_ENABLE,
+            Msg.SET_AUTO_ON_OFF_TIMES,
+            Msg.SET_PREBREW_TIMES,
+            Msg.SET_PREINFUSION_TIME,
+        ],
+        KEYS: 4,
+    },
+    MODEL_GS3_MP: {
+        SERVICES: [
+            Msg.SET_DOSE_HOT_WATER,
+            Msg.SET_AUTO_ON_OFF_ENABLE,
+            Msg.SET_AUTO_ON_OFF_TIMES,
+        ],
+        KEYS: 1,
+    },
+    MODEL_LM: {
+        SERVICES: [
+            Msg.SET_AUTO_ON_OFF_ENABLE,
+            Msg.SET_AUTO_ON_OFF_TIMES,
+            Msg.SET_PREBREW_TIMES,
+            Msg.SET_PREINFUSION_TIME,
+        ],
+        KEYS: 1,
+    },
+}
+
+"""Services available for every model."""
+COMMON_SERVICES = [SERVICE_REFRESH, SERVICE_GET_HISTORY]
+
+"""Min/Max coffee and steam temps."""
+TEMP_LIMITS = {
+    "coffee": (87, 100),
+    "steam": (110, 132),
+}
+
+
+@dataclass(frozen=True, slots=True)
+class MachineProfile:
+    """What a machine model supports, resolved once per model."""
+
+    model_name: str
+    true_model_name: str
+    platforms: tuple
+    entities: MappingProxyType
+    services: frozenset
+    key_count: int
+    temp_limits: MappingProxyType
+
+
+@lru_cache(maxsize=None)
+def resolve_profile(model_name):
+    """Build the profile for a model, falling back to the GS3 AV for ones we don't know."""
+    if model_name in MODELS:
+        true_model_name = model_name
+    else:
+        """Only complain once a real model name has been retrieved."""
+        if model_name is not None:
+            _LOGGER.error(
+                f"Unsupported model, falling back to all entities and services: {model_name}"
+            )
+        true_model_name = f"{model_name} (Unknown)"
+        model_name = MODEL_GS3_AV
+
+    entities = {
+        platform: tuple(
+            object_id
+            for object_id, entity in table.items()
+            if model_name in entity[ENTITY_MAP]
+        )
+        for platform, table in PLATFORM_ENTITIES.items()
+    }
+    capabilities = MODEL_CAPABILITIES[model_name]
+
+    return MachineProfile(
+        model_name=model_name,
+        true_model_name=true_model_name,
+        platforms=tuple(platform for platform in entities if entities[platform]),
+        entities=MappingProxyType(entities),
+        services=frozenset(capabilities[SERVICES] + COMMON_SERVICES),
+        key_count=capabilities[KEYS],
+        temp_limits=MappingProxyType(TEMP_LIMITS),
+    )
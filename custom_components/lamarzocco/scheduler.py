@@ -0,0 +1,323 @@
+"""Polling schedule for La Marzocco espresso machines."""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import callback
+from lmdirect.msgs import (
+    BREW_SOLENOID_ON,
+    CONTINUOUS,
+    DRINKS,
+    HEATING_STATE,
+    HOT_WATER_SOLENOID_ON,
+    KEY_ACTIVE,
+    POWER,
+    PUMP_ON,
+    STEAM_BOILER_ENABLE,
+    TEMP_COFFEE,
+    TEMP_STEAM,
+    TOTAL_FLUSHING,
+    TSET_COFFEE,
+    TSET_STEAM,
+)
+
+from .clock import REAL_CLOCK, get_clock
+from .const import (
+    COMMAND_ACTIVITY_WINDOW,
+    DEFAULT_MAX_INTERVAL,
+    DEFAULT_MIN_INTERVAL,
+    DOMAIN,
+    HEAT_UP_MARGIN,
+    MAX_POLLS_IN_FLIGHT,
+    POLL_JITTER,
+    POLLING_INTERVAL,
+    REFRESH_CYCLES,
+    REFRESH_MAX_AGE,
+    STARTUP_STAGGER,
+    STATUS_REFRESH,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_SCHEDULER = f"{DOMAIN}_scheduler"
+
+"""Counters that increase whenever a drink is pulled."""
+DRINK_COUNTERS = [
+    "_".join((DRINKS, "k1")),
+    "_".join((DRINKS, "k2")),
+    "_".join((DRINKS, "k3")),
+    "_".join((DRINKS, "k4")),
+    CONTINUOUS,
+    TOTAL_FLUSHING,
+]
+
+"""Heating state flags that mean water is flowing through the group."""
+BREWING_FLAGS = [PUMP_ON, BREW_SOLENOID_ON, HOT_WATER_SOLENOID_ON]
+
+
+class AdaptiveInterval:
+    """Pick the next polling interval from the most recent machine status."""
+
+    def __init__(
+        self,
+        min_interval=DEFAULT_MIN_INTERVAL,
+        max_interval=DEFAULT_MAX_INTERVAL,
+        clock=REAL_CLOCK,
+    ):
+        """Initialize the interval bounds."""
+        self._clock = clock
+        self._last_drinks = None
+        self._last_command = None
+        self.set_bounds(min_interval, max_interval)
+        self.current = self._clamp(POLLING_INTERVAL)
+
+    def set_bounds(self, min_interval, max_interval):
+        """Update the fastest and slowest allowed intervals."""
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+
+    def note_command(self):
+        """Record that the user just sent a command to the machine."""
+        self._last_command = self._clock.monotonic()
+
+    def _clamp(self, interval):
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def _is_brewing(self, status):
+        """Return true if a drink is being pulled or was pulled since the last poll."""
+        drinks = sum(status.get(x, 0) for x in DRINK_COUNTERS)
+        brewed = self._last_drinks is not None and drinks != self._last_drinks
+        self._last_drinks = drinks
+
+        heating_state = status.get(HEATING_STATE) or []
+        return (
+            brewed
+            or KEY_ACTIVE in status
+            or any(x in heating_state for x in BREWING_FLAGS)
+        )
+
+    def _is_heating_up(self, status):
+        """Return true if either boiler is still well below its setpoint."""
+        boilers = [(TEMP_COFFEE, TSET_COFFEE)]
+        if status.get(STEAM_BOILER_ENABLE, True):
+            boilers.append((TEMP_STEAM, TSET_STEAM))
+
+        return any(
+            status[temp] < status[tset] - HEAT_UP_MARGIN
+            for temp, tset in boilers
+            if status.get(temp) is not None and status.get(tset) is not None
+        )
+
+    def _recent_command(self):
+        return (
+            self._last_command is not None
+            and self._clock.monotonic() - self._last_command < COMMAND_ACTIVITY_WINDOW
+        )
+
+    def next_interval(self, status):
+        """Compute the delay until the next poll."""
+        brewing = self._is_brewing(status)
+
+        if brewing or self._recent_command():
+            interval = self.min_interval
+        elif not status.get(POWER):
+            interval = self.max_interval
+        elif self._is_heating_up(status):
+            interval = self.min_interval * 2
+        else:
+            interval = POLLING_INTERVAL
+
+        self.current = self._clamp(interval)
+        return self.current
+
+
+class RefreshSchedule:
+    """Pick the status reads that a poll cycle needs to send.
+
+    Reads that change all the time go out every cycle and the rest every few
+    cycles or once their last reply is older than a maximum age.  Reads that
+    didn't get a reply stay due, and invalidate() makes the reads a command
+    wrote to, or everything when the user asks for a refresh, due again.
+    """
+
+    def __init__(self, tiers=STATUS_REFRESH, clock=REAL_CLOCK):
+        """Initialize the schedule with nothing refreshed yet."""
+        self._clock = clock
+        self._tiers = tiers
+        self._cycle = 0
+        self._refreshed = {}
+
+    def due(self, now=None):
+        """Start a new cycle and return the reads it should send."""
+        now = self._clock.monotonic() if now is None else now
+        self._cycle += 1
+        return [msg_id for msg_id in self._tiers if self._is_due(msg_id, now)]
+
+    def _is_due(self, msg_id, now):
+        if msg_id not in self._refreshed:
+            return True
+
+        cycle, when = self._refreshed[msg_id]
+        tier = self._tiers[msg_id]
+        return (
+            REFRESH_CYCLES in tier and self._cycle - cycle >= tier[REFRESH_CYCLES]
+        ) or (REFRESH_MAX_AGE in tier and now - when >= tier[REFRESH_MAX_AGE])
+
+    def refreshed(self, msg_ids, now=None):
+        """Record the reads that were answered in this cycle."""
+        now = self._clock.monotonic() if now is None else now
+        self._refreshed.update({msg_id: (self._cycle, now) for msg_id in msg_ids})
+
+    def invalidate(self, msg_ids=None):
+        """Refresh the given reads, or everything, on the next cycle."""
+        if msg_ids is None:
+            self._refreshed.clear()
+        else:
+            [self._refreshed.pop(x, None) for x in msg_ids]
+
+
+class PollScheduler:
+    """Poll every configured machine from a single task.
+
+    Machines are kept in a heap ordered by when they're next due, so one task
+    sleeps until the earliest deadline instead of each machine running its own
+    loop.  Each interval is jittered so that machines drift apart rather than
+    waking together, and a semaphore caps the number of polls in flight.
+    """
+
+    def __init__(
+        self,
+        loop,
+        max_in_flight=MAX_POLLS_IN_FLIGHT,
+        jitter=POLL_JITTER,
+        clock=REAL_CLOCK,
+    ):
+        """Initialize the scheduler."""
+        self._loop = loop
+        self._clock = clock
+        self._jitter = jitter
+        self._heap = []
+        self._due = {}
+        self._in_flight = {}
+        self._expedited = {}
+        self._poll_tasks = set()
+        self._counter = itertools.count()
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._wake = asyncio.Event()
+        self._task = None
+
+    def __len__(self):
+        return len(self._due) + len(self._in_flight)
+
+    @property
+    def busy(self):
+        """Return true while any poll is in flight or the schedule changed and hasn't been looked at yet."""
+        return bool(self._in_flight) or (
+            self._wake.is_set() and self._task is not None and not self._task.done()
+        )
+
+    def add(self, machine):
+        """Start polling a machine, staggering it behind the ones already known."""
+        delay = random.uniform(0, STARTUP_STAGGER * len(self))
+        self._push(machine, self._clock.monotonic() + delay)
+
+        if self._task is None or self._task.done():
+            self._task = self._loop.create_task(self._run(), name="Poll Scheduler")
+
+    def remove(self, machine):
+        """Stop polling a machine.  Returns the task of its poll if one is in flight."""
+        self._due.pop(machine, None)
+        self._expedited.pop(machine, None)
+        self._wake.set()
+        return self._in_flight.pop(machine, None)
+
+    def stop(self):
+        """Stop polling altogether."""
+        self._due.clear()
+        self._in_flight.clear()
+        self._expedited.clear()
+        [task.cancel() for task in self._poll_tasks]
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def expedite(self, machine, delay):
+        """Poll a machine within delay seconds if it isn't already due sooner."""
+        when = self._clock.monotonic() + delay
+
+        """A machine that's being polled is rescheduled once its poll is done."""
+        if machine in self._in_flight:
+            self._expedited[machine] = min(when, self._expedited.get(machine, when))
+        elif machine in self._due and when < self._due[machine][0]:
+            self._push(machine, when)
+
+    def _push(self, machine, when):
+        """Record when a machine is next due.  Superseded heap entries are skipped later."""
+        entry = (when, next(self._counter), machine)
+        self._due[machine] = entry
+        heapq.heappush(self._heap, entry)
+        self._wake.set()
+
+    def _jittered(self, interval):
+        return interval * random.uniform(1 - self._jitter, 1 + self._jitter)
+
+    async def _run(self):
+        """Sleep until the next machine is due and start its poll."""
+        _LOGGER.debug("Starting poll scheduler")
+        while self._due or self._in_flight:
+            self._wake.clear()
+
+            """Drop entries for machines that were removed or rescheduled."""
+            while self._heap and self._due.get(self._heap[0][2]) is not self._heap[0]:
+                heapq.heappop(self._heap)
+
+            if not self._heap:
+                await self._wake.wait()
+                continue
+
+            when, _, machine = self._heap[0]
+            delay = when - self._clock.monotonic()
+            if delay > 0:
+                await self._clock.wait(self._wake, delay)
+                continue
+
+            heapq.heappop(self._heap)
+            del self._due[machine]
+            task = self._loop.create_task(self._poll(machine), name="Poll Machine")
+            self._in_flight[machine] = task
+            self._poll_tasks.add(task)
+            task.add_done_callback(self._poll_tasks.discard)
+
+        _LOGGER.debug("No machines left to poll, stopping scheduler")
+
+    async def _poll(self, machine):
+        """Poll one machine and put it back in the heap."""
+        interval = POLLING_INTERVAL
+        try:
+            async with self._semaphore:
+                interval = await machine.poll()
+        except Exception as err:
+            _LOGGER.error(f"Exception polling {machine.serial_number}: {err}")
+        finally:
+            if self._in_flight.pop(machine, None):
+                when = self._clock.monotonic() + self._jittered(interval)
+                self._push(machine, min(when, self._expedited.pop(machine, when)))
+
+
+def async_get_scheduler(hass):
+    """Return the poll scheduler shared by all La Marzocco machines."""
+    if DATA_SCHEDULER not in hass.data:
+        scheduler = hass.data[DATA_SCHEDULER] = PollScheduler(
+            hass.loop, clock=get_clock(hass)
+        )
+
+        @callback
+        def async_stop(event):
+            scheduler.stop()
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, async_stop)
+    return hass.data[DATA_SCHEDULER]
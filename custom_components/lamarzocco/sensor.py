@@ -18,10 +18,14 @@ from .const import (
     MODEL_GS3_AV,
     MODEL_GS3_MP,
     MODEL_LM,
+    PLATFORM_SENSOR,
+    SHOT_WINDOWS,
+    SHOTS_PER,
     TYPE_DRINK_STATS,
 )
-from .entity_base import EntityBase
+from .entity_base import EntityBase, compile_entities
 from .services import async_setup_entity_services
+from .shots import SHOT_COUNTERS
 
 from homeassistant.components.sensor import STATE_CLASS_MEASUREMENT, SensorEntity
 
@@ -50,15 +54,40 @@ ENTITIES = {
     },
 }
 
+"""Keys whose shots are counted for each model."""
+SHOT_KEYS = {
+    MODEL_GS3_AV: list(SHOT_COUNTERS.values()),
+    MODEL_GS3_MP: ["k1", "continuous", "flushing"],
+    MODEL_LM: ["k1", "continuous", "flushing"],
+}
+
+"""Shots in each sliding window, with the shots for each key as attributes."""
+ENTITIES.update(
+    {
+        f"{SHOTS_PER}_{window}": {
+            ENTITY_TAG: (SHOTS_PER, window),
+            ENTITY_NAME: f"Shots Per {window.title()}",
+            ENTITY_MAP: {
+                model: [(SHOTS_PER, window, key) for key in keys]
+                for model, keys in SHOT_KEYS.items()
+            },
+            ENTITY_TYPE: TYPE_DRINK_STATS,
+            ENTITY_ICON: "mdi:coffee-outline",
+            ENTITY_CLASS: None,
+            ENTITY_UNITS: "shots",
+        }
+        for window in SHOT_WINDOWS
+    }
+)
+
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Set up sensor entities."""
     lm = hass.data[DOMAIN][config_entry.entry_id]
 
     async_add_entities(
-        LaMarzoccoSensor(lm, sensor_type, hass, config_entry)
-        for sensor_type in ENTITIES
-        if lm.model_name in ENTITIES[sensor_type][ENTITY_MAP]
+        LaMarzoccoSensor(lm, descriptor, hass, config_entry)
+        for descriptor in compile_entities(lm, PLATFORM_SENSOR, ENTITIES)
     )
 
     await async_setup_entity_services(lm)
@@ -67,30 +96,24 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
 class LaMarzoccoSensor(EntityBase, SensorEntity):
     """Sensor representing espresso machine temperature data."""
 
-    def __init__(self, lm, sensor_type, hass, config_entry):
+    def __init__(self, lm, descriptor, hass, config_entry):
         """Initialize sensors"""
-        self._object_id = sensor_type
-        self._lm = lm
-        self._entities = ENTITIES
-        self._hass = hass
-        self._entity_type = self._entities[self._object_id][ENTITY_TYPE]
-
-        self._attr_native_unit_of_measurement = self._entities[self._object_id][ENTITY_UNITS]
-        self._attr_device_class = self._entities[self._object_id][ENTITY_CLASS]
-        self._attr_state_class = STATE_CLASS_MEASUREMENT
+        self._init_entity(lm, descriptor, hass)
 
-        self._lm.register_callback(self.update_callback)
+        self._attr_native_unit_of_measurement = descriptor.units
+        self._attr_device_class = descriptor.device_class
+        self._attr_state_class = STATE_CLASS_MEASUREMENT
 
     @property
     def available(self):
         """Return if sensor is available."""
-        return all(
-            self._lm.current_status.get(self._get_key(x)) is not None
-            for x in self._entities[self._object_id][ENTITY_TAG]
+        data = self._lm.current_status
+        return super().available and all(
+            data.get(k) is not None for k in self._desc.keys
         )
 
     @property
     def native_value(self):
         """State of the sensor."""
-        entities = self._entities[self._object_id][ENTITY_TAG]
-        return sum([self._lm.current_status.get(self._get_key(x), 0) for x in entities])
+        data = self._lm.current_status
+        return sum(data.get(k, 0) for k in self._desc.keys)
@@ -3,20 +3,24 @@
 import logging
 
 import voluptuous as vol
+from homeassistant.core import SupportsResponse
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers import entity_platform
 from lmdirect import InvalidInput
 from lmdirect.msgs import Msg
 
 from .const import (
+    CONF_SERIAL_NUMBER,
     DAYS,
     DOMAIN,
     FUNC,
-    MODEL_GS3_AV,
-    MODEL_GS3_MP,
-    MODEL_LM,
     MODELS_SUPPORTED,
     PLATFORM,
     SCHEMA,
+    SERVICE_GET_HISTORY,
+    SERVICE_REFRESH,
+    SUPPORTS_RESPONSE,
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -30,10 +34,33 @@ async def call_service(func, *args, **kwargs):
         return False
 
 
-async def async_setup_services(hass, config_entry):
-    """Create and register services for the La Marzocco integration."""
+def get_machine(hass, service):
+    """Find the machine that a service call is aimed at."""
+    machines = list(hass.data[DOMAIN].values())
+    serial_number = service.data.get(CONF_SERIAL_NUMBER)
 
-    async def set_auto_on_off_enable(service):
+    if serial_number is None:
+        if len(machines) != 1:
+            raise HomeAssistantError(
+                f"{CONF_SERIAL_NUMBER} is required when more than one machine is configured"
+            )
+        lm = machines[0]
+    else:
+        lm = next((x for x in machines if x.serial_number == serial_number), None)
+        if lm is None:
+            raise HomeAssistantError(f"No machine with serial number {serial_number}")
+
+    if service.service not in lm.profile.services:
+        raise HomeAssistantError(
+            f"{service.service} is not supported by {lm.machine_name} ({lm.model_name})"
+        )
+    return lm
+
+
+async def async_setup_services(hass):
+    """Register the services supported by the configured machines and remove the rest."""
+
+    async def set_auto_on_off_enable(lm, service):
         """Service call to enable auto on/off."""
         day_of_week = service.data.get("day_of_week", None)
         enable = service.data.get("enable", None)
@@ -42,7 +69,7 @@ async def async_setup_services(hass, config_entry):
         await call_service(lm.set_auto_on_off_enable, day_of_week=day_of_week, enable=enable)
         return True
 
-    async def set_auto_on_off_times(service):
+    async def set_auto_on_off_times(lm, service):
         """Service call to configure auto on/off hours for a day."""
         day_of_week = service.data.get("day_of_week", None)
         hour_on = service.data.get("hour_on", None)
@@ -63,7 +90,7 @@ async def async_setup_services(hass, config_entry):
         )
         return True
 
-    async def set_dose(service):
+    async def set_dose(lm, service):
         """Service call to set the dose for a key."""
         key = service.data.get("key", None)
         pulses = service.data.get("pulses", None)
@@ -72,7 +99,7 @@ async def async_setup_services(hass, config_entry):
         await call_service(lm.set_dose, key=key, pulses=pulses)
         return True
 
-    async def set_dose_hot_water(service):
+    async def set_dose_hot_water(lm, service):
         """Service call to set the hot water dose."""
         seconds = service.data.get("seconds", None)
 
@@ -80,7 +107,7 @@ async def async_setup_services(hass, config_entry):
         await call_service(lm.set_dose_hot_water, seconds=seconds)
         return True
 
-    async def set_prebrew_times(service):
+    async def set_prebrew_times(lm, service):
         """Service call to set prebrew on time."""
         key = service.data.get("key", None)
         seconds_on = service.data.get("seconds_on", None)
@@ -97,7 +124,7 @@ async def async_setup_services(hass, config_entry):
         )
         return True
 
-    async def set_preinfusion_time(service):
+    async def set_preinfusion_time(lm, service):
         """Service call to set preinfusion time."""
         key = service.data.get("key", None)
         seconds = service.data.get("seconds", None)
@@ -112,7 +139,33 @@ async def async_setup_services(hass, config_entry):
         )
         return True
 
+    async def refresh(lm, service):
+        """Service call to read everything from the machine now."""
+        _LOGGER.debug("Refreshing all machine data")
+        lm.refresh()
+        return True
+
+    async def get_history(lm, service):
+        """Service call to return the temperature samples from the last few minutes."""
+        minutes = service.data.get("minutes", None)
+
+        _LOGGER.debug(f"Returning temperature history for the last {minutes} minutes")
+        return {"samples": lm.history.samples(minutes, lm.clock.time())}
+
     INTEGRATION_SERVICES = {
+        SERVICE_REFRESH: {
+            SCHEMA: {},
+            FUNC: refresh,
+        },
+        SERVICE_GET_HISTORY: {
+            SCHEMA: {
+                vol.Optional("minutes", default=10): vol.All(
+                    vol.Coerce(float), vol.Range(min=0, max=24 * 60)
+                ),
+            },
+            FUNC: get_history,
+            SUPPORTS_RESPONSE: SupportsResponse.ONLY,
+        },
         Msg.SET_DOSE: {
             SCHEMA: {
                 vol.Required("key"): vol.All(vol.Coerce(int), vol.Range(min=1, max=5)),
@@ -120,7 +173,6 @@ async def async_setup_services(hass, config_entry):
                     vol.Coerce(int), vol.Range(min=0, max=1000)
                 ),
             },
-            MODELS_SUPPORTED: [MODEL_GS3_AV],
             FUNC: set_dose,
         },
         Msg.SET_DOSE_HOT_WATER: {
@@ -129,7 +181,6 @@ async def async_setup_services(hass, config_entry):
                     vol.Coerce(int), vol.Range(min=0, max=30)
                 ),
             },
-            MODELS_SUPPORTED: [MODEL_GS3_AV, MODEL_GS3_MP],
             FUNC: set_dose_hot_water,
         },
         Msg.SET_AUTO_ON_OFF_ENABLE: {
@@ -137,7 +188,6 @@ async def async_setup_services(hass, config_entry):
                 vol.Required("day_of_week"): vol.In(DAYS),
                 vol.Required("enable"): vol.Boolean(),
             },
-            MODELS_SUPPORTED: [MODEL_GS3_AV, MODEL_GS3_MP, MODEL_LM],
             FUNC: set_auto_on_off_enable,
         },
         Msg.SET_AUTO_ON_OFF_TIMES: {
@@ -156,7 +206,6 @@ async def async_setup_services(hass, config_entry):
                     vol.Coerce(int), vol.Range(min=0, max=59)
                 ),
             },
-            MODELS_SUPPORTED: [MODEL_GS3_AV, MODEL_GS3_MP, MODEL_LM],
             FUNC: set_auto_on_off_times,
         },
         Msg.SET_PREBREW_TIMES: {
@@ -168,7 +217,6 @@ async def async_setup_services(hass, config_entry):
                     vol.Coerce(float), vol.Range(min=0, max=5.9)
                 ),
             },
-            MODELS_SUPPORTED: [MODEL_GS3_AV, MODEL_LM],
             FUNC: set_prebrew_times,
         },
         Msg.SET_PREINFUSION_TIME: {
@@ -177,23 +225,17 @@ async def async_setup_services(hass, config_entry):
                     vol.Coerce(float), vol.Range(min=0, max=24.9)
                 ),
             },
-            MODELS_SUPPORTED: [MODEL_GS3_AV, MODEL_LM],
             FUNC: set_preinfusion_time,
         },
     }
 
-    existing_services = hass.services.async_services().get(DOMAIN)
-    if existing_services and any(
-        service in INTEGRATION_SERVICES for service in existing_services
-    ):
-        # Integration-level services have already been added. Return.
-        return
-
-    lm = hass.data[DOMAIN][config_entry.entry_id]
+    profiles = [lm.profile for lm in hass.data[DOMAIN].values()]
+    supported = set().union(*[x.services for x in profiles])
 
-    """Set the max prebrew button based on model"""
-    if lm.model_name in [MODEL_GS3_AV, MODEL_LM]:
-        max_button_number = 4 if lm.model_name == MODEL_GS3_AV else 1
+    """Set the max prebrew button based on the models that are configured"""
+    key_counts = [x.key_count for x in profiles if Msg.SET_PREBREW_TIMES in x.services]
+    if key_counts:
+        max_button_number = max(key_counts)
         INTEGRATION_SERVICES[Msg.SET_PREBREW_TIMES][SCHEMA].update(
             {
                 vol.Required("key"): vol.All(
@@ -209,17 +251,36 @@ async def async_setup_services(hass, config_entry):
             },
         )
 
-    """Register the services."""
-    [
-        hass.services.async_register(
-            domain=DOMAIN,
-            service=service,
-            schema=vol.Schema(INTEGRATION_SERVICES[service][SCHEMA]),
-            service_func=INTEGRATION_SERVICES[service][FUNC],
-        )
-        for service in INTEGRATION_SERVICES
-        if lm.model_name in INTEGRATION_SERVICES[service][MODELS_SUPPORTED]
-    ]
+    def service_handler(service):
+        """Route a service call to the handler with the machine it targets."""
+
+        async def handle(call):
+            lm = get_machine(hass, call)
+            return await INTEGRATION_SERVICES[service][FUNC](lm, call)
+
+        return handle
+
+    existing_services = hass.services.async_services().get(DOMAIN, {})
+
+    for service in INTEGRATION_SERVICES:
+        if service in supported:
+            """Register the service, replacing it if the set of machines changed."""
+            hass.services.async_register(
+                domain=DOMAIN,
+                service=service,
+                schema=vol.Schema(
+                    {
+                        vol.Optional(CONF_SERIAL_NUMBER): cv.string,
+                        **INTEGRATION_SERVICES[service][SCHEMA],
+                    }
+                ),
+                service_func=service_handler(service),
+                supports_response=INTEGRATION_SERVICES[service].get(
+                    SUPPORTS_RESPONSE, SupportsResponse.NONE
+                ),
+            )
+        elif service in existing_services:
+            hass.services.async_remove(DOMAIN, service)
 
 
 ENTITY_SERVICES = {}
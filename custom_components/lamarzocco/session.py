@@ -0,0 +1,100 @@
+"""Long-lived local connection to a La Marzocco espresso machine."""
+
+import asyncio
+import logging
+import socket
+from datetime import datetime, timedelta
+
+from .const import (
+    CONNECT_TIMEOUT,
+    KEEPALIVE_COUNT,
+    KEEPALIVE_IDLE,
+    KEEPALIVE_INTERVAL,
+    SESSION_IDLE_TIMEOUT,
+    SESSION_RESPONSE_TIMEOUT,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+"""TCP keepalive options, where the platform supports them."""
+KEEPALIVE_OPTIONS = [
+    (getattr(socket, name), value)
+    for name, value in [
+        ("TCP_KEEPIDLE", KEEPALIVE_IDLE),
+        ("TCP_KEEPINTVL", KEEPALIVE_INTERVAL),
+        ("TCP_KEEPCNT", KEEPALIVE_COUNT),
+    ]
+    if hasattr(socket, name)
+]
+
+
+class Session:
+    """One TCP connection to the machine, shared by polls and commands.
+
+    The embedded controller is slow to accept connections, so the session
+    stays open between polls.  TCP keepalive catches a machine that vanished
+    while we were idle, and a request that gets no reply at all within
+    SESSION_RESPONSE_TIMEOUT marks the session as half-open so that the next
+    request reconnects.  A session that carries no traffic for
+    SESSION_IDLE_TIMEOUT is closed to free the machine's socket, which is
+    the only one it has, for the mobile app between slow polls.
+    """
+
+    def __init__(self):
+        """Initialize an unopened session."""
+        self.reader = None
+        self.writer = None
+        self.last_received = None
+        self.connects = 0
+
+    @property
+    def is_open(self):
+        """Return true if the session can carry requests."""
+        return self.writer is not None and not self.writer.is_closing()
+
+    async def open(self, host, port):
+        """Connect to the machine and enable keepalive on the socket."""
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port), timeout=CONNECT_TIMEOUT
+        )
+
+        sock = self.writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            [sock.setsockopt(socket.IPPROTO_TCP, x, v) for x, v in KEEPALIVE_OPTIONS]
+
+        self.last_received = datetime.now()
+        self.connects += 1
+        _LOGGER.debug(f"Opened session to {host}:{port}")
+        return self.reader, self.writer
+
+    async def read_frame(self):
+        """Return the next frame, or None if the session went idle or the machine hung up."""
+        try:
+            frame = await asyncio.wait_for(
+                self.reader.readuntil(separator=b"%"), timeout=SESSION_IDLE_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            _LOGGER.debug("Session idle, closing")
+            return None
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, OSError) as err:
+            _LOGGER.debug(f"Session lost: {err!r}")
+            return None
+
+        self.last_received = datetime.now()
+        return frame
+
+    def unresponsive(self, last_sent):
+        """Return true if nothing came back within the response timeout of the last request."""
+        return (
+            self.is_open
+            and last_sent is not None
+            and self.last_received < last_sent
+            and datetime.now() - last_sent > timedelta(seconds=SESSION_RESPONSE_TIMEOUT)
+        )
+
+    def close(self):
+        """Close the connection."""
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
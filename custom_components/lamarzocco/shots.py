@@ -0,0 +1,169 @@
+"""Detect shots from the drink counters of La Marzocco espresso machines."""
+
+import logging
+import time
+from collections import Counter
+
+from lmdirect.msgs import CONTINUOUS, DRINKS, TOTAL_FLUSHING
+
+from .const import MAX_SHOTS_PER_POLL, SHOT_WINDOWS, SHOTS_PER
+from .entity_base import get_key
+
+_LOGGER = logging.getLogger(__name__)
+
+"""Counters summed by the total drinks sensor, and the key reported for each."""
+SHOT_COUNTERS = {
+    get_key((DRINKS, "k1")): "k1",
+    get_key((DRINKS, "k2")): "k2",
+    get_key((DRINKS, "k3")): "k3",
+    get_key((DRINKS, "k4")): "k4",
+    CONTINUOUS: "continuous",
+    TOTAL_FLUSHING: "flushing",
+}
+
+
+class ShotDetector:
+    """Compare the drink counters with the ones from the previous poll.
+
+    Only the last value of each counter is kept, so each poll costs the same
+    no matter how long the machine has been running.  The first counters
+    seen are only a baseline, so shots pulled while we weren't polling
+    aren't reported.
+    """
+
+    __slots__ = ("_counts",)
+
+    def __init__(self):
+        """Initialize the detector with no baseline."""
+        self._counts = {}
+
+    def reset(self):
+        """Forget the baseline, e.g. when the counter offsets change."""
+        self._counts.clear()
+
+    def detect(self, status):
+        """Return the key of each shot pulled since the last call."""
+        shots = []
+        for counter, key in SHOT_COUNTERS.items():
+            count = status.get(counter)
+            last = self._counts.get(counter)
+            self._counts[counter] = count
+            if count is None or last is None or count <= last:
+                continue
+
+            if count - last > MAX_SHOTS_PER_POLL:
+                _LOGGER.debug(
+                    f"{counter} went from {last} to {count}, only reporting {MAX_SHOTS_PER_POLL} shots"
+                )
+            shots.extend([key] * min(count - last, MAX_SHOTS_PER_POLL))
+        return shots
+
+
+class SlidingWindow:
+    """Count of events over a trailing span of time, kept in fixed-size buckets.
+
+    Buckets are numbered from the epoch, so a saved window lines up with the
+    clock again when it's restored.  Moving the window forward clears only
+    the buckets that fell out of it and keeps a running total, so adding and
+    reading are O(1) per bucket that elapsed.
+    """
+
+    __slots__ = ("width", "counts", "total", "bucket")
+
+    def __init__(self, span, buckets):
+        """Initialize an empty window."""
+        self.width = span / buckets
+        self.counts = [0] * buckets
+        self.total = 0
+        self.bucket = None
+
+    def _advance(self, now):
+        bucket = int(now // self.width)
+        if self.bucket is None or bucket - self.bucket >= len(self.counts):
+            self.counts = [0] * len(self.counts)
+            self.total = 0
+        elif bucket > self.bucket:
+            for x in range(self.bucket + 1, bucket + 1):
+                pos = x % len(self.counts)
+                self.total -= self.counts[pos]
+                self.counts[pos] = 0
+        else:
+            """The clock went backwards, so keep adding to the newest bucket."""
+            return
+        self.bucket = bucket
+
+    def add(self, count, now):
+        """Count events that happened now."""
+        self._advance(now)
+        self.counts[self.bucket % len(self.counts)] += count
+        self.total += count
+
+    def value(self, now):
+        """Return the number of events within the span."""
+        self._advance(now)
+        return self.total
+
+    def as_dict(self):
+        """Return the window in a form that can be saved."""
+        return {"bucket": self.bucket, "counts": self.counts}
+
+    def restore(self, data):
+        """Load a saved window, unless its buckets don't match this one's."""
+        if len(data.get("counts", [])) != len(self.counts):
+            return
+        self.bucket = data["bucket"]
+        self.counts = list(data["counts"])
+        self.total = sum(self.counts)
+
+
+class ShotThroughput:
+    """Shots per hour, shift and day, for the machine and for each key.
+
+    The windows' values are published as status keys like shots_per_hour
+    and shots_per_hour_k1, so the sensors read them like any other status.
+    """
+
+    __slots__ = ("_windows",)
+
+    def __init__(self, windows=SHOT_WINDOWS):
+        """Initialize a window for every span and key."""
+        self._windows = {
+            window: {
+                key: SlidingWindow(span, buckets) for key in SHOT_COUNTERS.values()
+            }
+            for window, (span, buckets) in windows.items()
+        }
+
+    def add(self, shots, now=None):
+        """Count the shots returned by the detector."""
+        now = time.time() if now is None else now
+        for key, count in Counter(shots).items():
+            for windows in self._windows.values():
+                windows[key].add(count, now)
+
+    def status(self, now=None):
+        """Return the status keys with the shots in each window."""
+        now = time.time() if now is None else now
+        status = {}
+        for window, windows in self._windows.items():
+            counts = {key: x.value(now) for key, x in windows.items()}
+            status[get_key((SHOTS_PER, window))] = sum(counts.values())
+            status.update(
+                {get_key((SHOTS_PER, window, key)): x for key, x in counts.items()}
+            )
+        return status
+
+    def as_dict(self):
+        """Return every window in a form that can be saved."""
+        return {
+            window: {key: x.as_dict() for key, x in windows.items()}
+            for window, windows in self._windows.items()
+        }
+
+    def restore(self, data):
+        """Load saved windows, skipping any that no longer exist."""
+        for window, windows in self._windows.items():
+            for key, x in windows.items():
+                saved = data.get(window, {}).get(key)
+                if saved:
+                    x.restore(saved)
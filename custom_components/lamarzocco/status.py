@@ -0,0 +1,301 @@
+"""Machine status store for La Marzocco espresso machines."""
+
+import logging
+from dataclasses import dataclass, fields
+
+from lmdirect.msgs import (
+    AUTO,
+    DAYS,
+    DOSE,
+    DRINKS,
+    HOUR,
+    MIN,
+    OFF,
+    OFFSET,
+    ON,
+    PREBREWING,
+    PREINFUSION,
+    TIME,
+    TOFF,
+    TON,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class _Unset:
+    """Marks a status value the machine hasn't reported."""
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return "UNSET"
+
+
+UNSET = _Unset()
+
+"""Programmable keys, including the continuous key, which only has a dose."""
+KEYS = ["k1", "k2", "k3", "k4", "k5"]
+
+
+@dataclass(slots=True)
+class Boilers:
+    """Power, boiler temperatures and heater state."""
+
+    power: object = UNSET
+    steam_boiler_enable: object = UNSET
+    coffee_set_temp: object = UNSET
+    steam_set_temp: object = UNSET
+    coffee_temp: object = UNSET
+    steam_temp: object = UNSET
+    heating_state: object = UNSET
+    water_reservoir_contact: object = UNSET
+
+
+@dataclass(slots=True)
+class KeyRecipe:
+    """Dose, prebrew and preinfusion settings and drink counter of one key."""
+
+    dose: object = UNSET
+    prebrewing_ton: object = UNSET
+    prebrewing_toff: object = UNSET
+    preinfusion: object = UNSET
+    drinks: object = UNSET
+    drinks_offset: object = UNSET
+
+
+@dataclass(slots=True)
+class DaySchedule:
+    """Auto on/off setting and times for one day of the week."""
+
+    auto: object = UNSET
+    on_hour: object = UNSET
+    on_min: object = UNSET
+    off_hour: object = UNSET
+    off_min: object = UNSET
+
+
+@dataclass(slots=True)
+class Counters:
+    """Drink and usage counters."""
+
+    continuous: object = UNSET
+    continuous_offset: object = UNSET
+    total_coffee: object = UNSET
+    total_coffee_activations: object = UNSET
+    hot_water: object = UNSET
+    hot_water_2: object = UNSET
+    drinks_hot_water: object = UNSET
+    drink_mystery: object = UNSET
+    total_flushing: object = UNSET
+    flushing_offset: object = UNSET
+    coffee_heating_element_hours: object = UNSET
+    steam_heating_element_hours: object = UNSET
+    machine_running_seconds: object = UNSET
+    days_since_built: object = UNSET
+    pump_on_seconds: object = UNSET
+    water_on_seconds: object = UNSET
+
+
+@dataclass(slots=True)
+class Factory:
+    """Factory calibration."""
+
+    t_unit: object = UNSET
+    pid_offset: object = UNSET
+    water_filter_liters: object = UNSET
+    brew_group_offset: object = UNSET
+    factory_offset: object = UNSET
+
+
+def _build_slots():
+    """Map each modeled status key to its block, the index within the block and the field."""
+    slots = {}
+    slots.update({x.name: ("boilers", None, x.name) for x in fields(Boilers)})
+    slots.update({x.name: ("counters", None, x.name) for x in fields(Counters)})
+    slots.update({x.name: ("factory", None, x.name) for x in fields(Factory)})
+
+    for index, key in enumerate(KEYS):
+        slots.update(
+            {
+                "_".join((DOSE, key)): ("recipes", index, "dose"),
+                "_".join((PREBREWING, TON, key)): ("recipes", index, "prebrewing_ton"),
+                "_".join((PREBREWING, TOFF, key)): ("recipes", index, "prebrewing_toff"),
+                "_".join((PREINFUSION, key)): ("recipes", index, "preinfusion"),
+                "_".join((DRINKS, key)): ("recipes", index, "drinks"),
+                "_".join((DRINKS, key, OFFSET)): ("recipes", index, "drinks_offset"),
+            }
+        )
+
+    for index, day in enumerate(DAYS):
+        slots.update(
+            {
+                "_".join((day, AUTO)): ("schedule", index, "auto"),
+                "_".join((day, ON, HOUR)): ("schedule", index, "on_hour"),
+                "_".join((day, ON, MIN)): ("schedule", index, "on_min"),
+                "_".join((day, OFF, HOUR)): ("schedule", index, "off_hour"),
+                "_".join((day, OFF, MIN)): ("schedule", index, "off_min"),
+            }
+        )
+
+    return slots
+
+
+SLOTS = _build_slots()
+
+
+def _build_block_keys():
+    """Map each block and index to the status key of each of its fields."""
+    block_keys = {}
+    for key, (block, index, field) in SLOTS.items():
+        block_keys.setdefault((block, index), {})[field] = key
+    return block_keys
+
+
+"""The status keys of each block, for building typed snapshots."""
+BLOCK_KEYS = _build_block_keys()
+
+"""Formatted on/off times, stored whenever their hour or minute is written."""
+DERIVED = {
+    "_".join((day, state, TIME)): (
+        "_".join((day, state, HOUR)),
+        "_".join((day, state, MIN)),
+    )
+    for day in DAYS
+    for state in [ON, OFF]
+}
+DEPENDENTS = {source: key for key, sources in DERIVED.items() for source in sources}
+
+
+class StatusStore(dict):
+    """Machine status as a dictionary that remembers which keys changed.
+
+    lmdirect, the entities and their attributes all read the status by
+    string key on every update, so reads are plain dictionary reads.  Writes
+    go through __setitem__, which catches responses and optimistic command
+    updates alike without touching the library, and the formatted on/off
+    times are stored whenever their hour or minute is written rather than
+    formatted on every read.  The typed blocks are snapshots of the modeled
+    keys.
+    """
+
+    __slots__ = ("_changed",)
+
+    def __init__(self, *args, **kwargs):
+        """Initialize the store and the set of changed keys."""
+        super().__init__()
+        self._changed = set()
+        self.update(*args, **kwargs)
+
+    def __setitem__(self, key, value):
+        if key in DERIVED:
+            return
+
+        if self.get(key, UNSET) != value:
+            self._changed.add(key)
+        super().__setitem__(key, value)
+
+        if key in DEPENDENTS:
+            self._derive(DEPENDENTS[key])
+
+    def __delitem__(self, key):
+        if key in DERIVED:
+            raise KeyError(key)
+
+        super().__delitem__(key)
+        self._changed.add(key)
+
+        if key in DEPENDENTS:
+            self._derive(DEPENDENTS[key])
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __repr__(self):
+        return f"{type(self).__name__}({super().__repr__()})"
+
+    def _derive(self, key):
+        """Store a formatted time from its hour and minute, or drop it if either is missing."""
+        hour, minute = DERIVED[key]
+        if hour in self and minute in self:
+            value = f"{'%02d' % self[hour]}:{'%02d' % self[minute]}"
+            if self.get(key) != value:
+                self._changed.add(key)
+                super().__setitem__(key, value)
+        elif key in self:
+            super().__delitem__(key)
+            self._changed.add(key)
+
+    def update(self, *args, **kwargs):
+        """Update the store one key at a time so that changes are recorded."""
+        if args and args[0] is self:
+            return
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        """Set a key if it's missing, recording the change, and return its value."""
+        if key not in self:
+            self[key] = default
+        return self.get(key)
+
+    def pop(self, key, *default):
+        """Remove a key, recording the change, and return its value."""
+        if key in self:
+            value = self[key]
+            del self[key]
+            return value
+        if default:
+            return default[0]
+        raise KeyError(key)
+
+    def popitem(self):
+        """Remove the last stored key that isn't a formatted time and return it with its value."""
+        key = next((x for x in reversed(self) if x not in DERIVED), None)
+        if key is None:
+            raise KeyError("popitem(): status is empty")
+        return key, self.pop(key)
+
+    def clear(self):
+        """Remove every key, recording the changes."""
+        self._changed.update(self)
+        super().clear()
+
+    def pop_changed(self):
+        """Return the keys that changed since the last call and start over."""
+        changed, self._changed = self._changed, set()
+        return changed
+
+    def _snapshot(self, cls, block, index=None):
+        return cls(
+            **{
+                field: self.get(key, UNSET)
+                for field, key in BLOCK_KEYS[(block, index)].items()
+            }
+        )
+
+    @property
+    def boilers(self):
+        """Return the power, boiler temperatures and heater state."""
+        return self._snapshot(Boilers, "boilers")
+
+    @property
+    def recipes(self):
+        """Return the settings and drink counter of each key."""
+        return tuple(self._snapshot(KeyRecipe, "recipes", x) for x in range(len(KEYS)))
+
+    @property
+    def schedule(self):
+        """Return the auto on/off setting and times of each day."""
+        return tuple(self._snapshot(DaySchedule, "schedule", x) for x in range(len(DAYS)))
+
+    @property
+    def counters(self):
+        """Return the drink and usage counters."""
+        return self._snapshot(Counters, "counters")
+
+    @property
+    def factory(self):
+        """Return the factory calibration."""
+        return self._snapshot(Factory, "factory")
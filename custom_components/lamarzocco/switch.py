@@ -28,13 +28,14 @@ from .const import (
     MODEL_GS3_AV,
     MODEL_GS3_MP,
     MODEL_LM,
+    PLATFORM_SWITCH,
     TYPE_AUTO_ON_OFF,
     TYPE_MAIN,
     TYPE_PREBREW,
     TYPE_PREINFUSION,
     TYPE_STEAM_BOILER_ENABLE,
 )
-from .entity_base import EntityBase
+from .entity_base import EntityBase, compile_entities
 from .services import async_setup_entity_services, call_service
 
 _LOGGER = logging.getLogger(__name__)
@@ -106,9 +107,8 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
 
     lm = hass.data[DOMAIN][config_entry.entry_id]
     async_add_entities(
-        LaMarzoccoSwitch(lm, switch_type, hass, config_entry)
-        for switch_type in ENTITIES
-        if lm.model_name in ENTITIES[switch_type][ENTITY_MAP]
+        LaMarzoccoSwitch(lm, descriptor, hass, config_entry)
+        for descriptor in compile_entities(lm, PLATFORM_SWITCH, ENTITIES)
     )
 
     await async_setup_entity_services(lm)
@@ -117,31 +117,19 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
 class LaMarzoccoSwitch(EntityBase, SwitchEntity):
     """Switches representing espresso machine power, prebrew, and auto on/off."""
 
-    def __init__(self, lm, switch_type, hass, config_entry):
+    def __init__(self, lm, descriptor, hass, config_entry):
         """Initialise switches."""
-        self._object_id = switch_type
-        self._hass = hass
-        self._lm = lm
-        self._entities = ENTITIES
-        self._entity_type = self._entities[self._object_id][ENTITY_TYPE]
-
-        self._lm.register_callback(self.update_callback)
+        self._init_entity(lm, descriptor, hass)
 
     async def async_turn_on(self, **kwargs) -> None:
         """Turn device on."""
-        await call_service(
-            getattr(self._lm, self._entities[self._object_id][ENTITY_FUNC]), True
-        )
+        await call_service(self._desc.func, True)
 
     async def async_turn_off(self, **kwargs) -> None:
         """Turn device off."""
-        await call_service(
-            getattr(self._lm, self._entities[self._object_id][ENTITY_FUNC]), False
-        )
+        await call_service(self._desc.func, False)
 
     @property
     def is_on(self) -> bool:
         """Return true if device is on."""
-        return self._lm.current_status.get(
-            self._get_key(self._entities[self._object_id][ENTITY_TAG]), False
-        ) in [True, ENABLED]
+        return self._lm.current_status.get(self._desc.key, False) in [True, ENABLED]
@@ -16,6 +16,7 @@ from .const import (
     ATTR_MAP_COFFEE,
     ATTR_MAP_STEAM,
     DOMAIN,
+    ENTITY_FUNC,
     ENTITY_ICON,
     ENTITY_MAP,
     ENTITY_NAME,
@@ -26,6 +27,7 @@ from .const import (
     MODEL_GS3_AV,
     MODEL_GS3_MP,
     MODEL_LM,
+    PLATFORM_WATER_HEATER,
     TEMP_COFFEE,
     TSET_COFFEE,
     TEMP_STEAM,
@@ -33,16 +35,9 @@ from .const import (
     TYPE_COFFEE_TEMP,
     TYPE_STEAM_TEMP,
 )
-from .entity_base import EntityBase
+from .entity_base import EntityBase, compile_entities
 from .services import async_setup_entity_services, call_service
 
-"""Min/Max coffee and team temps."""
-COFFEE_MIN_TEMP = 87
-COFFEE_MAX_TEMP = 100
-
-STEAM_MIN_TEMP = 110
-STEAM_MAX_TEMP = 132
-
 _LOGGER = logging.getLogger(__name__)
 
 ENTITIES = {
@@ -57,6 +52,7 @@ ENTITIES = {
         },
         ENTITY_TYPE: TYPE_COFFEE_TEMP,
         ENTITY_ICON: "mdi:water-boiler",
+        ENTITY_FUNC: "set_coffee_temp",
         ENTITY_UNITS: TEMP_CELSIUS,
     },
     "steam": {
@@ -69,6 +65,7 @@ ENTITIES = {
         },
         ENTITY_TYPE: TYPE_STEAM_TEMP,
         ENTITY_ICON: "mdi:water-boiler",
+        ENTITY_FUNC: "set_steam_temp",
         ENTITY_UNITS: TEMP_CELSIUS,
     },
 }
@@ -79,9 +76,8 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
     lm = hass.data[DOMAIN][config_entry.entry_id]
 
     async_add_entities(
-        LaMarzoccoWaterHeater(lm, water_heater_type, hass, config_entry)
-        for water_heater_type in ENTITIES
-        if lm.model_name in ENTITIES[water_heater_type][ENTITY_MAP]
+        LaMarzoccoWaterHeater(lm, descriptor, hass, config_entry)
+        for descriptor in compile_entities(lm, PLATFORM_WATER_HEATER, ENTITIES)
     )
 
     await async_setup_entity_services(lm)
@@ -94,19 +90,12 @@ class LaMarzoccoWaterHeater(EntityBase, WaterHeaterEntity):
     _attr_supported_features = SUPPORT_TARGET_TEMPERATURE
     _attr_precision = PRECISION_TENTHS
 
-    def __init__(self, lm, water_heater_type, hass, config_entry):
+    def __init__(self, lm, descriptor, hass, config_entry):
         """Initialize water heater."""
-        self._object_id = water_heater_type
-        self._lm = lm
-        self._entities = ENTITIES
-        self._hass = hass
-        self._entity_type = self._entities[self._object_id][ENTITY_TYPE]
+        self._init_entity(lm, descriptor, hass)
 
         """Set dynamic properties."""
-        self._attr_min_temp = COFFEE_MIN_TEMP if self._object_id == "coffee" else STEAM_MIN_TEMP
-        self._attr_max_temp = COFFEE_MAX_TEMP if self._object_id == "coffee" else STEAM_MAX_TEMP
-
-        self._lm.register_callback(self.update_callback)
+        self._attr_min_temp, self._attr_max_temp = lm.profile.temp_limits[self._object_id]
 
     @property
     def state(self):
@@ -118,9 +107,7 @@ class LaMarzoccoWaterHeater(EntityBase, WaterHeaterEntity):
         """Return the current temperature."""
         return show_temp(
             self.hass,
-            self._lm.current_status.get(
-                self._entities[self._object_id][ENTITY_TEMP_TAG], 0
-            ),
+            self._lm.current_status.get(self._desc.temp_key, 0),
             self.temperature_unit,
             self.precision,
         )
@@ -130,9 +117,7 @@ class LaMarzoccoWaterHeater(EntityBase, WaterHeaterEntity):
         """Return the target temperature."""
         return show_temp(
             self.hass,
-            self._lm.current_status.get(
-                self._entities[self._object_id][ENTITY_TSET_TAG], 0
-            ),
+            self._lm.current_status.get(self._desc.tset_key, 0),
             self.temperature_unit,
             self.precision,
         )
@@ -140,7 +125,7 @@ class LaMarzoccoWaterHeater(EntityBase, WaterHeaterEntity):
     @property
     def temperature_unit(self):
         """Return the unit of measurement used by the platform."""
-        return self._entities[self._object_id][ENTITY_UNITS]
+        return self._desc.units
 
     @property
     def state_attributes(self):
@@ -153,8 +138,6 @@ class LaMarzoccoWaterHeater(EntityBase, WaterHeaterEntity):
     async def async_set_temperature(self, **kwargs):
         """Service call to set the temp of either the coffee or steam boilers."""
         temperature = kwargs.get("temperature", None)
-        func = getattr(self._lm, "set_" + self._object_id + "_temp")
-
         _LOGGER.debug(f"Setting {self._object_id} to {temperature}")
-        await call_service(func, temp=round(temperature, 1))
+        await call_service(self._desc.func, temp=round(temperature, 1))
         return True
@@ -0,0 +1 @@
+"""Simulator, fixture data and helpers shared by the tests and the benchmarks."""
@@ -0,0 +1,55 @@
+"""Machine details and captured replies used by the tests and the benchmarks."""
+from copy import deepcopy
+
+from homeassistant.const import CONF_HOST, CONF_PASSWORD, CONF_PORT, CONF_USERNAME
+from lmdirect.msgs import DRINK_OFFSET_MAP
+
+from custom_components.lamarzocco.const import (
+    CONF_CLIENT_ID,
+    CONF_CLIENT_SECRET,
+    CONF_KEY,
+    CONF_MACHINE_NAME,
+    CONF_MODEL_NAME,
+    CONF_SERIAL_NUMBER,
+)
+from custom_components.lamarzocco.entity_base import get_key
+
+from .fake_machine import KEY
+
+"""A configured GS3 AV with its key already saved."""
+DATA = {
+    CONF_HOST: "1.2.3.4",
+    CONF_PORT: 1774,
+    CONF_CLIENT_ID: "aabbcc",
+    CONF_CLIENT_SECRET: "bbccdd",
+    CONF_USERNAME: "username",
+    CONF_PASSWORD: "password",
+    CONF_SERIAL_NUMBER: "GS012345",
+    CONF_MODEL_NAME: "GS3 AV",
+    CONF_MACHINE_NAME: "bbbbb",
+    CONF_KEY: KEY,
+}
+
+"""Drink counter offsets as restored from a saved status."""
+SAVED_OFFSETS = {get_key(x): 0 for x in DRINK_OFFSET_MAP.values()}
+
+"""One reply of each type that's read, captured from a GS3 AV.  The factory config goes first, since other fields depend on it."""
+FRAMES = [
+    "R4060002021140F00B003D704500050000F000F0064006400CA000600000101BD0099000056",
+    "R40000023018C020000000000000000000000000100000000000000010100005003AA0372000205B6",
+    "R0000001F010000026E313903C204D7000B16212C0B16212C00780076006E008203E808B9",
+    "R0310001DFF061106110611061106110611061100000000000000000000000000002F",
+    "R03000007001A0906020115A6",
+    "R0020002C0000014B00000098000001B1000000250000056A00000923000000180000000A00000AEE000000180000003A48",
+    "Z600000160000000000000000000000000401000A000E03B604D4E604",
+    "R010000115A000000000000000000000000000000004B",
+]
+
+
+def machine_data(machine=None):
+    """Return a copy of the machine details, pointed at a simulated machine if one is given."""
+    data = deepcopy(DATA)
+    if machine:
+        data[CONF_HOST] = "127.0.0.1"
+        data[CONF_PORT] = machine.port
+    return data
@@ -0,0 +1,239 @@
+"""Local simulator of a La Marzocco machine's TCP interface."""
+import asyncio
+import logging
+import random
+
+from lmdirect.aescipher import AESCipher
+from lmdirect.msgs import MODEL_GS3_AV, MODEL_LM, MSGS, Msg
+
+_LOGGER = logging.getLogger(__name__)
+
+KEY = "12345678901234567890123456789012"
+
+"""Canned responses captured from a GS3 AV, keyed by message."""
+RESPONSES = {
+    Msg.GET_STATUS: "R40000023018C020000000000000000000000000100000000000000010100005003AA0372000205B6",
+    Msg.GET_CONFIG: "R0000001F010000026E313903C204D7000B16212C0B16212C00780076006E008203E808B9",
+    Msg.GET_AUTO_ON_OFF_TIMES: "R0310001DFF061106110611061106110611061100000000000000000000000000002F",
+    Msg.GET_DRINK_STATS: "R0020002C0000014B00000098000001B1000000250000056A00000923000000180000000A00000AEE000000180000003A48",
+    Msg.GET_FACTORY_CONFIG: "R4060002021140F00B003D704500050000F000F0064006400CA000600000101BD0099000056",
+}
+
+"""The machine follows a status request with an unsolicited temperature report."""
+TEMP_REPORT = MSGS[Msg.GET_TEMP_REPORT].msg
+TEMPS = "03C204D7"
+
+"""Addresses of the values the simulator changes by itself, and of the register with side effects."""
+POWER = 0x0000
+COFFEE_SET_TEMP = 0x0007
+STEAM_SET_TEMP = 0x0009
+DRINKS = 0x0020
+TOTAL_COFFEE = 0x0034
+TOTAL_COFFEE_ACTIVATIONS = 0x0040
+TEMPS_ADDRESS = 0x401C
+STEAM_BOILER_ENABLE = 0x4022
+FACTORY_OFFSET = 0x407D
+BOILER_CONTROL = 0x00E1
+START_BACKFLUSH = 0x82
+
+ROOM_TEMP = 20
+
+
+def checksum(buffer):
+    """Compute the check byte the same way the machine does."""
+    return "%0.2X" % (sum(bytes(buffer, "utf-8")) % 256)
+
+
+def response(msg_type, msg, data):
+    """Build a response with its check byte."""
+    plaintext = msg_type + msg + data
+    return plaintext + checksum(plaintext)
+
+
+def parse(msg):
+    """Return the address and length in a message, which is all the machine needs to serve it."""
+    return int(msg[:4], 16), int(msg[4:], 16)
+
+
+class FakeMachine:
+    """Emulate a GS3 AV, GS3 MP or Linea Mini on a local port.
+
+    Like the real controller, the simulator is a flat register space: a
+    read returns the bytes at the message's address and a write stores its
+    data there, so reads reflect every write.  The registers start out with
+    responses captured from a GS3 AV, and everything else reads as zeros.
+
+    Knobs for tests and load testing:
+    - accept_delay: how long the controller takes to accept a connection
+    - latency and jitter: how long each reply takes, give or take up to jitter
+    - drop_rate: the chance that a request gets no reply at all
+    - ignore: messages that never get a reply
+    - rejected: writes that are acknowledged but not applied
+    - heat_rate: how far the boilers move towards their setpoints on each
+      status request, as a fraction of the difference
+    - responses: replies to use instead of the registers, by message
+    """
+
+    def __init__(
+        self,
+        key=KEY,
+        model=MODEL_GS3_AV,
+        accept_delay=0,
+        latency=0,
+        jitter=0,
+        drop_rate=0,
+        ignore=(),
+        heat_rate=0,
+        seed=None,
+    ):
+        """Initialize the simulated machine."""
+        self._cipher = AESCipher(key)
+        self._server = None
+        self._writers = set()
+        self._random = random.Random(seed)
+        self.model = model
+        self.accept_delay = accept_delay
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.ignore = set(ignore)
+        self.rejected = set()
+        self.heat_rate = heat_rate
+        self.responses = {}
+        self.connects = 0
+        self.requests = []
+        self.registers = bytearray(0x10000)
+
+        for plaintext in [*RESPONSES.values(), response(Msg.READ, TEMP_REPORT, TEMPS)]:
+            self.write_register(plaintext[1:9], plaintext[9:-2])
+
+        """The Linea Mini has no brew group offset."""
+        if model == MODEL_LM:
+            self.registers[FACTORY_OFFSET] = 0
+
+    @property
+    def port(self):
+        """Return the port the simulator is listening on."""
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self):
+        """Start listening."""
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def stop(self):
+        """Hang up on every client and stop listening."""
+        self.drop()
+        self._server.close()
+        await self._server.wait_closed()
+
+        """Let the connection handlers see the hang up and finish."""
+        await asyncio.sleep(0.01)
+
+    def drop(self):
+        """Hang up on every client, like a machine that was power cycled."""
+        [writer.close() for writer in self._writers]
+        self._writers.clear()
+
+    def read_register(self, msg):
+        """Return the data that a read of msg returns, as hex."""
+        address, length = parse(msg)
+        return self.registers[address : address + length].hex().upper()
+
+    def write_register(self, msg, data):
+        """Store the data of a write of msg."""
+        address, length = parse(msg)
+        self.registers[address : address + length] = bytes.fromhex(data)[:length]
+
+    def _word(self, address, size=2):
+        return int.from_bytes(self.registers[address : address + size], "big")
+
+    def _set_word(self, address, value, size=2):
+        self.registers[address : address + size] = value.to_bytes(size, "big")
+
+    def pull_shot(self, key=1):
+        """Count a drink on a key the way the machine does."""
+        address = DRINKS + (key - 1) * 4
+        for counter in [address, TOTAL_COFFEE, TOTAL_COFFEE_ACTIVATIONS]:
+            self._set_word(counter, self._word(counter, 4) + 1, 4)
+
+    def _heat(self):
+        """Move each boiler towards its setpoint, or towards room temperature when the machine is off."""
+        for offset, setpoint in [(0, COFFEE_SET_TEMP), (2, STEAM_SET_TEMP)]:
+            target = self._word(setpoint) if self.registers[POWER] else ROOM_TEMP * 10
+            current = self._word(TEMPS_ADDRESS + offset)
+            self._set_word(
+                TEMPS_ADDRESS + offset,
+                current + round((target - current) * self.heat_rate),
+            )
+
+    def _write(self, msg, data):
+        address, _ = parse(msg)
+
+        """The steam boiler switch and the backflush share a register."""
+        if address == BOILER_CONTROL:
+            value = int(data[:2], 16)
+            if value != START_BACKFLUSH:
+                self.registers[STEAM_BOILER_ENABLE] = value >> 7
+            return
+
+        self.write_register(msg, data)
+
+    def _respond(self, plaintext):
+        msg_type, msg = plaintext[0], plaintext[1:9]
+        self.requests.append(msg)
+
+        if msg in self.ignore or self._random.random() < self.drop_rate:
+            return []
+
+        if msg_type == Msg.WRITE:
+            if msg not in self.rejected:
+                self._write(msg, plaintext[9:-2])
+            return [response(Msg.WRITE, msg, Msg.RESPONSE_GOOD)]
+
+        override = next(
+            (self.responses[x] for x in self.responses if MSGS[x].msg == msg),
+            None,
+        )
+        responses = [override or response(Msg.READ, msg, self.read_register(msg))]
+
+        if msg == MSGS[Msg.GET_STATUS].msg:
+            if self.heat_rate:
+                self._heat()
+            responses.append(
+                response(Msg.READ, TEMP_REPORT, self.read_register(TEMP_REPORT))
+            )
+
+        return responses
+
+    def _frame(self, plaintext):
+        return b"@" + self._cipher.encrypt(plaintext) + b"%"
+
+    async def _reply(self, writer, frames):
+        """Send the replies to one request after the simulated latency."""
+        delay = max(0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+        if delay:
+            await asyncio.sleep(delay)
+        if not writer.is_closing():
+            [writer.write(x) for x in frames]
+            await writer.drain()
+
+    async def _handle(self, reader, writer):
+        if self.accept_delay:
+            await asyncio.sleep(self.accept_delay)
+
+        self.connects += 1
+        self._writers.add(writer)
+
+        try:
+            while True:
+                frame = await reader.readuntil(b"%")
+                plaintext = self._cipher.decrypt(frame[1:-1])
+                frames = [self._frame(x) for x in self._respond(plaintext)]
+                if frames:
+                    await self._reply(writer, frames)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
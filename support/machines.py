@@ -0,0 +1,25 @@
+"""Integration instances for the tests and the benchmarks."""
+from homeassistant.core import HomeAssistant
+
+from custom_components.lamarzocco.api import LaMarzocco
+
+from .data import SAVED_OFFSETS, machine_data
+
+
+def connect(machine, hass=None):
+    """Return an integration instance talking to a simulated machine.
+
+    Like a machine whose status was saved, it doesn't need the cloud for
+    the drink offsets.
+    """
+    lm = LaMarzocco(hass, data=machine_data(machine))
+    lm._run = True
+    lm._current_status.update(SAVED_OFFSETS)
+    return lm
+
+
+async def async_create_hass(config_dir="."):
+    """Return a bare Home Assistant instance that entities can write their states to."""
+    hass = HomeAssistant()
+    hass.config.config_dir = config_dir
+    return hass
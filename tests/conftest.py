@@ -17,9 +17,28 @@
 
 import pytest
 
+from support.fake_machine import FakeMachine
+from support.machines import connect
+
 
 # This fixture enables loading custom integrations in all tests.
 # Remove to enable selective use of this fixture
 @pytest.fixture(autouse=True)
 def auto_enable_custom_integrations(enable_custom_integrations):
     yield
+
+
+@pytest.fixture
+async def machine(socket_enabled):
+    """Run a fake machine on localhost."""
+    fake = await FakeMachine().start()
+    yield fake
+    await fake.stop()
+
+
+@pytest.fixture
+async def lm(hass, machine):
+    """Create a machine connection pointed at the fake machine."""
+    lm = connect(machine, hass)
+    yield lm
+    await lm.close()
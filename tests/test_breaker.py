@@ -0,0 +1,132 @@
+"""Test backing off from a machine that can't be reached."""
+import socket
+from copy import deepcopy
+
+import pytest
+
+from homeassistant import data_entry_flow
+from homeassistant.const import CONF_HOST, CONF_PORT
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.lamarzocco.api import LaMarzocco
+from custom_components.lamarzocco.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from custom_components.lamarzocco.clock import VirtualClock
+from custom_components.lamarzocco.const import DOMAIN, POLL_INTERVAL
+
+from support.data import DATA, SAVED_OFFSETS
+
+
+async def test_backoff():
+    """Test that the circuit opens after a few failures and backs off exponentially up to the cap."""
+    clock = VirtualClock()
+    breaker = CircuitBreaker(threshold=3, base=30, cap=100, clock=clock)
+
+    assert not breaker.record_failure()
+    assert not breaker.record_failure()
+    assert breaker.allow()
+    assert breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+    await clock.run(30)
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+
+    """The probe failed, so wait twice as long, and then no longer than the cap."""
+    assert not breaker.record_failure()
+    assert breaker.backoff == 60
+    breaker.record_failure()
+    assert breaker.backoff == 100
+
+    breaker.reset()
+    assert breaker.allow()
+    assert breaker.record_success()
+    assert breaker.state == CLOSED
+    assert not breaker.is_open
+
+
+def unused_port():
+    """Return a local port that nothing listens on."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def test_unreachable_machine(hass, machine, lm):
+    """Test that polls back off from a machine that refuses connections and recover when it's announced again."""
+    await lm.poll()
+    connects = machine.connects
+
+    lm._machine_info[CONF_PORT] = unused_port()
+    await lm._close()
+
+    [await lm.poll() for _ in range(3)]
+    assert lm.unreachable
+    assert lm.current_status[POLL_INTERVAL] == 30
+
+    """Polls before the backoff has passed don't even try to connect."""
+    assert await lm.poll() > 0
+    assert lm.unreachable
+
+    """Commands fail right away rather than waiting out a connection timeout."""
+    with pytest.raises(Exception, match="backing off"):
+        await lm.set_power(True)
+
+    await lm.announced("127.0.0.1", machine.port)
+    await lm.poll()
+    assert not lm.unreachable
+    assert machine.connects == connects + 1
+
+
+async def test_announced_at_new_address(hass, machine, socket_enabled):
+    """Test that a machine set up from a config entry follows it to the address it announced."""
+    data = deepcopy(DATA)
+    data[CONF_HOST] = "127.0.0.1"
+    data[CONF_PORT] = unused_port()
+    config_entry = MockConfigEntry(domain=DOMAIN, data=data)
+    config_entry.add_to_hass(hass)
+
+    lm = LaMarzocco(hass, config_entry=config_entry)
+    lm._current_status.update(SAVED_OFFSETS)
+    [await lm.poll() for _ in range(3)]
+    assert lm.unreachable
+
+    await lm.announced("127.0.0.1", machine.port)
+    await lm.poll()
+    assert not lm.unreachable
+    assert machine.connects == 1
+    await lm.close()
+
+
+async def test_zeroconf_announcement(hass, machine, socket_enabled):
+    """Test that discovering a configured machine again probes it right away and saves its new address."""
+    data = deepcopy(DATA)
+    data[CONF_HOST] = "127.0.0.1"
+    data[CONF_PORT] = unused_port()
+    config_entry = MockConfigEntry(
+        domain=DOMAIN, data=data, unique_id=data["serial_number"]
+    )
+    config_entry.add_to_hass(hass)
+
+    lm = LaMarzocco(hass, config_entry=config_entry)
+    hass.data.setdefault(DOMAIN, {})[config_entry.entry_id] = lm
+    lm._run = True
+    lm._current_status.update(SAVED_OFFSETS)
+    [await lm.poll() for _ in range(3)]
+    assert lm.unreachable
+
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN,
+        context={"source": "zeroconf"},
+        data={
+            "host": "127.0.0.1",
+            "port": machine.port,
+            "properties": {"_raw": {"serial_number": data["serial_number"].encode()}},
+        },
+    )
+    assert result["type"] == data_entry_flow.RESULT_TYPE_ABORT
+    assert config_entry.data[CONF_PORT] == machine.port
+
+    await lm.poll()
+    assert not lm.unreachable
+    await lm.close()
@@ -0,0 +1,67 @@
+"""Test capturing and replaying the raw traffic with a machine."""
+import asyncio
+from copy import deepcopy
+
+from lmdirect.msgs import MSGS, Msg
+
+from custom_components.lamarzocco.api import LaMarzocco
+from custom_components.lamarzocco.capture import (
+    RECEIVED,
+    SENT,
+    FrameCapture,
+    read_capture,
+    replay,
+)
+
+from support.data import DATA
+
+
+async def test_capture_and_replay(hass, lm, tmp_path):
+    """Test that a replayed capture leaves a machine with the status the capture was taken from."""
+    path = tmp_path / "machine.capture"
+    lm._capture = FrameCapture(str(path))
+
+    await lm.poll()
+    await lm.poll()
+    assert not lm._capture.pending
+
+    frames = read_capture(path)
+    sent = [x[2][1:9] for x in frames if x[1] == SENT]
+    assert MSGS[Msg.GET_STATUS].msg in sent
+    assert any(x[1] == RECEIVED for x in frames)
+
+    replayed = LaMarzocco(hass, data=deepcopy(DATA))
+    assert await replay(replayed, frames, speed=None) == sum(
+        1 for x in frames if x[1] == RECEIVED
+    )
+    assert dict(replayed.current_status) == {
+        k: v for k, v in lm.current_status.items() if k in replayed.current_status
+    }
+    assert replayed.frames_skipped == lm.frames_skipped
+
+
+async def test_replay_speed(hass):
+    """Test that a capture plays back at its own pace divided by the speed."""
+    frames = [(100.0, SENT, "R40000023XX"), (101.0, SENT, "R0000001FXX")]
+    lm = LaMarzocco(hass, data=deepcopy(DATA))
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    await replay(lm, frames, speed=10)
+    assert 0.09 <= loop.time() - start < 0.5
+    assert lm._responses_waiting == ["40000023", "0000001F"]
+
+
+def test_rotation(tmp_path):
+    """Test that a full capture file is moved aside and only the newest backups are kept."""
+    path = str(tmp_path / "machine.capture")
+    capture = FrameCapture(path, max_bytes=10, backups=2)
+
+    for index in range(4):
+        capture.record(RECEIVED, f"R{index}", now=index)
+        capture.flush()
+
+    assert [x[2] for x in read_capture(path)] == ["R3"]
+    assert [x[2] for x in read_capture(path + ".1")] == ["R2"]
+    assert [x[2] for x in read_capture(path + ".2")] == ["R1"]
+    assert not (tmp_path / "machine.capture.3").exists()
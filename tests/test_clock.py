@@ -0,0 +1,67 @@
+"""Test running the integration against the simulator on a virtual clock."""
+import time
+
+from homeassistant.helpers import device_registry as dr
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.lamarzocco.api import LaMarzocco
+from custom_components.lamarzocco.clock import DATA_CLOCK, VirtualClock
+from custom_components.lamarzocco.const import DOMAIN, POLL_INTERVAL
+
+from support.data import SAVED_OFFSETS, machine_data
+from support.fake_machine import FakeMachine
+
+HOUR = 3600
+
+
+async def test_day_of_polling(hass, socket_enabled):
+    """Test that a simulated day of polling takes seconds and keeps time the way real polling would."""
+    clock = hass.data[DATA_CLOCK] = VirtualClock()
+    machine = await FakeMachine(heat_rate=0.2).start()
+
+    data = machine_data(machine)
+    lm = LaMarzocco(hass, data=data)
+    lm._current_status.update(SAVED_OFFSETS)
+
+    """The firmware version is written to the device."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data=data)
+    config_entry.add_to_hass(hass)
+    dr.async_get(hass).async_get_or_create(
+        config_entry_id=config_entry.entry_id,
+        identifiers={(DOMAIN, lm.serial_number)},
+    )
+
+    await lm.init_data(hass)
+    scheduler = lm._scheduler
+
+    start = time.monotonic()
+    try:
+        """A cold machine is polled faster while it heats up, then settles at the idle interval."""
+        machine.registers[0x401C:0x4020] = bytes.fromhex("00C800C8")
+        await clock.run(HOUR, busy=lambda: scheduler.busy)
+        times = [x["time"] for x in lm.history.samples(60, clock.time())]
+        gaps = [
+            (dt_util.parse_datetime(b) - dt_util.parse_datetime(a)).total_seconds()
+            for a, b in zip(times, times[1:])
+        ]
+        assert 9 <= gaps[0] <= 11
+        assert 27 <= gaps[-1] <= 33
+        assert lm.current_status[POLL_INTERVAL] == 30
+
+        machine.pull_shot(1)
+        await clock.run(HOUR / 2, busy=lambda: scheduler.busy)
+        assert lm.current_status["shots_per_hour"] == 1
+
+        """The shot ages out of the hourly window but not the daily one."""
+        await clock.run(22.5 * HOUR, busy=lambda: scheduler.busy)
+        assert lm.current_status["shots_per_hour"] == 0
+        assert lm.current_status["shots_per_day"] == 1
+    finally:
+        scheduler.stop()
+        await lm.close()
+        await machine.stop()
+
+    samples = lm.history.samples(24 * 60, clock.time())
+    assert len(samples) == 2048
+    assert time.monotonic() - start < 60
@@ -0,0 +1,134 @@
+"""Test how La Marzocco machine keys are retrieved and cached."""
+from copy import deepcopy
+from unittest.mock import patch
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.lamarzocco.api import KeyCheckingCipher, LaMarzocco
+from custom_components.lamarzocco.const import CONF_KEY, CONF_TOKEN, DOMAIN
+from support.data import DATA, SAVED_OFFSETS
+
+from .test_incoming_data import DATA as DATA_IN, DRINKS_DATA
+
+OLD_KEY = DATA[CONF_KEY]
+NEW_KEY = "abcdefghijklmnopqrstuvwxyzabcdef"
+
+
+@pytest.fixture
+async def cloud(socket_enabled):
+    """Run a local stand-in for the La Marzocco cloud and point the integration at it."""
+    requests = []
+
+    async def token(request):
+        requests.append("token")
+        return web.json_response(
+            {"access_token": "token", "token_type": "bearer", "expires_in": 3600}
+        )
+
+    async def customer(request):
+        requests.append("customer")
+        fleet = [
+            {
+                "communicationKey": key,
+                "name": "bbbbb",
+                "machine": {"serialNumber": serial_number, "model": {"name": "GS3 AV"}},
+            }
+            for key, serial_number in [(OLD_KEY, "LM000000"), (NEW_KEY, "GS012345")]
+        ]
+        return web.json_response({"data": {"fleet": fleet}})
+
+    async def counters(request):
+        requests.append("counters")
+        return web.json_response(
+            {"data": [{"coffeeType": x, "count": 10 + x} for x in range(-1, 5)]}
+        )
+
+    async def updates(request):
+        requests.append("updates")
+        return web.json_response({"data": []})
+
+    app = web.Application()
+    app.router.add_post("/token", token)
+    app.router.add_get("/customer", customer)
+    app.router.add_get("/counters/{serial_number}", counters)
+    app.router.add_get("/updates", updates)
+
+    server = TestServer(app)
+    await server.start_server()
+    url = str(server.make_url(""))
+
+    with patch("custom_components.lamarzocco.cloud.TOKEN_URL", url + "/token"), patch(
+        "custom_components.lamarzocco.cloud.CUSTOMER_URL", url + "/customer"
+    ), patch(
+        "custom_components.lamarzocco.cloud.DRINK_COUNTER_URL",
+        url + "/counters/{serial_number}",
+    ), patch(
+        "custom_components.lamarzocco.cloud.UPDATE_URL", url + "/updates"
+    ):
+        yield requests
+
+    await server.close()
+
+
+async def test_saved_key_skips_cloud(hass, cloud):
+    """Test that a machine with a saved key and saved drink offsets doesn't go to the cloud."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data=deepcopy(DATA), entry_id=1)
+    config_entry.add_to_hass(hass)
+    lm = LaMarzocco(hass, config_entry=config_entry)
+
+    """The first start after an upgrade has a saved key but no saved status, so it needs the drink offsets."""
+    await lm.retrieve_machine_info(config_entry.data)
+
+    assert cloud == ["token", "customer", "counters", "updates"]
+    assert lm.current_status["drinks_k1_offset"] == 10
+    assert lm.current_status["continuous_offset"] == 14
+    assert lm.current_status["flushing_offset"] == 9
+
+    """The totals carry on from the cloud's counts instead of starting from zero."""
+    await lm.process_data(DATA_IN[DRINKS_DATA]["msg"])
+    assert lm.current_status["drinks_k1"] == 10
+    assert lm.current_status["continuous"] == 14
+    assert lm.current_status["total_flushing"] == 9
+    assert lm.current_status["drinks_k1_offset"] == 321
+    offsets = {k: v for k, v in lm.current_status.items() if k.endswith("_offset")}
+
+    """Once the offsets are saved with the status, the cloud isn't needed."""
+    cloud.clear()
+    lm = LaMarzocco(hass, config_entry=config_entry)
+    lm._current_status.update(offsets)
+    machine_info = await lm.retrieve_machine_info(config_entry.data)
+
+    assert machine_info[CONF_KEY] == NEW_KEY
+    assert isinstance(lm._cipher, KeyCheckingCipher)
+    assert not cloud
+
+
+async def test_rejected_key_refreshed_from_cloud(hass, cloud):
+    """Test that a rejected key is replaced from the cloud and the token reused."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data=deepcopy(DATA), entry_id=1)
+    config_entry.add_to_hass(hass)
+    lm = LaMarzocco(hass, config_entry=config_entry)
+    lm._current_status.update(SAVED_OFFSETS)
+    await lm.retrieve_machine_info(config_entry.data)
+    assert not cloud
+
+    """A response the saved key can't decrypt marks it as rejected."""
+    assert lm._cipher.decrypt("bm90IGEgYmxvY2s=") is None
+    assert lm._key_rejected
+
+    await lm.retrieve_machine_info(config_entry.data)
+
+    assert cloud == ["token", "customer", "updates"]
+    assert not lm._key_rejected
+    assert config_entry.data[CONF_KEY] == NEW_KEY
+    assert config_entry.data[CONF_TOKEN]["access_token"] == "token"
+
+    """The token is still valid and the counters are known, so only the machine info is fetched."""
+    cloud.clear()
+    lm._reject_key()
+    await lm.retrieve_machine_info(config_entry.data)
+
+    assert cloud == ["customer", "updates"]
@@ -0,0 +1,85 @@
+"""Test coalescing of writes to the same setting."""
+import asyncio
+
+from lmdirect.msgs import MSGS, Msg
+
+from custom_components.lamarzocco.coalescer import WriteCoalescer
+
+
+class Recorder:
+    """Record the writes that reach the machine."""
+
+    def __init__(self, fail=False):
+        self.writes = []
+        self.fail = fail
+
+    async def write(self, value):
+        self.writes.append(value)
+        if self.fail:
+            raise ValueError(f"Rejected {value}")
+        return value
+
+
+async def test_last_value_written_once():
+    """Test that quick writes to one setting are sent once, with the last value, and every caller gets the result."""
+    coalescer = WriteCoalescer(delay=0.05)
+    recorder = Recorder()
+
+    results = await asyncio.gather(
+        *[coalescer.submit("coffee", recorder.write, x) for x in [93.0, 93.5, 94.0]]
+    )
+
+    assert recorder.writes == [94.0]
+    assert results == [94.0] * 3
+
+
+async def test_settings_written_separately():
+    """Test that writes to different settings aren't merged."""
+    coalescer = WriteCoalescer(delay=0.05)
+    recorder = Recorder()
+
+    await asyncio.gather(
+        coalescer.submit("k1", recorder.write, 1),
+        coalescer.submit("k2", recorder.write, 2),
+        coalescer.submit("k1", recorder.write, 3),
+    )
+
+    assert sorted(recorder.writes) == [2, 3]
+
+
+async def test_failure_reaches_every_caller():
+    """Test that a write that fails is reported to every caller waiting for it."""
+    coalescer = WriteCoalescer(delay=0.05)
+    recorder = Recorder(fail=True)
+
+    results = await asyncio.gather(
+        coalescer.submit("dose", recorder.write, 1),
+        coalescer.submit("dose", recorder.write, 2),
+        return_exceptions=True,
+    )
+
+    assert recorder.writes == [2]
+    assert all(isinstance(x, ValueError) for x in results)
+
+
+async def test_flush():
+    """Test that flushing writes what's pending without waiting for the window to close."""
+    coalescer = WriteCoalescer(delay=60)
+    recorder = Recorder()
+
+    task = asyncio.create_task(coalescer.submit("steam", recorder.write, 124.0))
+    await asyncio.sleep(0)
+    await coalescer.flush()
+
+    assert recorder.writes == [124.0]
+    assert await task == 124.0
+
+
+async def test_slider_drag_sends_one_write(hass, machine, lm):
+    """Test that dragging the setpoint sends a single write to the machine."""
+    await lm.poll()
+    machine.requests.clear()
+
+    await asyncio.gather(*[lm.set_coffee_temp(temp=x) for x in [92.0, 92.5, 93.0]])
+
+    assert machine.requests.count(MSGS[Msg.SET_COFFEE_TEMP].msg) == 1
@@ -0,0 +1,104 @@
+"""Test the prioritized command queue."""
+import asyncio
+import time
+
+import pytest
+
+from custom_components.lamarzocco.command_queue import (
+    PRIORITY_COMMAND,
+    PRIORITY_POLL,
+    PRIORITY_READBACK,
+    CommandQueue,
+    send_priority,
+)
+from custom_components.lamarzocco.const import QUEUE_DEPTH, QUEUE_WAIT
+
+
+class Link:
+    """Record writes, optionally taking a while or failing."""
+
+    def __init__(self, delay=0, fail=False):
+        self.writes = []
+        self.times = []
+        self.delay = delay
+        self.fail = fail
+
+    async def write(self, frames):
+        if self.fail:
+            raise ConnectionError("Session closed")
+        self.writes.append(frames)
+        self.times.append(time.monotonic())
+        await asyncio.sleep(self.delay)
+
+
+async def test_commands_preempt_polls():
+    """Test that frames queued behind a write go out by priority, then in order."""
+    link = Link(delay=0.05)
+    queue = CommandQueue(link.write, interval=0)
+
+    first = asyncio.create_task(queue.put([b"poll 1"], PRIORITY_POLL))
+    await asyncio.sleep(0.01)
+    await asyncio.gather(
+        first,
+        queue.put([b"poll 2"], PRIORITY_POLL),
+        queue.put([b"readback"], PRIORITY_READBACK),
+        queue.put([b"command 1"], PRIORITY_COMMAND),
+        queue.put([b"command 2"]),
+    )
+
+    assert link.writes == [
+        [b"poll 1"],
+        [b"command 1"],
+        [b"command 2"],
+        [b"readback"],
+        [b"poll 2"],
+    ]
+
+    depth, wait = queue.pop_stats()
+    assert depth == 4
+    assert wait >= 0.05
+    assert queue.pop_stats() == (0, 0)
+
+
+async def test_priority_from_context():
+    """Test that frames take the priority of the task that sends them."""
+    link = Link(delay=0.05)
+    queue = CommandQueue(link.write, interval=0)
+
+    async def poll():
+        send_priority.set(PRIORITY_POLL)
+        await queue.put([b"poll"])
+
+    busy = asyncio.create_task(queue.put([b"busy"]))
+    await asyncio.sleep(0.01)
+    await asyncio.gather(busy, asyncio.create_task(poll()), queue.put([b"command"]))
+
+    assert link.writes == [[b"busy"], [b"command"], [b"poll"]]
+
+
+async def test_writes_rate_limited():
+    """Test that writes are spaced by the send interval."""
+    link = Link()
+    queue = CommandQueue(link.write, interval=0.05)
+
+    await asyncio.gather(*[queue.put([bytes([x])]) for x in range(3)])
+
+    gaps = [b - a for a, b in zip(link.times, link.times[1:])]
+    assert len(gaps) == 2
+    assert all(x >= 0.045 for x in gaps)
+
+
+async def test_write_failure_reported():
+    """Test that a failed write is raised to the sender."""
+    queue = CommandQueue(Link(fail=True).write, interval=0)
+
+    with pytest.raises(ConnectionError):
+        await queue.put([b"command"])
+
+
+async def test_queue_diagnostics(hass, machine, lm):
+    """Test that polls publish the queue depth and wait time."""
+    await lm.poll()
+
+    assert lm.current_status[QUEUE_DEPTH] >= 1
+    assert lm.current_status[QUEUE_WAIT] >= 0
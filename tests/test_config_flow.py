@@ -12,11 +12,15 @@ from homeassistant.const import (
     CONF_PORT,
     CONF_USERNAME,
 )
+from pytest_homeassistant_custom_component.common import MockConfigEntry
 
 from custom_components.lamarzocco import config_flow
 from custom_components.lamarzocco.config_flow import InvalidAuth, validate_input
 from custom_components.lamarzocco.const import (
+    CONF_CAPTURE,
     CONF_MACHINE_NAME,
+    CONF_MAX_INTERVAL,
+    CONF_MIN_INTERVAL,
     CONF_MODEL_NAME,
     CONF_SERIAL_NUMBER,
     DOMAIN,
@@ -294,3 +298,33 @@ async def test_zeroconf_auth_fail(
 
     print(result["errors"])
     assert result["errors"]["base"] == "invalid_auth"
+
+
+async def test_options_flow(hass, enable_custom_integrations):
+    """Test that the options flow stores the polling bounds."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data={}, entry_id=1)
+    config_entry.add_to_hass(hass)
+
+    result = await hass.config_entries.options.async_init(config_entry.entry_id)
+
+    assert result["type"] == data_entry_flow.RESULT_TYPE_FORM
+    assert result["step_id"] == "init"
+
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        user_input={CONF_MIN_INTERVAL: 90, CONF_MAX_INTERVAL: 30},
+    )
+
+    assert result["errors"]["base"] == "invalid_interval"
+
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        user_input={CONF_MIN_INTERVAL: 3, CONF_MAX_INTERVAL: 90},
+    )
+
+    assert result["type"] == data_entry_flow.RESULT_TYPE_CREATE_ENTRY
+    assert config_entry.options == {
+        CONF_MIN_INTERVAL: 3,
+        CONF_MAX_INTERVAL: 90,
+        CONF_CAPTURE: False,
+    }
@@ -0,0 +1,84 @@
+"""Test that the struct decoder matches lmdirect's decoder."""
+from copy import deepcopy
+from unittest.mock import patch
+
+import pytest
+from lmdirect.msgs import MSGS, T_UNIT, TSET_COFFEE, UNIT_FAHRENHEIT, Msg
+
+from custom_components.lamarzocco.api import LaMarzocco
+from custom_components.lamarzocco.decoder import BITFIELD, HEATING, LAYOUTS
+
+from support.data import DATA as MACHINE_DATA
+
+from .test_incoming_data import DATA, FACTORY_CONFIG
+
+"""Decode the factory config first, since other fields depend on it."""
+FRAMES = [DATA[FACTORY_CONFIG]["msg"]] + [
+    DATA[x]["msg"] for x in DATA if DATA[x]["msg"][0] != Msg.WRITE
+]
+
+
+def make_machine():
+    return LaMarzocco(None, data=deepcopy(MACHINE_DATA))
+
+
+async def decode_both(frames, prepare=None):
+    """Process frames with the struct decoder and with lmdirect's and return both statuses."""
+    statuses = []
+    for layouts in [LAYOUTS, {}]:
+        lm = make_machine()
+        if prepare:
+            prepare(lm)
+        with patch("custom_components.lamarzocco.api.LAYOUTS", layouts):
+            [await lm.process_data(x) for x in frames]
+        statuses.append(dict(lm.current_status))
+    return statuses
+
+
+def with_byte(frame, start, value):
+    """Replace one byte of a frame's data.  The check byte isn't verified."""
+    pos = 9 + start
+    return frame[:pos] + "%02X" % value + frame[pos + 2 :]
+
+
+async def test_fixtures_match_lmdirect():
+    """Test that every fixture decodes to the same status."""
+    ours, theirs = await decode_both(FRAMES)
+    assert ours == theirs
+
+
+@pytest.mark.parametrize("kind", [HEATING, BITFIELD])
+async def test_lookup_tables_match_lmdirect(kind):
+    """Test every value of the fields decoded through lookup tables."""
+    for frame in FRAMES:
+        layout = LAYOUTS[(frame[0], frame[1:9])]
+        for field in [x for x in layout.fields if x.kind == kind]:
+            """Only the low byte is looked up."""
+            start = field.end - 2
+            frames = [with_byte(frame, start, value) for value in range(256)]
+            for x in frames:
+                ours, theirs = await decode_both([FRAMES[0], x])
+                assert ours == theirs
+
+
+async def test_fahrenheit_and_cached_values_match_lmdirect():
+    """Test the paths that depend on the status and on values we just set."""
+
+    def prepare(lm):
+        lm._temp_state[TSET_COFFEE] = 93.5
+
+    """The unit is the fourth byte of the factory config."""
+    frames = [
+        with_byte(x, 6, UNIT_FAHRENHEIT) if x == FRAMES[0] else x for x in FRAMES
+    ]
+    ours, theirs = await decode_both(frames, prepare)
+    assert ours == theirs
+    assert ours[T_UNIT] == UNIT_FAHRENHEIT
+    assert ours[TSET_COFFEE] == 93.5
+
+
+async def test_short_frame_left_to_lmdirect():
+    """Test that data that doesn't fit the layout is handed to lmdirect, which fails the same way it always did."""
+    lm = make_machine()
+    with pytest.raises(ValueError):
+        await lm._populate_items("03", MSGS[Msg.GET_TEMP_REPORT])
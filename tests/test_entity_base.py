@@ -0,0 +1,54 @@
+"""Test the compiled La Marzocco entity descriptors."""
+from dataclasses import FrozenInstanceError
+from types import SimpleNamespace
+
+import pytest
+
+from custom_components.lamarzocco import sensor, switch
+from custom_components.lamarzocco.const import (
+    MODEL_GS3_MP,
+    MODEL_LM,
+    PLATFORM_SENSOR,
+    PLATFORM_SWITCH,
+)
+from custom_components.lamarzocco.entity_base import compile_entities
+from custom_components.lamarzocco.profile import resolve_profile
+
+
+def make_lm(model_name):
+    """Return a stand-in machine with the attributes compile_entities reads."""
+    return SimpleNamespace(
+        model_name=model_name,
+        profile=resolve_profile(model_name),
+        set_power=lambda power: power,
+        set_auto_on_off_global=lambda enable: enable,
+        set_prebrewing_enable=lambda enable: enable,
+        set_preinfusion_enable=lambda enable: enable,
+        set_steam_boiler_enable=lambda enable: enable,
+    )
+
+
+def test_compile_entities_for_model():
+    """Test that descriptors are filtered by model and hold joined keys and bound setters."""
+    lm = make_lm(MODEL_GS3_MP)
+    descriptors = {x.object_id: x for x in compile_entities(lm, PLATFORM_SWITCH, switch.ENTITIES)}
+
+    assert sorted(descriptors) == ["auto_on_off", "main", "steam_boiler_enable"]
+    assert descriptors["auto_on_off"].key == "global_auto"
+    assert descriptors["main"].func is lm.set_power
+    assert "global_auto" in descriptors["auto_on_off"].status_keys
+    assert all(isinstance(k, str) for k in descriptors["auto_on_off"].attr_keys)
+
+    with pytest.raises(FrozenInstanceError):
+        descriptors["main"].icon = "mdi:coffee"
+
+
+def test_compile_entities_list_tags():
+    """Test that list tags compile to a tuple of joined keys."""
+    descriptor, *_ = compile_entities(
+        make_lm(MODEL_LM), PLATFORM_SENSOR, sensor.ENTITIES
+    )
+
+    assert descriptor.keys[:2] == ("drinks_k1", "drinks_k2")
+    assert descriptor.func is None
+    assert not hasattr(descriptor, "__dict__")
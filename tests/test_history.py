@@ -0,0 +1,81 @@
+"""Test the temperature history."""
+import math
+from unittest.mock import patch
+
+import lmdirect
+from lmdirect.msgs import (
+    COFFEE_HEATER_ON,
+    HEATING_ON,
+    HEATING_STATE,
+    TEMP_COFFEE,
+    TEMP_STEAM,
+    TSET_COFFEE,
+    TSET_STEAM,
+)
+
+from custom_components.lamarzocco.const import DOMAIN, SERVICE_GET_HISTORY
+from custom_components.lamarzocco.history import SAMPLE_TIME, TemperatureHistory
+
+from .test_service_calls import setup_lm_machine, unload_lm_machine
+
+STATUS = {
+    TEMP_COFFEE: 93.4,
+    TSET_COFFEE: 94.0,
+    TEMP_STEAM: 120.5,
+    TSET_STEAM: 124.0,
+    HEATING_STATE: [HEATING_ON, COFFEE_HEATER_ON],
+}
+
+
+def test_history_window():
+    """Test that samples come back oldest first and only from the window asked for."""
+    history = TemperatureHistory(size=8)
+    for minute in range(5):
+        history.record({**STATUS, TEMP_COFFEE: 90 + minute}, now=minute * 60)
+
+    samples = history.samples(2, now=4 * 60)
+    assert [x[TEMP_COFFEE] for x in samples] == [92, 93, 94]
+    assert samples[0][SAMPLE_TIME] == "1970-01-01T00:02:00+00:00"
+    assert samples[0][TSET_STEAM] == 124.0
+    assert sorted(samples[0][HEATING_STATE]) == sorted(STATUS[HEATING_STATE])
+
+
+def test_history_is_bounded():
+    """Test that the buffer keeps the newest samples once it's full and never grows."""
+    history = TemperatureHistory(size=4)
+    nbytes = history.nbytes
+    for second in range(10):
+        history.record({**STATUS, TEMP_COFFEE: second}, now=second)
+
+    assert len(history) == 4
+    assert history.nbytes == nbytes
+    assert [x[TEMP_COFFEE] for x in history.samples(1, now=10)] == [6, 7, 8, 9]
+
+
+def test_history_missing_values():
+    """Test that values the machine didn't report come back as None."""
+    history = TemperatureHistory(size=4)
+    history.record({TEMP_COFFEE: 93.4}, now=0)
+
+    (sample,) = history.samples(1, now=0)
+    assert sample[TSET_COFFEE] is None
+    assert sample[HEATING_STATE] == []
+    assert not math.isnan(sample[TEMP_COFFEE])
+
+
+@patch.object(lmdirect.LMDirect, "_send_msg", autospec=True)
+async def test_get_history_service(mock_send_msg, hass, enable_custom_integrations):
+    """Test that the service returns the machine's samples."""
+    machine = await setup_lm_machine(hass)
+    machine.history.record(STATUS)
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_GET_HISTORY,
+        {"minutes": 5},
+        blocking=True,
+        return_response=True,
+    )
+
+    assert [x[TEMP_COFFEE] for x in response["samples"]] == [93.4]
+    await unload_lm_machine(hass)
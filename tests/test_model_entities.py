@@ -80,6 +80,9 @@ DATA = {
             "water_heater.bbbbb_coffee",
             "water_heater.bbbbb_steam",
             "sensor.bbbbb_total_drinks",
+            "sensor.bbbbb_shots_per_hour",
+            "sensor.bbbbb_shots_per_shift",
+            "sensor.bbbbb_shots_per_day",
             "switch.bbbbb_main",
             "switch.bbbbb_auto_on_off",
             "switch.bbbbb_prebrew",
@@ -95,6 +98,8 @@ DATA = {
             "set_dose_hot_water",
             "set_prebrew_times",
             "set_preinfusion_time",
+            "refresh",
+            "get_history",
         ],
     },
     MODEL_GS3_MP: {
@@ -105,12 +110,17 @@ DATA = {
             "water_heater.bbbbb_coffee",
             "water_heater.bbbbb_steam",
             "sensor.bbbbb_total_drinks",
+            "sensor.bbbbb_shots_per_hour",
+            "sensor.bbbbb_shots_per_shift",
+            "sensor.bbbbb_shots_per_day",
             "binary_sensor.bbbbb_water_reservoir",
         ],
         SERVICES: [
             "set_auto_on_off_enable",
             "set_auto_on_off_times",
             "set_dose_hot_water",
+            "refresh",
+            "get_history",
         ],
     },
     MODEL_LM: {
@@ -122,6 +132,9 @@ DATA = {
             "switch.bbbbb_preinfusion",
             "water_heater.bbbbb_coffee",
             "sensor.bbbbb_total_drinks",
+            "sensor.bbbbb_shots_per_hour",
+            "sensor.bbbbb_shots_per_shift",
+            "sensor.bbbbb_shots_per_day",
             "binary_sensor.bbbbb_water_reservoir",
             "button.bbbbb_start_backflush",
         ],
@@ -130,6 +143,8 @@ DATA = {
             "set_auto_on_off_times",
             "set_prebrew_times",
             "set_preinfusion_time",
+            "refresh",
+            "get_history",
         ],
     },
 }
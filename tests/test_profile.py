@@ -0,0 +1,36 @@
+"""Test La Marzocco model capability profiles."""
+import logging
+
+from lmdirect.msgs import Msg
+
+from custom_components.lamarzocco.const import (
+    MODEL_GS3_AV,
+    MODEL_GS3_MP,
+    PLATFORM_BUTTON,
+    PLATFORM_SWITCH,
+)
+from custom_components.lamarzocco.profile import resolve_profile
+
+
+def test_known_model():
+    """Test that a known model gets its own entities and services."""
+    profile = resolve_profile(MODEL_GS3_MP)
+
+    assert profile.true_model_name == MODEL_GS3_MP
+    assert PLATFORM_BUTTON not in profile.platforms
+    assert "prebrew" not in profile.entities[PLATFORM_SWITCH]
+    assert Msg.SET_DOSE not in profile.services
+    assert profile.key_count == 1
+    assert profile is resolve_profile(MODEL_GS3_MP)
+
+
+def test_unknown_model_logged_once(caplog):
+    """Test that an unknown model falls back to the GS3 AV and is only reported once."""
+    with caplog.at_level(logging.ERROR):
+        profile = resolve_profile("Brand New Model")
+        resolve_profile("Brand New Model")
+
+    assert profile.model_name == MODEL_GS3_AV
+    assert profile.true_model_name == "Brand New Model (Unknown)"
+    assert profile.key_count == 4
+    assert len(caplog.records) == 1
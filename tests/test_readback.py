@@ -0,0 +1,55 @@
+"""Test reading back the status blocks that commands wrote to."""
+from unittest.mock import patch
+
+from lmdirect.msgs import MSGS, TSET_COFFEE, Msg
+
+CONFIG = MSGS[Msg.GET_CONFIG].msg
+PREINFUSION = MSGS[Msg.GET_PREINFUSION_TIMES].msg
+
+
+async def test_write_confirmed(hass, machine, lm):
+    """Test that only the written block is read back, and that the written value stays once the machine reports it."""
+    await lm.poll()
+    temp = lm.current_status[TSET_COFFEE] + 1
+    await lm.set_coffee_temp(temp=temp)
+    assert lm.current_status[TSET_COFFEE] == temp
+
+    machine.requests.clear()
+    await lm.poll()
+
+    assert machine.requests == [CONFIG]
+    assert lm.current_status[TSET_COFFEE] == temp
+    assert TSET_COFFEE not in lm._temp_state
+
+
+async def test_write_rolled_back(hass, machine, lm, caplog):
+    """Test that the machine's value replaces the written one if the machine didn't take it."""
+    machine.rejected.add(MSGS[Msg.SET_COFFEE_TEMP].msg)
+    await lm.poll()
+    original = lm.current_status[TSET_COFFEE]
+    await lm.set_coffee_temp(temp=original + 1)
+    assert lm.current_status[TSET_COFFEE] == original + 1
+
+    await lm.poll()
+
+    assert lm.current_status[TSET_COFFEE] == original
+    assert "rather than the" in caplog.text
+
+    """The next poll is a normal one again."""
+    machine.requests.clear()
+    await lm.poll()
+    assert MSGS[Msg.GET_STATUS].msg in machine.requests
+
+
+async def test_unanswered_read_back_retried(hass, machine, lm):
+    """Test that a block a command wrote to is read on the next poll if its read back got no reply."""
+    await lm.poll()
+    machine.ignore.add(PREINFUSION)
+    await lm.set_preinfusion_time(key=1, seconds=2)
+    with patch("custom_components.lamarzocco.api.POLL_CYCLE_DEADLINE", 0.2):
+        await lm.poll()
+
+    machine.ignore.clear()
+    machine.requests.clear()
+    await lm.poll()
+    assert PREINFUSION in machine.requests
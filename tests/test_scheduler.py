@@ -0,0 +1,229 @@
+"""Test the La Marzocco polling schedule."""
+import asyncio
+from unittest.mock import patch
+
+from lmdirect.msgs import (
+    HEATING_STATE,
+    Msg,
+    POWER,
+    PUMP_ON,
+    STEAM_BOILER_ENABLE,
+    TEMP_COFFEE,
+    TEMP_STEAM,
+    TSET_COFFEE,
+    TSET_STEAM,
+)
+
+from custom_components.lamarzocco.clock import REAL_CLOCK, VirtualClock
+from custom_components.lamarzocco.const import (
+    POLLING_INTERVAL,
+    REFRESH_CYCLES,
+    REFRESH_MAX_AGE,
+)
+from custom_components.lamarzocco.scheduler import (
+    AdaptiveInterval,
+    PollScheduler,
+    RefreshSchedule,
+)
+
+MIN_INTERVAL = 5
+MAX_INTERVAL = 60
+
+IDLE = {
+    POWER: 1,
+    TEMP_COFFEE: 93.0,
+    TSET_COFFEE: 93.0,
+    TEMP_STEAM: 124.0,
+    TSET_STEAM: 124.0,
+    "drinks_k1": 10,
+}
+
+
+def make_interval(clock=REAL_CLOCK):
+    return AdaptiveInterval(MIN_INTERVAL, MAX_INTERVAL, clock=clock)
+
+
+def test_idle_machine_uses_default_interval():
+    assert make_interval().next_interval(IDLE) == POLLING_INTERVAL
+
+
+def test_standby_machine_uses_max_interval():
+    assert make_interval().next_interval({**IDLE, POWER: 0}) == MAX_INTERVAL
+
+
+def test_brewing_uses_min_interval():
+    assert (
+        make_interval().next_interval({**IDLE, HEATING_STATE: [PUMP_ON]})
+        == MIN_INTERVAL
+    )
+
+
+def test_drink_counter_change_uses_min_interval():
+    interval = make_interval()
+    assert interval.next_interval(IDLE) == POLLING_INTERVAL
+    assert interval.next_interval({**IDLE, "drinks_k1": 11}) == MIN_INTERVAL
+    assert interval.next_interval({**IDLE, "drinks_k1": 11}) == POLLING_INTERVAL
+
+
+def test_heating_up_polls_faster():
+    interval = make_interval()
+    assert interval.next_interval({**IDLE, TEMP_COFFEE: 60.0}) == MIN_INTERVAL * 2
+
+    """A cold steam boiler doesn't count when it's switched off."""
+    status = {**IDLE, TEMP_STEAM: 20.0, STEAM_BOILER_ENABLE: False}
+    assert interval.next_interval(status) == POLLING_INTERVAL
+
+
+async def test_recent_command_uses_min_interval():
+    clock = VirtualClock()
+    interval = make_interval(clock)
+    interval.note_command()
+    assert interval.next_interval({**IDLE, POWER: 0}) == MIN_INTERVAL
+
+    await clock.run(1000)
+    assert interval.next_interval({**IDLE, POWER: 0}) == MAX_INTERVAL
+
+
+def test_bounds_clamp_interval():
+    interval = AdaptiveInterval(40, 50)
+    assert interval.next_interval(IDLE) == 40
+    interval.set_bounds(10, 20)
+    assert interval.next_interval(IDLE) == 20
+
+
+class FakeMachine:
+    """Stand-in for LaMarzocco that records when it's polled."""
+
+    def __init__(self, tracker, serial_number, interval=POLLING_INTERVAL):
+        self.serial_number = serial_number
+        self.interval = interval
+        self.polls = 0
+        self._tracker = tracker
+
+    async def poll(self):
+        self._tracker["in_flight"] += 1
+        self._tracker["max_in_flight"] = max(
+            self._tracker["max_in_flight"], self._tracker["in_flight"]
+        )
+        await asyncio.sleep(0.01)
+        self._tracker["in_flight"] -= 1
+        self.polls += 1
+        return self.interval
+
+
+async def test_scheduler_caps_polls_in_flight(hass):
+    """Many machines share one scheduler without exceeding the in-flight cap."""
+    tracker = {"in_flight": 0, "max_in_flight": 0}
+    scheduler = PollScheduler(hass.loop, max_in_flight=3)
+    machines = [FakeMachine(tracker, f"sn{x}") for x in range(10)]
+
+    with patch("custom_components.lamarzocco.scheduler.STARTUP_STAGGER", 0):
+        [scheduler.add(machine) for machine in machines]
+
+    for _ in range(100):
+        if all(machine.polls for machine in machines):
+            break
+        await asyncio.sleep(0.01)
+
+    assert all(machine.polls == 1 for machine in machines)
+    assert tracker["max_in_flight"] == 3
+
+    [scheduler.remove(machine) for machine in machines]
+    await asyncio.sleep(0)
+    assert len(scheduler) == 0
+
+
+async def test_scheduler_expedite(hass):
+    """A machine can be pulled forward but never pushed back."""
+    tracker = {"in_flight": 0, "max_in_flight": 0}
+    scheduler = PollScheduler(hass.loop, jitter=0)
+    machine = FakeMachine(tracker, "sn", interval=3600)
+
+    scheduler.add(machine)
+    while not machine.polls:
+        await asyncio.sleep(0.01)
+
+    """The machine is now an hour out, so expediting brings it in."""
+    scheduler.expedite(machine, 0.01)
+    scheduler.expedite(machine, 60)
+    await asyncio.sleep(0.1)
+    assert machine.polls == 2
+
+    scheduler.remove(machine)
+
+
+async def test_scheduler_expedite_during_poll(hass):
+    """A machine expedited while it's being polled is polled again as soon as that poll is done."""
+    tracker = {"in_flight": 0, "max_in_flight": 0}
+    scheduler = PollScheduler(hass.loop, jitter=0)
+    machine = FakeMachine(tracker, "sn", interval=3600)
+
+    scheduler.add(machine)
+    while not tracker["in_flight"]:
+        await asyncio.sleep(0)
+
+    scheduler.expedite(machine, 0)
+    await asyncio.sleep(0.1)
+    assert machine.polls == 2
+
+    scheduler.remove(machine)
+
+
+def test_refresh_tiers():
+    """Reads go out every cycle, every few cycles or when they get too old."""
+    schedule = RefreshSchedule(
+        {
+            Msg.GET_STATUS: {REFRESH_CYCLES: 1},
+            Msg.GET_DRINK_STATS: {REFRESH_CYCLES: 3},
+            Msg.GET_FACTORY_CONFIG: {REFRESH_MAX_AGE: 3600},
+        }
+    )
+
+    """Everything is read the first time."""
+    due = schedule.due(now=0)
+    assert due == [Msg.GET_STATUS, Msg.GET_DRINK_STATS, Msg.GET_FACTORY_CONFIG]
+    schedule.refreshed(due, now=0)
+
+    assert schedule.due(now=10) == [Msg.GET_STATUS]
+    schedule.refreshed([Msg.GET_STATUS], now=10)
+    assert schedule.due(now=20) == [Msg.GET_STATUS]
+    schedule.refreshed([Msg.GET_STATUS], now=20)
+    assert schedule.due(now=30) == [Msg.GET_STATUS, Msg.GET_DRINK_STATS]
+
+    """The drink stats got no reply, so they're still due."""
+    schedule.refreshed([Msg.GET_STATUS], now=30)
+    assert schedule.due(now=3600) == [
+        Msg.GET_STATUS,
+        Msg.GET_DRINK_STATS,
+        Msg.GET_FACTORY_CONFIG,
+    ]
+
+    schedule.refreshed([Msg.GET_STATUS, Msg.GET_DRINK_STATS, Msg.GET_FACTORY_CONFIG], now=3600)
+    schedule.invalidate()
+    assert len(schedule.due(now=3610)) == 3
+
+    """A command makes only the reads it wrote to due again."""
+    schedule.refreshed([Msg.GET_STATUS, Msg.GET_DRINK_STATS, Msg.GET_FACTORY_CONFIG], now=3610)
+    schedule.invalidate([Msg.GET_FACTORY_CONFIG])
+    assert schedule.due(now=3620) == [Msg.GET_STATUS, Msg.GET_FACTORY_CONFIG]
+
+
+async def test_scheduler_on_virtual_clock(hass):
+    """An hour of polling on a simulated clock happens at the machine's own intervals, without waiting."""
+    clock = VirtualClock()
+    tracker = {"in_flight": 0, "max_in_flight": 0}
+    scheduler = PollScheduler(hass.loop, jitter=0, clock=clock)
+    machine = FakeMachine(tracker, "sn", interval=30)
+
+    with patch("custom_components.lamarzocco.scheduler.STARTUP_STAGGER", 0):
+        scheduler.add(machine)
+
+    """Time stands still while a poll is in flight, so every poll starts on the 30s grid."""
+    await clock.run(3600, busy=lambda: scheduler.busy)
+    assert machine.polls == 121
+
+    scheduler.expedite(machine, 5)
+    await clock.run(5, busy=lambda: scheduler.busy)
+    assert machine.polls == 122
+
+    scheduler.stop()
@@ -0,0 +1,159 @@
+"""Test the persistent session to La Marzocco machines."""
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from lmdirect.connection import ConnectionFail
+from lmdirect.msgs import FIRMWARE_VER, MSGS, Msg
+
+from custom_components.lamarzocco.api import TEMP_REPORT
+from custom_components.lamarzocco.const import (
+    DEFAULT_MIN_INTERVAL,
+    FRAMES_DECODED,
+    FRAMES_SKIPPED,
+    POLL_JITTER,
+    POLLING_INTERVAL,
+    REFRESH_CYCLES,
+    SESSION_IDLE_TIMEOUT,
+    STATUS_REFRESH,
+)
+from custom_components.lamarzocco.scheduler import PollScheduler
+
+
+async def wait_for_responses(lm):
+    """Wait until the machine has answered the last poll."""
+    for _ in range(100):
+        if not lm._responses_waiting:
+            return
+        await asyncio.sleep(0.01)
+
+
+async def test_polls_share_one_connection(hass, machine, lm):
+    """Test that back-to-back polls reuse the same connection."""
+    await lm.poll()
+    await wait_for_responses(lm)
+    await lm.poll()
+    await wait_for_responses(lm)
+
+    assert machine.connects == 1
+    assert lm._session.connects == 1
+    assert machine.requests.count(MSGS[Msg.GET_STATUS].msg) == 2
+    assert not lm._responses_waiting
+    assert lm.current_status[FIRMWARE_VER] == "1.40"
+
+
+async def test_reconnects_after_machine_hangs_up(hass, machine, lm):
+    """Test that the next poll reconnects if the machine dropped the session."""
+    await lm.poll()
+    await wait_for_responses(lm)
+
+    machine.drop()
+    await asyncio.sleep(0.1)
+    assert not lm._session.is_open
+
+    await lm.poll()
+    await wait_for_responses(lm)
+
+    assert machine.connects == 2
+    assert not lm._responses_waiting
+
+
+async def test_poll_waits_for_every_reply(hass, machine, lm):
+    """Test that a poll sends the whole cycle at once and returns when every reply is in."""
+    await lm.poll()
+
+    assert machine.requests == [MSGS[x].msg for x in STATUS_REFRESH]
+    assert TEMP_REPORT in lm._cycle_received
+    assert not lm._responses_waiting
+
+
+async def test_poll_cycle_deadline(hass, machine, lm):
+    """Test that a poll gives up on replies that don't arrive by the deadline."""
+    missing = MSGS[Msg.GET_USAGE_STATS].msg
+    machine.ignore.add(missing)
+
+    with patch("custom_components.lamarzocco.api.POLL_CYCLE_DEADLINE", 0.2):
+        await lm.poll()
+
+    assert lm._responses_waiting == [missing]
+    assert lm.current_status[FIRMWARE_VER] == "1.40"
+
+
+async def test_polls_skip_reads_that_are_not_due(hass, machine, lm):
+    """Test that later polls only read what changes often, until a refresh is requested."""
+    await lm.poll()
+    machine.requests.clear()
+
+    await lm.poll()
+    assert machine.requests == [
+        MSGS[x].msg for x in STATUS_REFRESH if STATUS_REFRESH[x] == {REFRESH_CYCLES: 1}
+    ]
+
+    machine.requests.clear()
+    lm.refresh()
+    await lm.poll()
+    assert machine.requests == [MSGS[x].msg for x in STATUS_REFRESH]
+
+
+async def test_unchanged_replies_skipped(hass, machine, lm):
+    """Test that replies identical to the last ones aren't decoded again."""
+    await lm.poll()
+    assert lm.frames_skipped == 0
+    decoded = lm.frames_decoded
+
+    lm._current_status[FIRMWARE_VER] = "0.00"
+    lm.refresh()
+    await lm.poll()
+
+    """refresh() forgets the last replies, so everything is decoded again."""
+    assert lm.frames_decoded == decoded * 2
+    assert lm.current_status[FIRMWARE_VER] == "1.40"
+
+    lm._refresh.invalidate()
+    await lm.poll()
+    assert lm.frames_skipped == decoded
+    assert not lm._responses_waiting
+
+    """The counts of the last poll are shown as attributes of the main switch."""
+    assert lm.current_status[FRAMES_SKIPPED] == decoded
+    assert lm.current_status[FRAMES_DECODED] == 0
+
+
+async def test_close_stops_poll_in_flight(hass, machine, lm):
+    """Test that a poll under way when the machine is closed doesn't open a new session."""
+    scheduler = lm._scheduler = PollScheduler(hass.loop, max_in_flight=1)
+
+    """Hold up the poll before it connects, as a slow cloud or a busy scheduler would."""
+    await scheduler._semaphore.acquire()
+    scheduler.add(lm)
+    await asyncio.sleep(0.05)
+    assert scheduler.busy
+
+    await lm.close()
+    scheduler._semaphore.release()
+    await asyncio.sleep(0.05)
+
+    assert not scheduler.busy
+    assert machine.connects == 0
+    with pytest.raises(ConnectionFail):
+        await lm._connect()
+
+
+async def test_session_closes_between_slow_polls(hass, machine, lm):
+    """Test that the session stays open between fast polls and frees the machine between idle ones."""
+    assert DEFAULT_MIN_INTERVAL * 2 * (1 + POLL_JITTER) < SESSION_IDLE_TIMEOUT
+    assert SESSION_IDLE_TIMEOUT < POLLING_INTERVAL * (1 - POLL_JITTER)
+
+    with patch("custom_components.lamarzocco.session.SESSION_IDLE_TIMEOUT", 0.2):
+        await lm.poll()
+        await wait_for_responses(lm)
+        await asyncio.sleep(0.1)
+        assert lm._session.is_open
+
+        await asyncio.sleep(0.3)
+        assert not lm._session.is_open
+        assert not machine._writers
+
+        await lm.poll()
+        await wait_for_responses(lm)
+        assert machine.connects == 2
@@ -4,8 +4,11 @@ from copy import deepcopy
 from unittest.mock import patch
 
 import lmdirect
+import pytest
 from homeassistant.const import CONF_HOST, CONF_PASSWORD, CONF_USERNAME
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.setup import async_setup_component
+from lmdirect.msgs import TEMP_COFFEE, Msg
 from pytest_homeassistant_custom_component.common import MockConfigEntry
 
 from custom_components.lamarzocco.const import (
@@ -66,3 +69,122 @@ async def test_setup_lm_machine(mock_send_msg, hass, enable_custom_integrations)
 
     assert await hass.config_entries.async_unload(ENTRY_ID)
     assert not hass.data[DOMAIN]
+
+
+@patch.object(lmdirect.LMDirect, "_send_msg", autospec=True)
+async def test_setup_multiple_machines(mock_send_msg, hass, enable_custom_integrations):
+    """Test that several machines can be configured side by side."""
+    await async_setup_component(hass, DOMAIN, {})
+
+    for entry_id, serial_number in [(1, "aabbcc"), (2, "ddeeff")]:
+        config_entry = MockConfigEntry(
+            domain=DOMAIN,
+            data={
+                **deepcopy(DATA),
+                CONF_SERIAL_NUMBER: serial_number,
+                CONF_MACHINE_NAME: serial_number,
+            },
+            entry_id=entry_id,
+            unique_id=serial_number,
+        )
+        config_entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+
+    assert len(hass.data[DOMAIN]) == 2
+    assert hass.states.get("switch.aabbcc_main")
+    assert hass.states.get("switch.ddeeff_main")
+
+    """With two machines, services need to know which one to talk to."""
+    with pytest.raises(HomeAssistantError):
+        await hass.services.async_call(
+            DOMAIN, "set_dose", {"key": 1, "pulses": 100}, blocking=True
+        )
+
+    mock_send_msg.reset_mock()
+    await hass.services.async_call(
+        DOMAIN,
+        "set_dose",
+        {CONF_SERIAL_NUMBER: "ddeeff", "key": 1, "pulses": 100},
+        blocking=True,
+    )
+    await hass.async_block_till_done()
+    assert [
+        x.args[0].serial_number
+        for x in mock_send_msg.call_args_list
+        if x.args[1] == Msg.SET_DOSE
+    ] == ["ddeeff"]
+
+    """Services stay registered until the last machine is removed."""
+    assert await hass.config_entries.async_unload(1)
+    assert hass.services.has_service(DOMAIN, "set_dose")
+    assert await hass.config_entries.async_unload(2)
+    assert not hass.services.async_services().get(DOMAIN)
+    assert not hass.data[DOMAIN]
+
+
+@patch.object(lmdirect.LMDirect, "_send_msg", autospec=True)
+async def test_state_writes_batched(mock_send_msg, hass, enable_custom_integrations):
+    """Test that only entities whose inputs changed are written, once per poll cycle."""
+    machine = await setup_lm_machine(hass)
+    machine._current_status.pop_changed()
+
+    with patch(
+        "homeassistant.helpers.entity.Entity.async_write_ha_state", autospec=True
+    ) as mock_write:
+        """Responses still outstanding, so nothing is written yet."""
+        machine._responses_waiting = ["R0000001", "R0000002"]
+        machine._current_status[TEMP_COFFEE] = 93.1
+        machine.update_callback(current_status=machine._current_status)
+        machine._current_status[TEMP_COFFEE] = 93.2
+        machine.update_callback(current_status=machine._current_status)
+        assert mock_write.call_count == 0
+
+        """The last response flushes the entities that read the coffee temp exactly once."""
+        machine._responses_waiting = []
+        machine.update_callback(current_status=machine._current_status)
+        assert sorted(x.args[0].unique_id for x in mock_write.call_args_list) == [
+            "aabbcc_coffee",
+            "aabbcc_main",
+        ]
+
+        """Nothing changed, so nothing is written."""
+        mock_write.reset_mock()
+        machine._current_status[TEMP_COFFEE] = 93.2
+        machine.update_callback(current_status=machine._current_status)
+        assert mock_write.call_count == 0
+
+    assert await hass.config_entries.async_unload(ENTRY_ID)
+    assert not hass.data[DOMAIN]
+
+
+@patch.object(lmdirect.LMDirect, "_send_msg", autospec=True)
+async def test_restore_state(
+    mock_send_msg, hass, hass_storage, enable_custom_integrations
+):
+    """Test that saved status is restored before the first poll and marked stale."""
+    hass_storage[f"{DOMAIN}.{ENTRY_ID}"] = {
+        "version": 1,
+        "key": f"{DOMAIN}.{ENTRY_ID}",
+        "data": {TEMP_COFFEE: 93.2, "power": 1, "heating_state": ["pump_on"]},
+    }
+
+    with patch("custom_components.lamarzocco.LaMarzocco.init_data"):
+        machine = await setup_lm_machine(hass)
+
+    assert machine.stale
+    assert machine.current_status[TEMP_COFFEE] == 93.2
+    assert "heating_state" not in machine.current_status
+
+    state = hass.states.get("water_heater.bbbbb_coffee")
+    assert state.attributes["current_temperature"] == 93.2
+    assert state.attributes["stale"]
+
+    """Fresh data clears the stale flag."""
+    machine.update_callback(current_status=machine.current_status)
+    assert not machine.stale
+    assert "stale" not in hass.states.get("water_heater.bbbbb_coffee").attributes
+
+    """The status is saved again when the machine is unloaded."""
+    assert await hass.config_entries.async_unload(ENTRY_ID)
+    assert hass_storage[f"{DOMAIN}.{ENTRY_ID}"]["data"][TEMP_COFFEE] == 93.2
@@ -0,0 +1,101 @@
+"""Test shot detection from the drink counters."""
+from lmdirect.msgs import CONTINUOUS, MSGS, TEMP_COFFEE, Msg
+from pytest_homeassistant_custom_component.common import async_capture_events
+
+from custom_components.lamarzocco.const import EVENT_SHOT, MAX_SHOTS_PER_POLL
+from custom_components.lamarzocco.shots import (
+    ShotDetector,
+    ShotThroughput,
+    SlidingWindow,
+)
+
+from support.fake_machine import RESPONSES, response
+
+K1 = "drinks_k1"
+
+
+def test_first_counters_are_a_baseline():
+    """Test that nothing is reported until the counters change."""
+    detector = ShotDetector()
+    assert detector.detect({K1: 10, CONTINUOUS: 3}) == []
+    assert detector.detect({K1: 10, CONTINUOUS: 3}) == []
+    assert detector.detect({K1: 12, CONTINUOUS: 4}) == ["k1", "k1", "continuous"]
+
+
+def test_counters_that_go_down_or_jump():
+    """Test that resets are ignored and big jumps are capped."""
+    detector = ShotDetector()
+    detector.detect({K1: 10})
+    assert detector.detect({K1: 0}) == []
+    assert detector.detect({K1: 1000}) == ["k1"] * MAX_SHOTS_PER_POLL
+
+    detector.reset()
+    assert detector.detect({K1: 1001}) == []
+
+
+async def test_shot_events(hass, machine, lm):
+    """Test that a shot pulled between polls fires an event."""
+    events = async_capture_events(hass, EVENT_SHOT)
+    await lm.poll()
+    assert events == []
+
+    machine.pull_shot(1)
+    machine.pull_shot(1)
+    lm.refresh()
+    await lm.poll()
+    await hass.async_block_till_done()
+
+    assert [x.data["key"] for x in events] == ["k1", "k1"]
+    assert events[0].data["serial_number"] == lm.serial_number
+    assert events[0].data[TEMP_COFFEE] == lm.current_status[TEMP_COFFEE]
+
+
+def test_sliding_window():
+    """Test that shots age out of the window one bucket at a time."""
+    window = SlidingWindow(3600, 60)
+    window.add(2, now=0)
+    window.add(1, now=1800)
+    assert window.value(now=3599) == 3
+    assert window.value(now=3600) == 1
+    assert window.value(now=5400) == 0
+
+    """A gap longer than the window clears it."""
+    window.add(1, now=5400)
+    assert window.value(now=100000) == 0
+
+
+def test_throughput_survives_restore():
+    """Test that saved windows pick up where they left off and line up with the clock."""
+    throughput = ShotThroughput()
+    throughput.add(["k1", "k1", "continuous"], now=1000)
+    throughput.add(["k2"], now=4000)
+
+    restored = ShotThroughput()
+    restored.restore(throughput.as_dict())
+    status = restored.status(now=4700)
+    assert status["shots_per_hour"] == 1
+    assert status["shots_per_hour_k2"] == 1
+    assert status["shots_per_day"] == 4
+    assert status["shots_per_day_k1"] == 2
+
+
+async def test_throughput_sensors(hass, machine, lm):
+    """Test that polls publish the throughput, counting shots but not counter resets."""
+    canned = RESPONSES[Msg.GET_DRINK_STATS]
+    msg = MSGS[Msg.GET_DRINK_STATS].msg
+
+    def set_k1(count):
+        data = "%08X" % count + canned[17:-2]
+        machine.responses = {Msg.GET_DRINK_STATS: response(Msg.READ, msg, data)}
+        lm.refresh()
+
+    await lm.poll()
+    assert lm.current_status["shots_per_hour"] == 0
+
+    """Three shots, then the counter is reset and one more is pulled."""
+    for count in [int(canned[9:17], 16) + 3, 0, 1]:
+        set_k1(count)
+        await lm.poll()
+
+    assert lm.current_status["shots_per_hour"] == 4
+    assert lm.current_status["shots_per_shift_k1"] == 4
@@ -0,0 +1,69 @@
+"""Test the machine simulator through the integration's own connection."""
+import asyncio
+from unittest.mock import patch
+
+from lmdirect.msgs import (
+    BREW_GROUP_OFFSET,
+    DOSE,
+    MODEL_LM,
+    MSGS,
+    POWER,
+    STEAM_BOILER_ENABLE,
+    TEMP_COFFEE,
+    Msg,
+)
+
+from support.fake_machine import FakeMachine
+
+
+async def test_writes_are_applied(hass, machine, lm):
+    """Test that writes change what the machine reports from then on."""
+    await lm.set_power(False)
+    await lm.set_dose(key=2, pulses=150)
+    await lm.set_steam_boiler_enable(False)
+
+    lm.refresh()
+    await lm.poll()
+
+    assert lm.current_status[POWER] == 0
+    assert lm.current_status[f"{DOSE}_k2"] == 150
+    assert lm.current_status[STEAM_BOILER_ENABLE] is False
+
+
+async def test_boilers_heat_up(hass, machine, lm):
+    """Test that the boilers approach the setpoint while the machine is on and cool when it's off."""
+    machine.heat_rate = 0.5
+    await lm.poll()
+    first = lm.current_status[TEMP_COFFEE]
+
+    await lm.set_power(False)
+    for _ in range(3):
+        await lm.poll()
+
+    assert lm.current_status[TEMP_COFFEE] < first - 20
+
+
+async def test_models(hass, socket_enabled):
+    """Test that the Linea Mini reports no brew group offset."""
+    machine = await FakeMachine(model=MODEL_LM).start()
+    try:
+        data = machine.read_register(MSGS[Msg.GET_FACTORY_CONFIG].msg)
+        assert data[58:60] == "00"
+    finally:
+        await machine.stop()
+
+
+async def test_latency_and_drops(hass, machine, lm):
+    """Test that replies are delayed by the latency and that dropped ones never come."""
+    machine.latency = 0.02
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    await lm.poll()
+    assert loop.time() - start >= 0.02
+    assert BREW_GROUP_OFFSET in lm.current_status
+
+    machine.drop_rate = 1
+    lm.refresh()
+    with patch("custom_components.lamarzocco.api.POLL_CYCLE_DEADLINE", 0.2):
+        await lm.poll()
+    assert lm._responses_waiting
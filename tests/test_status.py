@@ -0,0 +1,47 @@
+"""Test the La Marzocco status store."""
+from custom_components.lamarzocco.status import StatusStore
+
+
+def test_status_store_tracks_changes():
+    """Test that only keys whose values change are reported."""
+    status = StatusStore({"power": 0})
+    assert status.pop_changed() == {"power"}
+
+    status["power"] = 0
+    status.update({"coffee_temp": 93.4, "heating_state": ["heating_on"]})
+    assert status.pop_changed() == {"coffee_temp", "heating_state"}
+
+    status.update(power=1, heating_state=["heating_on"])
+    status.pop("missing", None)
+    status.pop("coffee_temp")
+    assert status.pop_changed() == {"power", "coffee_temp"}
+    assert status == {"power": 1, "heating_state": ["heating_on"]}
+    assert not status.pop_changed()
+
+
+def test_status_store_blocks():
+    """Test that modeled keys can be read as typed blocks and times are stored with their hour and minute."""
+    status = StatusStore({"coffee_temp": 93.4, "dose_k2": 120, "firmware_ver": "1.40"})
+    assert status.boilers.coffee_temp == 93.4
+    assert status.recipes[1].dose == 120
+    assert "mon_on_time" not in status
+    status.pop_changed()
+
+    status.update({"mon_on_hour": 6, "mon_on_min": 5, "mon_on_time": "99:99"})
+    assert status.schedule[0].on_hour == 6
+    assert dict(status)["mon_on_time"] == "06:05"
+    assert status.pop_changed() == {"mon_on_hour", "mon_on_min", "mon_on_time"}
+
+    status["mon_on_min"] = 30
+    assert status.pop_changed() == {"mon_on_min", "mon_on_time"}
+    assert status["mon_on_time"] == "06:30"
+
+    del status["mon_on_min"]
+    assert "mon_on_time" not in status
+    assert status.get("mon_on_min") is None
+    assert dict(status) == {
+        "coffee_temp": 93.4,
+        "dose_k2": 120,
+        "mon_on_hour": 6,
+        "firmware_ver": "1.40",
+    }